@@ -0,0 +1,50 @@
+"""Add email outbox table
+
+Revision ID: 002_email_outbox
+Revises: 001_initial
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "002_email_outbox"
+down_revision = "001_initial"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "email_outbox",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("app_id", sa.String(64)),
+        sa.Column("to_email", sa.String(255), nullable=False),
+        sa.Column("template", sa.String(50), nullable=False),
+        sa.Column("context", postgresql.JSONB(), nullable=False),
+        sa.Column("status", sa.String(20), nullable=False, server_default="pending"),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("last_error", sa.Text()),
+        sa.Column(
+            "next_attempt_at",
+            sa.DateTime(timezone=True),
+            nullable=False,
+            server_default=sa.func.now(),
+        ),
+        sa.Column(
+            "created_at", sa.DateTime(timezone=True), server_default=sa.func.now()
+        ),
+    )
+    op.create_index("idx_email_outbox_app", "email_outbox", ["app_id"])
+    op.create_index(
+        "idx_email_outbox_due",
+        "email_outbox",
+        ["status", "next_attempt_at"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("email_outbox")
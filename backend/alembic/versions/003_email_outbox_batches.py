@@ -0,0 +1,44 @@
+"""Add bulk email batch and priority to the email outbox
+
+Revision ID: 003_email_outbox_batches
+Revises: 002_email_outbox
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "003_email_outbox_batches"
+down_revision = "002_email_outbox"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "email_outbox",
+        sa.Column("priority", sa.SmallInteger(), nullable=False, server_default="0"),
+    )
+    op.add_column("email_outbox", sa.Column("batch_id", postgresql.UUID(as_uuid=True)))
+    op.create_index("idx_email_outbox_batch", "email_outbox", ["batch_id"])
+    op.drop_index("idx_email_outbox_due", table_name="email_outbox")
+    op.create_index(
+        "idx_email_outbox_due",
+        "email_outbox",
+        ["status", "priority", "next_attempt_at"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("idx_email_outbox_due", table_name="email_outbox")
+    op.create_index(
+        "idx_email_outbox_due",
+        "email_outbox",
+        ["status", "next_attempt_at"],
+    )
+    op.drop_index("idx_email_outbox_batch", table_name="email_outbox")
+    op.drop_column("email_outbox", "batch_id")
+    op.drop_column("email_outbox", "priority")
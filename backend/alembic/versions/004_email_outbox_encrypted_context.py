@@ -0,0 +1,66 @@
+"""Encrypt email outbox template variables
+
+Revision ID: 004_email_outbox_encrypted_context
+Revises: 003_email_outbox_batches
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from app.utils.encryption import decrypt_secret, encrypt_secret
+
+# revision identifiers, used by Alembic.
+revision = "004_email_outbox_encrypted_context"
+down_revision = "003_email_outbox_batches"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.alter_column(
+        "email_outbox",
+        "context",
+        type_=sa.Text(),
+        nullable=True,
+        postgresql_using="context::text",
+    )
+
+    conn = op.get_bind()
+    # Dead-lettered rows don't keep their links
+    conn.execute(
+        sa.text("UPDATE email_outbox SET context = NULL WHERE status = 'dead'")
+    )
+    rows = conn.execute(
+        sa.text("SELECT id, context FROM email_outbox WHERE context IS NOT NULL")
+    ).all()
+    for row_id, context in rows:
+        conn.execute(
+            sa.text("UPDATE email_outbox SET context = :context WHERE id = :id"),
+            {"context": encrypt_secret(context), "id": row_id},
+        )
+
+
+def downgrade() -> None:
+    conn = op.get_bind()
+    rows = conn.execute(
+        sa.text("SELECT id, context FROM email_outbox WHERE context IS NOT NULL")
+    ).all()
+    for row_id, context in rows:
+        conn.execute(
+            sa.text("UPDATE email_outbox SET context = :context WHERE id = :id"),
+            {"context": decrypt_secret(context), "id": row_id},
+        )
+    conn.execute(
+        sa.text("UPDATE email_outbox SET context = '{}' WHERE context IS NULL")
+    )
+
+    op.alter_column(
+        "email_outbox",
+        "context",
+        type_=postgresql.JSONB(),
+        nullable=False,
+        postgresql_using="context::jsonb",
+    )
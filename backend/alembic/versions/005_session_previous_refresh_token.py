@@ -0,0 +1,26 @@
+"""Track the previous refresh token of a session
+
+Revision ID: 005_session_previous_refresh_token
+Revises: 004_email_outbox_encrypted_context
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "005_session_previous_refresh_token"
+down_revision = "004_email_outbox_encrypted_context"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("sessions", sa.Column("previous_refresh_token_hash", sa.String(255)))
+    op.add_column("sessions", sa.Column("rotated_at", sa.DateTime(timezone=True)))
+
+
+def downgrade() -> None:
+    op.drop_column("sessions", "rotated_at")
+    op.drop_column("sessions", "previous_refresh_token_hash")
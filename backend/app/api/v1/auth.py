@@ -6,7 +6,12 @@ from fastapi import APIRouter, Depends, status, Header, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.database import get_db
-from app.core.middleware import get_api_key_context, get_current_user, Application
+from app.core.middleware import (
+    Application,
+    get_api_key_context,
+    get_client_ip,
+    get_current_user,
+)
 from app.schemas import (
     UserCreate,
     UserLogin,
@@ -31,12 +36,17 @@ router = APIRouter()
 )
 async def signup(
     user_data: UserCreate,
+    request: Request,
     application: Application = Depends(get_api_key_context),
     db: AsyncSession = Depends(get_db),
 ) -> UserResponse:
     """Register a new user"""
     user = await auth_service.register_user(
-        db=db, app_id=application.app_id, user_data=user_data
+        db=db,
+        app_id=application.app_id,
+        user_data=user_data,
+        ip_address=get_client_ip(request.scope),
+        user_agent=request.headers.get("user-agent"),
     )
     return user
 
@@ -49,7 +59,7 @@ async def login(
     db: AsyncSession = Depends(get_db),
 ):
     """Login user and get access/refresh tokens"""
-    ip_address = request.client.host if request.client else None
+    ip_address = get_client_ip(request.scope)
     user_agent = request.headers.get("user-agent")
 
     user, access_token, refresh_token = await auth_service.login(
@@ -96,12 +106,17 @@ async def refresh(
 @router.post("/logout", status_code=status.HTTP_200_OK)
 async def logout(
     token_data: TokenRefresh,
+    request: Request,
     x_app_id: str = Header(..., alias="x-app-id"),
     db: AsyncSession = Depends(get_db),
 ):
     """Logout user by revoking session"""
     await auth_service.logout(
-        db=db, app_id=x_app_id, refresh_token=token_data.refresh_token
+        db=db,
+        app_id=x_app_id,
+        refresh_token=token_data.refresh_token,
+        ip_address=get_client_ip(request.scope),
+        user_agent=request.headers.get("user-agent"),
     )
     return {"success": True}
 
@@ -133,12 +148,17 @@ async def confirm_email_verification(
 @router.post("/password/reset/request", response_model=PasswordResetResponse)
 async def request_password_reset(
     request_data: PasswordResetRequest,
+    request: Request,
     application: Application = Depends(get_api_key_context),
     db: AsyncSession = Depends(get_db),
 ):
     """Request password reset"""
     await auth_service.request_password_reset(
-        db=db, app_id=application.app_id, email=request_data.email
+        db=db,
+        app_id=application.app_id,
+        email=request_data.email,
+        ip_address=get_client_ip(request.scope),
+        user_agent=request.headers.get("user-agent"),
     )
     return PasswordResetResponse(success=True)
 
@@ -146,6 +166,7 @@ async def request_password_reset(
 @router.post("/password/reset/confirm", response_model=PasswordResetResponse)
 async def confirm_password_reset(
     confirm_data: PasswordResetConfirm,
+    request: Request,
     x_app_id: str = Header(..., alias="x-app-id"),
     db: AsyncSession = Depends(get_db),
 ):
@@ -155,5 +176,7 @@ async def confirm_password_reset(
         app_id=x_app_id,
         token=confirm_data.token,
         new_password=confirm_data.new_password,
+        ip_address=get_client_ip(request.scope),
+        user_agent=request.headers.get("user-agent"),
     )
     return PasswordResetResponse(success=True)
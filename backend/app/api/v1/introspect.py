@@ -2,19 +2,52 @@
 Token introspection API endpoints
 """
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, Dict, Optional
 from uuid import UUID
 
+from app.core.config import settings
 from app.core.database import get_db
 from app.core.middleware import get_api_key_context, Application
-from app.schemas import TokenIntrospection, TokenIntrospectionUser
+from app.schemas import (
+    TokenIntrospection,
+    TokenIntrospectionUser,
+    TokenIntrospectionBatchRequest,
+    TokenIntrospectionBatch,
+)
 from app.utils import verify_token
 from app.models import User
 
 router = APIRouter()
 
 
+def _active_user_id(payload: Optional[Dict[str, Any]], app_id: str) -> Optional[UUID]:
+    """Return the subject of a verified access token issued for app_id"""
+    if not payload or payload.get("type") != "access":
+        return None
+
+    # Verify app_id matches
+    if payload.get("app_id") != app_id:
+        return None
+
+    try:
+        return UUID(payload.get("sub"))
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_introspection(user: Optional[User]) -> TokenIntrospection:
+    if not user:
+        return TokenIntrospection(active=False)
+
+    return TokenIntrospection(
+        active=True,
+        user=TokenIntrospectionUser(id=user.id, email=user.email, app_id=user.app_id),
+    )
+
+
 @router.post("/introspect", response_model=TokenIntrospection)
 async def introspect_token(
     token: str,
@@ -23,27 +56,49 @@ async def introspect_token(
 ):
     """Introspect access token"""
     # Verify token
-    payload = verify_token(token)
-
-    if not payload or payload.get("type") != "access":
-        return TokenIntrospection(active=False)
-
-    # Verify app_id matches
-    if payload.get("app_id") != application.app_id:
+    user_id = _active_user_id(verify_token(token), application.app_id)
+    if not user_id:
         return TokenIntrospection(active=False)
 
     # Get user
-    user_id = UUID(payload.get("sub"))
-    from sqlalchemy import select
-
     stmt = select(User).where(User.id == user_id, User.app_id == application.app_id)
     result = await db.execute(stmt)
     user = result.scalar_one_or_none()
 
-    if not user:
-        return TokenIntrospection(active=False)
+    return _to_introspection(user)
 
-    return TokenIntrospection(
-        active=True,
-        user=TokenIntrospectionUser(id=user.id, email=user.email, app_id=user.app_id),
+
+@router.post("/introspect/batch", response_model=TokenIntrospectionBatch)
+async def introspect_tokens(
+    batch: TokenIntrospectionBatchRequest,
+    application: Application = Depends(get_api_key_context),
+    db: AsyncSession = Depends(get_db),
+):
+    """Introspect multiple access tokens, returning results in request order"""
+    if len(batch.tokens) > settings.INTROSPECT_BATCH_MAX_TOKENS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={
+                "code": "BATCH_TOO_LARGE",
+                "message": f"At most {settings.INTROSPECT_BATCH_MAX_TOKENS} tokens per request",
+            },
+        )
+
+    user_ids = [
+        _active_user_id(verify_token(token), application.app_id)
+        for token in batch.tokens
+    ]
+
+    # Resolve all users with a single query
+    users = {}
+    wanted = {user_id for user_id in user_ids if user_id}
+    if wanted:
+        stmt = select(User).where(
+            User.id.in_(wanted), User.app_id == application.app_id
+        )
+        result = await db.execute(stmt)
+        users = {user.id: user for user in result.scalars()}
+
+    return TokenIntrospectionBatch(
+        results=[_to_introspection(users.get(user_id)) for user_id in user_ids]
     )
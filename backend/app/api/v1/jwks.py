@@ -0,0 +1,22 @@
+"""
+JSON Web Key Set endpoint
+"""
+
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from app.core.config import settings
+from app.utils.keys import key_store
+
+router = APIRouter()
+
+
+@router.get("/.well-known/jwks.json")
+async def get_jwks():
+    """Publish the public keys used to verify access tokens"""
+    return JSONResponse(
+        content=key_store.jwks,
+        headers={
+            "Cache-Control": f"public, max-age={settings.JWKS_CACHE_MAX_AGE_SECONDS}"
+        },
+    )
@@ -21,11 +21,13 @@ from app.schemas import (
     APIKeyCreate,
     APIKeyResponse,
     APIKeyWithPlaintext,
+    BulkEmailJobResponse,
 )
 from app.services.developer import DeveloperAuthService
 from app.services.application import application_service
 from app.services.api_key_service import api_key_service
 from app.services.user_management import user_management_service
+from app.services.bulk_email import bulk_email_service
 
 router = APIRouter()
 developer_auth_service = DeveloperAuthService()
@@ -123,6 +125,38 @@ async def list_users(
     return result
 
 
+@router.post(
+    "/applications/{app_id}/users/resend-verification",
+    response_model=BulkEmailJobResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def resend_verification_to_unverified_users(
+    app_id: str,
+    developer: Developer = Depends(get_portal_developer),
+    db: AsyncSession = Depends(get_db),
+):
+    """Re-send verification emails to all unverified users in the background"""
+    return await bulk_email_service.start_reverification(
+        db=db, developer_id=developer.id, app_id=app_id
+    )
+
+
+@router.get(
+    "/applications/{app_id}/email-jobs/{job_id}",
+    response_model=BulkEmailJobResponse,
+)
+async def get_email_job(
+    app_id: str,
+    job_id: UUID,
+    developer: Developer = Depends(get_portal_developer),
+    db: AsyncSession = Depends(get_db),
+):
+    """Get the progress of a bulk email job"""
+    return await bulk_email_service.get_job(
+        db=db, developer_id=developer.id, app_id=app_id, job_id=job_id
+    )
+
+
 @router.post(
     "/applications/{app_id}/api-keys",
     response_model=APIKeyWithPlaintext,
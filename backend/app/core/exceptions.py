@@ -58,3 +58,12 @@ class RateLimitError(DevAuthException):
         super().__init__(
             "RATE_LIMIT_EXCEEDED", message, status.HTTP_429_TOO_MANY_REQUESTS
         )
+
+
+class ServiceUnavailableError(DevAuthException):
+    """Service temporarily unavailable error"""
+
+    def __init__(self, message: str = "Service temporarily unavailable"):
+        super().__init__(
+            "SERVICE_UNAVAILABLE", message, status.HTTP_503_SERVICE_UNAVAILABLE
+        )
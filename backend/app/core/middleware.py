@@ -2,14 +2,26 @@
 API authentication and rate limiting middleware
 """
 
+import logging
+import math
+from typing import Optional
+
 from fastapi import Request, HTTPException, status, Header, Depends
+from fastapi.responses import JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
+from app.core.config import settings
 from app.core.database import get_db
 from app.models import APIKey, Application
 from app.utils import hash_api_key, verify_token
-from app.services.rate_limiter import rate_limiter
+from app.services.api_key_cache import api_key_cache
+from app.services.api_key_usage import api_key_usage_tracker
+from app.services.rate_limiter import RateLimiter, rate_limiter
+
+logger = logging.getLogger(__name__)
 
 
 async def get_api_key_context(
@@ -37,35 +49,37 @@ async def get_api_key_context(
     # Hash API key
     api_key_hash = hash_api_key(x_api_key)
 
-    # Find API key
-    stmt = (
-        select(APIKey)
-        .join(Application)
-        .where(
-            APIKey.key_hash == api_key_hash,
-            APIKey.app_id == x_app_id,
-            APIKey.revoked.is_(False),
-        )
-    )
-    result = await db.execute(stmt)
-    api_key = result.scalar_one_or_none()
-
-    if not api_key:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail={"code": "INVALID_API_KEY", "message": "Invalid or revoked API key"},
+    cached = await api_key_cache.get(api_key_hash, x_app_id)
+    if cached:
+        api_key_id, application = cached
+    else:
+        # Find API key and its application in one query
+        stmt = (
+            select(APIKey.id, Application)
+            .join(Application)
+            .where(
+                APIKey.key_hash == api_key_hash,
+                APIKey.app_id == x_app_id,
+                APIKey.revoked.is_(False),
+            )
         )
+        result = await db.execute(stmt)
+        row = result.first()
 
-    # Update last used timestamp
-    from datetime import datetime
+        if not row:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail={
+                    "code": "INVALID_API_KEY",
+                    "message": "Invalid or revoked API key",
+                },
+            )
 
-    api_key.last_used_at = datetime.utcnow()
-    await db.commit()
+        api_key_id, application = row
+        await api_key_cache.set(api_key_hash, api_key_id, application)
 
-    # Get application
-    app_stmt = select(Application).where(Application.app_id == x_app_id)
-    app_result = await db.execute(app_stmt)
-    application = app_result.scalar_one()
+    # Update last used timestamp (flushed to the database in batches)
+    api_key_usage_tracker.record(api_key_id)
 
     return application
 
@@ -144,49 +158,176 @@ async def get_current_user(
     return user
 
 
-async def rate_limit_middleware(request: Request, call_next):
-    """
-    Rate limiting middleware
+# Route classes with their own quotas, keyed by (method, path)
+ROUTE_CLASS_DEFAULT = "default"
+_ROUTE_CLASSES = {
+    ("POST", "/v1/auth/login"): "login",
+    ("POST", "/v1/portal/developers/login"): "login",
+    ("POST", "/v1/auth/signup"): "signup",
+    ("POST", "/v1/portal/developers/signup"): "signup",
+    ("POST", "/v1/auth/introspect"): "introspect",
+    ("POST", "/v1/auth/introspect/batch"): "introspect",
+    ("POST", "/v1/auth/email/verify/request"): "email",
+    ("POST", "/v1/auth/password/reset/request"): "email",
+}
 
-    Args:
-        request: FastAPI request
-        call_next: Next middleware/route handler
+# Route classes with a tighter quota per client IP than per API key
+_PER_IP_ROUTE_CLASSES = frozenset({"login", "signup", "email"})
 
-    Returns:
-        Response with rate limit headers
+# Paths that are never rate limited
+_EXEMPT_PATHS = frozenset(
+    {"/", "/health", "/.well-known/jwks.json", "/docs", "/redoc", "/openapi.json"}
+)
 
-    Raises:
-        HTTPException: If rate limit exceeded
+
+def get_route_class(method: str, path: str) -> str:
+    """Map a request to its rate limit route class"""
+    return _ROUTE_CLASSES.get((method, path.rstrip("/") or "/"), ROUTE_CLASS_DEFAULT)
+
+
+def get_client_ip(scope: Scope) -> Optional[str]:
     """
-    # Get API key from headers
-    api_key = request.headers.get("x-api-key")
+    Resolve the client IP address of a request
 
-    if api_key:
-        # Rate limit by API key
-        from app.utils import hash_api_key
+    Behind TRUSTED_PROXY_COUNT reverse proxies the address is taken from
+    X-Forwarded-For, counting from the right so that entries the client
+    sent itself are ignored.
 
-        identifier = hash_api_key(api_key)
-    else:
-        # Rate limit by IP address
-        identifier = request.client.host if request.client else "unknown"
+    Args:
+        scope: ASGI connection scope (``request.scope`` in handlers)
 
-    # Check rate limit
-    is_allowed, remaining = await rate_limiter.check_rate_limit(identifier)
+    Returns:
+        Client IP address, or None if unknown
+    """
+    if settings.TRUSTED_PROXY_COUNT > 0:
+        forwarded_for = Headers(scope=scope).get("x-forwarded-for")
+        if forwarded_for:
+            addresses = [
+                address.strip()
+                for address in forwarded_for.split(",")
+                if address.strip()
+            ]
+            if addresses:
+                index = min(settings.TRUSTED_PROXY_COUNT, len(addresses))
+                return addresses[-index]
+    client = scope.get("client")
+    return client[0] if client else None
+
+
+def get_rate_limit(
+    route_class: str, app_id: Optional[str], per_ip: bool = False
+) -> int:
+    """
+    Resolve the per-minute quota for a route class
 
-    # Add rate limit headers
-    response = await call_next(request)
-    response.headers["X-RateLimit-Limit"] = str(rate_limiter.requests_per_minute)
-    response.headers["X-RateLimit-Remaining"] = str(remaining)
+    Args:
+        route_class: Route class from get_route_class()
+        app_id: Application ID of a validated API key, if any; only then do
+            its RATE_LIMIT_APP_OVERRIDES apply
+        per_ip: Whether the request is counted per client IP (no validated
+            API key) rather than per API key
 
-    if not is_allowed:
-        retry_after = 60  # 1 minute
-        response.headers["Retry-After"] = str(retry_after)
-        raise HTTPException(
-            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-            detail={
-                "code": "RATE_LIMIT_EXCEEDED",
-                "message": f"Rate limit exceeded. Maximum {rate_limiter.requests_per_minute} requests per minute.",
-            },
-        )
+    Returns:
+        Requests allowed per minute
+    """
+    if per_ip and route_class in _PER_IP_ROUTE_CLASSES:
+        return {
+            "login": settings.RATE_LIMIT_LOGIN_PER_IP_PER_MINUTE,
+            "signup": settings.RATE_LIMIT_SIGNUP_PER_IP_PER_MINUTE,
+            "email": settings.RATE_LIMIT_EMAIL_PER_IP_PER_MINUTE,
+        }[route_class]
+    if app_id:
+        override = settings.RATE_LIMIT_APP_OVERRIDES.get(app_id)
+        if override and route_class in override:
+            return override[route_class]
+    return {
+        "login": settings.RATE_LIMIT_LOGIN_PER_MINUTE,
+        "signup": settings.RATE_LIMIT_SIGNUP_PER_MINUTE,
+        "introspect": settings.RATE_LIMIT_INTROSPECT_PER_MINUTE,
+        "email": settings.RATE_LIMIT_EMAIL_PER_MINUTE,
+    }.get(route_class, settings.RATE_LIMIT_PER_MINUTE)
+
+
+class RateLimitMiddleware:
+    """
+    Rate limiting middleware
+
+    Pure ASGI middleware that runs before routing, so rejected requests
+    never reach dependency resolution, the database or the handler.
+    Requests are counted per route class, application and caller. The
+    caller is the API key when the key is known to the API key cache, so a
+    tenant's server-side integration gets the tenant-wide quota; anything
+    else (no key, a key that isn't cached yet, or a made-up one) is counted
+    per client IP across applications, with tighter quotas for login, signup
+    and email routes. Unauthenticated headers (API key or application ID)
+    therefore can't be used to get a fresh or larger quota.
+    If Redis is unavailable requests are let through rather than failing
+    the API.
+    """
 
-    return response
+    def __init__(self, app: ASGIApp, limiter: RateLimiter = rate_limiter):
+        self.app = app
+        self.limiter = limiter
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if (
+            scope["type"] != "http"
+            or not settings.RATE_LIMIT_ENABLED
+            or scope["path"] in _EXEMPT_PATHS
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        app_id = headers.get("x-app-id")
+        api_key = headers.get("x-api-key")
+        route_class = get_route_class(scope["method"], scope["path"])
+
+        try:
+            # Only keys that were already validated count as a caller
+            cached = None
+            if api_key and app_id:
+                cached = await api_key_cache.get(hash_api_key(api_key), app_id)
+            if cached:
+                identifier = f"{route_class}:{app_id}:key:{cached[0]}"
+                limit = get_rate_limit(route_class, app_id)
+            else:
+                # x-app-id isn't authenticated here, so it selects neither
+                # the bucket nor an application override
+                identifier = f"{route_class}:ip:{get_client_ip(scope) or 'unknown'}"
+                limit = get_rate_limit(route_class, None, per_ip=True)
+
+            result = await self.limiter.check(identifier, limit)
+        except Exception as e:
+            logger.warning(f"Rate limit check failed, allowing request: {str(e)}")
+            await self.app(scope, receive, send)
+            return
+
+        if not result.allowed:
+            retry_after = str(math.ceil(result.retry_after))
+            response = JSONResponse(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                content={
+                    "error": {
+                        "code": "RATE_LIMIT_EXCEEDED",
+                        "message": f"Rate limit exceeded. Maximum {limit} requests per minute.",
+                    }
+                },
+                headers={
+                    "X-RateLimit-Limit": str(limit),
+                    "X-RateLimit-Remaining": "0",
+                    "X-RateLimit-Reset": retry_after,
+                    "Retry-After": retry_after,
+                },
+            )
+            await response(scope, receive, send)
+            return
+
+        async def send_with_headers(message: Message):
+            if message["type"] == "http.response.start":
+                response_headers = MutableHeaders(scope=message)
+                response_headers["X-RateLimit-Limit"] = str(limit)
+                response_headers["X-RateLimit-Remaining"] = str(result.remaining)
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
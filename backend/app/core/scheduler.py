@@ -4,7 +4,11 @@ Background job scheduler using APScheduler
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
+from app.core.config import settings
 from app.services.cleanup import cleanup_service
+from app.services.api_key_usage import api_key_usage_tracker
+from app.utils.password import password_hash_executor
 import logging
 import os
 
@@ -29,6 +33,22 @@ def start_scheduler():
         name="Daily cleanup of expired tokens and old sessions",
         replace_existing=True,
     )
+    # Flush write-behind API key usage timestamps
+    scheduler.add_job(
+        api_key_usage_tracker.flush,
+        trigger=IntervalTrigger(seconds=settings.API_KEY_LAST_USED_FLUSH_SECONDS),
+        id="api_key_usage_flush",
+        name="Flush API key last-used timestamps",
+        replace_existing=True,
+    )
+    # Replace broken password hashing workers
+    scheduler.add_job(
+        password_hash_executor.health_check,
+        trigger=IntervalTrigger(seconds=settings.PASSWORD_HASH_HEALTH_CHECK_SECONDS),
+        id="password_hash_health_check",
+        name="Password hashing worker health check",
+        replace_existing=True,
+    )
 
     scheduler.start()
     logger.info("Background job scheduler started")
@@ -10,6 +10,7 @@ from app.models.api_key import APIKey
 from app.models.email_verification_token import EmailVerificationToken
 from app.models.password_reset_token import PasswordResetToken
 from app.models.audit_log import AuditLog
+from app.models.email_outbox import EmailOutbox
 
 __all__ = [
     "Developer",
@@ -20,4 +21,5 @@ __all__ = [
     "EmailVerificationToken",
     "PasswordResetToken",
     "AuditLog",
+    "EmailOutbox",
 ]
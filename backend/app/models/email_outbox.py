@@ -0,0 +1,62 @@
+"""
+Email outbox model for transactional emails awaiting delivery
+"""
+
+from sqlalchemy import (
+    Column,
+    String,
+    DateTime,
+    Integer,
+    SmallInteger,
+    Text,
+    Index,
+    func,
+)
+import uuid
+from app.core.database import Base
+from app.models.types import GUID
+
+EMAIL_OUTBOX_PENDING = "pending"
+EMAIL_OUTBOX_DEAD = "dead"
+
+# Lower values are sent first, so campaigns never delay signup emails
+EMAIL_PRIORITY_TRANSACTIONAL = 0
+EMAIL_PRIORITY_BULK = 1
+
+
+class EmailOutbox(Base):
+    """
+    Email outbox model
+
+    Rows are written in the same transaction as the token they deliver and
+    deleted once sent. Rows that keep failing are dead-lettered.
+    ``context`` holds the template variables (links with raw tokens)
+    encrypted with the application encryption key.
+    """
+
+    __tablename__ = "email_outbox"
+
+    id = Column(GUID(), primary_key=True, default=uuid.uuid4)
+    app_id = Column(String(64), nullable=True)
+    to_email = Column(String(255), nullable=False)
+    template = Column(String(50), nullable=False)
+    # Encrypted template variables, cleared when the row is dead-lettered
+    context = Column(Text, nullable=True)
+    status = Column(String(20), nullable=False, default=EMAIL_OUTBOX_PENDING)
+    priority = Column(
+        SmallInteger, nullable=False, default=EMAIL_PRIORITY_TRANSACTIONAL
+    )
+    batch_id = Column(GUID(), nullable=True)  # Bulk email job
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text)
+    next_attempt_at = Column(
+        DateTime(timezone=True), nullable=False, server_default=func.now()
+    )
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    # Same indexes as the migrations
+    __table_args__ = (
+        Index("idx_email_outbox_app", "app_id"),
+        Index("idx_email_outbox_batch", "batch_id"),
+        Index("idx_email_outbox_due", "status", "priority", "next_attempt_at"),
+    )
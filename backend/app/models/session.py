@@ -23,6 +23,10 @@ class Session(Base):
     )
     app_id = Column(String(64), nullable=False)
     refresh_token_hash = Column(String(255), nullable=False, index=True)
+    # Token replaced by the last rotation and when it happened, to tell a
+    # concurrent refresh from a replayed token
+    previous_refresh_token_hash = Column(String(255))
+    rotated_at = Column(DateTime(timezone=True))
     user_agent = Column(Text)
     ip_address = Column(String(45))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
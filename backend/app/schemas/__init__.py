@@ -8,6 +8,8 @@ from app.schemas.token import (
     TokenRefresh,
     TokenIntrospection,
     TokenIntrospectionUser,
+    TokenIntrospectionBatchRequest,
+    TokenIntrospectionBatch,
 )
 from app.schemas.application import (
     ApplicationCreate,
@@ -25,6 +27,7 @@ from app.schemas.email import (
     EmailVerificationRequest,
     EmailVerificationConfirm,
     EmailVerificationResponse,
+    BulkEmailJobResponse,
 )
 from app.schemas.password import (
     PasswordResetRequest,
@@ -44,6 +47,8 @@ __all__ = [
     "TokenRefresh",
     "TokenIntrospection",
     "TokenIntrospectionUser",
+    "TokenIntrospectionBatchRequest",
+    "TokenIntrospectionBatch",
     # Application
     "ApplicationCreate",
     "ApplicationResponse",
@@ -61,6 +66,7 @@ __all__ = [
     "EmailVerificationRequest",
     "EmailVerificationConfirm",
     "EmailVerificationResponse",
+    "BulkEmailJobResponse",
     # Password
     "PasswordResetRequest",
     "PasswordResetConfirm",
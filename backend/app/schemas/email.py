@@ -2,6 +2,10 @@
 Pydantic schemas for email verification
 """
 
+from datetime import datetime
+from typing import Optional
+from uuid import UUID
+
 from pydantic import BaseModel, EmailStr
 
 
@@ -21,3 +25,19 @@ class EmailVerificationResponse(BaseModel):
     """Schema for email verification response"""
 
     success: bool = True
+
+
+class BulkEmailJobResponse(BaseModel):
+    """Schema for bulk email job progress"""
+
+    job_id: UUID
+    app_id: str
+    status: str  # running, completed or failed
+    total: int  # Unverified users when the job started
+    queued: int  # Emails written to the outbox so far
+    delivered: int
+    pending: int
+    failed: int  # Dead-lettered after all retries
+    started_at: datetime
+    finished_at: Optional[datetime] = None
+    error: Optional[str] = None
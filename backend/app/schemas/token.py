@@ -4,7 +4,7 @@ Pydantic schemas for Token models
 
 from pydantic import BaseModel
 from uuid import UUID
-from typing import Optional
+from typing import List, Optional
 
 
 class TokenPair(BaseModel):
@@ -35,3 +35,15 @@ class TokenIntrospection(BaseModel):
 
     active: bool
     user: Optional[TokenIntrospectionUser] = None
+
+
+class TokenIntrospectionBatchRequest(BaseModel):
+    """Schema for batch token introspection request"""
+
+    tokens: List[str]
+
+
+class TokenIntrospectionBatch(BaseModel):
+    """Schema for batch token introspection response (in request order)"""
+
+    results: List[TokenIntrospection]
@@ -0,0 +1,173 @@
+"""
+Two-tier cache for API key to application resolution
+"""
+
+import json
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional, Tuple
+from uuid import UUID
+
+from app.core.config import settings
+from app.core.redis import get_redis
+from app.models import Application
+
+logger = logging.getLogger(__name__)
+
+# Application columns kept in the cache (the encrypted secret is left out)
+_APPLICATION_FIELDS = ("id", "developer_id", "name", "environment", "app_id")
+_APPLICATION_DATETIME_FIELDS = ("created_at", "updated_at")
+
+# Stored in place of an entry when its key is revoked
+_REVOKED = "revoked"
+
+# Write an entry unless the key was revoked in the meantime.
+# KEYS[1] = entry key
+# ARGV = entry, TTL (s), revoked marker
+# Returns 1 if written, 0 if the key is revoked
+_SET_UNLESS_REVOKED_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[3] then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+return 1
+"""
+
+
+def _serialize_application(application: Application) -> Dict[str, Any]:
+    snapshot = {
+        field: str(getattr(application, field)) for field in _APPLICATION_FIELDS
+    }
+    for field in _APPLICATION_DATETIME_FIELDS:
+        value = getattr(application, field)
+        snapshot[field] = value.isoformat() if value else None
+    return snapshot
+
+
+def _deserialize_application(snapshot: Dict[str, Any]) -> Application:
+    """Build a detached, read-only Application from a cached snapshot"""
+    fields = dict(snapshot)
+    fields["id"] = UUID(fields["id"])
+    fields["developer_id"] = UUID(fields["developer_id"])
+    for field in _APPLICATION_DATETIME_FIELDS:
+        if fields.get(field):
+            fields[field] = datetime.fromisoformat(fields[field])
+    return Application(**fields)
+
+
+class APIKeyCache:
+    """
+    Cache of resolved API keys
+
+    Maps an API key hash to its key ID and application snapshot. Lookups
+    hit a small in-process TTL cache first and a shared Redis cache second.
+    Invalidation replaces the Redis entry with a revoked marker for the
+    entry TTL and drops the local entry of the calling worker; other
+    workers drop theirs within the local TTL. The marker stops a request
+    that read the key row before it was revoked from caching it again.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: int = 300,
+        local_ttl_seconds: float = 5.0,
+        local_max_entries: int = 10_000,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.local_ttl_seconds = local_ttl_seconds
+        self.local_max_entries = local_max_entries
+        self._local: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+    @staticmethod
+    def _redis_key(key_hash: str) -> str:
+        return f"api_key_ctx:{key_hash}"
+
+    def _get_local(self, key_hash: str) -> Optional[Dict[str, Any]]:
+        entry = self._local.get(key_hash)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._local[key_hash]
+            return None
+        return value
+
+    def _set_local(self, key_hash: str, value: Dict[str, Any]):
+        self._local[key_hash] = (time.monotonic() + self.local_ttl_seconds, value)
+        self._local.move_to_end(key_hash)
+        while len(self._local) > self.local_max_entries:
+            self._local.popitem(last=False)
+
+    async def get(
+        self, key_hash: str, app_id: str
+    ) -> Optional[Tuple[UUID, Application]]:
+        """
+        Look up a resolved API key
+
+        Args:
+            key_hash: SHA-256 hash of the API key
+            app_id: Application ID the key is presented for
+
+        Returns:
+            Tuple of (api_key_id, application) or None on a miss
+        """
+        value = self._get_local(key_hash)
+        if value is None:
+            try:
+                redis_client = await get_redis()
+                cached = await redis_client.get(self._redis_key(key_hash))
+            except Exception as e:
+                logger.warning(f"API key cache lookup failed: {str(e)}")
+                return None
+            if cached is None or cached == _REVOKED:
+                return None
+            value = json.loads(cached)
+            self._set_local(key_hash, value)
+
+        if value["application"]["app_id"] != app_id:
+            return None
+        return UUID(value["api_key_id"]), _deserialize_application(value["application"])
+
+    async def set(self, key_hash: str, api_key_id: UUID, application: Application):
+        """Cache a resolved API key, unless it has been revoked since"""
+        value = {
+            "api_key_id": str(api_key_id),
+            "application": _serialize_application(application),
+        }
+        try:
+            redis_client = await get_redis()
+            script = redis_client.register_script(_SET_UNLESS_REVOKED_SCRIPT)
+            written = await script(
+                keys=[self._redis_key(key_hash)],
+                args=[json.dumps(value), self.ttl_seconds, _REVOKED],
+            )
+        except Exception as e:
+            logger.warning(f"API key cache write failed: {str(e)}")
+            written = True
+        if written:
+            self._set_local(key_hash, value)
+
+    async def invalidate(self, key_hashes: Iterable[str]):
+        """Mark the given API key hashes as revoked in the cache"""
+        key_hashes = list(key_hashes)
+        if not key_hashes:
+            return
+        for key_hash in key_hashes:
+            self._local.pop(key_hash, None)
+        try:
+            redis_client = await get_redis()
+            pipe = redis_client.pipeline(transaction=False)
+            for key_hash in key_hashes:
+                pipe.set(self._redis_key(key_hash), _REVOKED, ex=self.ttl_seconds)
+            await pipe.execute()
+        except Exception as e:
+            logger.error(f"API key cache invalidation failed: {str(e)}")
+
+
+# Global API key cache instance
+api_key_cache = APIKeyCache(
+    ttl_seconds=settings.API_KEY_CACHE_TTL_SECONDS,
+    local_ttl_seconds=settings.API_KEY_CACHE_LOCAL_TTL_SECONDS,
+)
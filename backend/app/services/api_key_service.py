@@ -11,6 +11,7 @@ from fastapi import HTTPException, status
 from app.models import APIKey, Application
 from app.schemas import APIKeyCreate
 from app.utils import generate_api_key
+from app.services.api_key_cache import api_key_cache
 
 
 class APIKeyService:
@@ -150,6 +151,8 @@ class APIKeyService:
         api_key.revoked_at = datetime.utcnow()
         await db.commit()
 
+        await api_key_cache.invalidate([api_key.key_hash])
+
         return True
 
 
@@ -0,0 +1,86 @@
+"""
+Write-behind tracking of API key usage
+"""
+
+from datetime import datetime
+from typing import Dict
+from uuid import UUID
+import logging
+
+from sqlalchemy import bindparam, or_, update
+
+from app.core.database import AsyncSessionLocal
+from app.models import APIKey
+
+logger = logging.getLogger(__name__)
+
+
+class APIKeyUsageTracker:
+    """
+    Write-behind tracker for APIKey.last_used_at
+
+    Requests only record the latest use in memory; the scheduler flushes
+    the pending timestamps to the api_keys table periodically in one batched
+    UPDATE, so busy keys no longer cost a row write per request.
+    """
+
+    def __init__(self):
+        self._pending: Dict[UUID, datetime] = {}
+
+    @property
+    def pending_count(self) -> int:
+        """Number of keys with an unflushed timestamp"""
+        return len(self._pending)
+
+    def record(self, api_key_id: UUID):
+        """Record that an API key was just used"""
+        self._pending[api_key_id] = datetime.utcnow()
+
+    async def flush(self) -> int:
+        """
+        Write pending timestamps to the database
+
+        Returns:
+            Number of keys flushed
+        """
+        if not self._pending:
+            return 0
+
+        pending, self._pending = self._pending, {}
+        table = APIKey.__table__
+        # Never move last_used_at backwards (other workers flush too)
+        stmt = (
+            update(table)
+            .where(
+                table.c.id == bindparam("key_id"),
+                or_(
+                    table.c.last_used_at.is_(None),
+                    table.c.last_used_at < bindparam("used_at"),
+                ),
+            )
+            .values(last_used_at=bindparam("used_at"))
+        )
+
+        async with AsyncSessionLocal() as db:
+            try:
+                await db.execute(
+                    stmt,
+                    [
+                        {"key_id": key_id, "used_at": used_at}
+                        for key_id, used_at in pending.items()
+                    ],
+                )
+                await db.commit()
+            except Exception as e:
+                logger.error(f"Error flushing API key usage: {str(e)}")
+                await db.rollback()
+                # Keep timestamps for the next flush unless superseded
+                for key_id, used_at in pending.items():
+                    self._pending.setdefault(key_id, used_at)
+                return 0
+
+        return len(pending)
+
+
+# Global API key usage tracker instance
+api_key_usage_tracker = APIKeyUsageTracker()
@@ -8,9 +8,11 @@ from sqlalchemy import select
 from fastapi import HTTPException, status
 import secrets
 
-from app.models import Application, Developer
+from app.models import Application, Developer, APIKey
 from app.schemas import ApplicationCreate
 from app.utils import encrypt_secret
+from app.services.api_key_cache import api_key_cache
+from app.services.email_templates import email_template_cache
 
 
 class ApplicationService:
@@ -140,8 +142,16 @@ class ApplicationService:
         application = await self.get_application(
             db=db, developer_id=developer_id, app_id=app_id
         )
+        key_hashes_result = await db.execute(
+            select(APIKey.key_hash).where(APIKey.app_id == app_id)
+        )
+        key_hashes = key_hashes_result.scalars().all()
+
         await db.delete(application)
         await db.commit()
+
+        await api_key_cache.invalidate(key_hashes)
+        email_template_cache.invalidate(app_id)
         return True
 
 
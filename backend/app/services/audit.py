@@ -2,14 +2,43 @@
 Audit logging service
 """
 
-from uuid import UUID
-from sqlalchemy.ext.asyncio import AsyncSession
-from typing import Optional, Dict, Any
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from uuid import UUID, uuid4
+
+from sqlalchemy import insert
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
 from app.models import AuditLog
 
+logger = logging.getLogger(__name__)
+
+# What log_event does when the queue is full
+AUDIT_OVERFLOW_DROP = "drop"
+AUDIT_OVERFLOW_BLOCK = "block"
+
+# Queued by stop() so the writer exits after flushing what came before it
+_STOP = object()
+
 
 class AuditService:
-    """Audit logging service"""
+    """
+    Audit logging service
+
+    log_event only puts the event on an in-memory queue; a background
+    writer inserts queued events with one multi-row INSERT once
+    ``batch_size`` events are waiting or ``flush_interval_seconds`` after
+    the first one arrived, so audited requests never wait on a commit. The
+    queue holds at most ``max_queue_size`` events; when it is full new
+    events are dropped (and counted) or, with the "block" policy, the
+    caller waits up to ``block_timeout_seconds`` for the writer to catch up
+    before dropping the event, so a stalled database can't hold login and
+    logout requests indefinitely. A batch whose INSERT fails is logged and
+    dropped rather than retried.
+    """
 
     # Authentication events
     ACTION_SIGNUP = "signup"
@@ -25,9 +54,32 @@ class AuditService:
     ACTION_API_KEY_REVOKED = "api_key_revoked"
     ACTION_APPLICATION_CREATED = "application_created"
 
+    def __init__(
+        self,
+        batch_size: int = 500,
+        flush_interval_seconds: float = 0.2,
+        max_queue_size: int = 10000,
+        overflow_policy: str = AUDIT_OVERFLOW_DROP,
+        block_timeout_seconds: float = 1.0,
+    ):
+        if overflow_policy not in (AUDIT_OVERFLOW_DROP, AUDIT_OVERFLOW_BLOCK):
+            raise ValueError(f"Unknown audit overflow policy: {overflow_policy}")
+        self.batch_size = batch_size
+        self.flush_interval_seconds = flush_interval_seconds
+        self.overflow_policy = overflow_policy
+        self.block_timeout_seconds = block_timeout_seconds
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue_size)
+        self._batch_ready: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.dropped_count = 0
+
+    @property
+    def pending_count(self) -> int:
+        """Number of events waiting to be written"""
+        return self._queue.qsize()
+
     async def log_event(
         self,
-        db: AsyncSession,
         action: str,
         user_id: Optional[UUID] = None,
         app_id: Optional[str] = None,
@@ -38,10 +90,9 @@ class AuditService:
         metadata: Optional[Dict[str, Any]] = None,
     ):
         """
-        Log an audit event
+        Queue an audit event
 
         Args:
-            db: Database session
             action: Action name
             user_id: User ID (if applicable)
             app_id: Application ID (if applicable)
@@ -51,19 +102,116 @@ class AuditService:
             request_id: Request ID for tracing
             metadata: Additional event metadata
         """
-        audit_log = AuditLog(
-            user_id=user_id,
-            app_id=app_id,
-            developer_id=developer_id,
-            action=action,
-            ip_address=ip_address,
-            user_agent=user_agent,
-            request_id=request_id,
-            metadata=metadata or {},
-        )
-        db.add(audit_log)
-        await db.commit()
+        event = {
+            "id": uuid4(),
+            "user_id": user_id,
+            "app_id": app_id,
+            "developer_id": developer_id,
+            "action": action,
+            "ip_address": ip_address,
+            "user_agent": user_agent,
+            "request_id": request_id,
+            "metadata": metadata or {},
+            # Time of the event, not of the batch insert
+            "created_at": datetime.utcnow(),
+        }
+
+        try:
+            if self.overflow_policy == AUDIT_OVERFLOW_BLOCK:
+                await asyncio.wait_for(
+                    self._queue.put(event), timeout=self.block_timeout_seconds
+                )
+            else:
+                self._queue.put_nowait(event)
+        except (asyncio.QueueFull, asyncio.TimeoutError):
+            self.dropped_count += 1
+            logger.warning(f"Audit queue full, dropped {action} event")
+            return
+
+        if self._batch_ready is not None and self._queue.qsize() >= self.batch_size:
+            self._batch_ready.set()
+
+    def _take(self, limit: int) -> List[Any]:
+        """Take up to ``limit`` queued items without waiting"""
+        items = []
+        while len(items) < limit and not self._queue.empty():
+            items.append(self._queue.get_nowait())
+        return items
+
+    async def _write(self, events: List[Dict[str, Any]]):
+        if not events:
+            return
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(insert(AuditLog.__table__).values(events))
+                await db.commit()
+        except Exception as e:
+            self.dropped_count += len(events)
+            logger.error(f"Error writing {len(events)} audit events: {str(e)}")
+
+    async def _run(self):
+        while True:
+            first = await self._queue.get()
+            if first is _STOP:
+                return
+
+            # Give the batch time to fill unless it already has
+            if self._queue.qsize() < self.batch_size - 1:
+                try:
+                    await asyncio.wait_for(
+                        self._batch_ready.wait(), timeout=self.flush_interval_seconds
+                    )
+                except asyncio.TimeoutError:
+                    pass
+            self._batch_ready.clear()
+
+            batch = [first, *self._take(self.batch_size - 1)]
+            stopping = _STOP in batch
+            await self._write([event for event in batch if event is not _STOP])
+            if stopping:
+                return
+
+    async def flush(self) -> int:
+        """
+        Write all queued events now
+
+        Returns:
+            Number of events flushed
+        """
+        flushed = 0
+        while True:
+            batch = [
+                event for event in self._take(self.batch_size) if event is not _STOP
+            ]
+            if not batch:
+                return flushed
+            await self._write(batch)
+            flushed += len(batch)
+
+    def start(self):
+        """Start the background writer"""
+        if self._task is not None and not self._task.done():
+            return
+        self._batch_ready = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the background writer after flushing queued events"""
+        if self._task is not None:
+            # Queued last so everything logged before it is written
+            await self._queue.put(_STOP)
+            self._batch_ready.set()
+            await self._task
+            self._task = None
+            self._batch_ready = None
+        await self.flush()
 
 
 # Global audit service instance
-audit_service = AuditService()
+audit_service = AuditService(
+    batch_size=settings.AUDIT_LOG_BATCH_SIZE,
+    flush_interval_seconds=settings.AUDIT_LOG_FLUSH_INTERVAL_SECONDS,
+    max_queue_size=settings.AUDIT_LOG_MAX_QUEUE_SIZE,
+    overflow_policy=settings.AUDIT_LOG_OVERFLOW_POLICY,
+    block_timeout_seconds=settings.AUDIT_LOG_BLOCK_TIMEOUT_SECONDS,
+)
@@ -3,23 +3,24 @@ Authentication service for user registration, login, and session management
 """
 
 from datetime import datetime, timedelta
-from uuid import UUID
+from uuid import UUID, uuid4
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, update
 from fastapi import HTTPException, status
 from typing import Optional, Tuple
+import logging
 
+from app.core.config import settings
 from app.models import (
     User,
     Session,
     EmailVerificationToken,
     PasswordResetToken,
-    Application,
 )
 from app.schemas import UserCreate, UserLogin
 from app.utils import (
-    hash_password,
-    verify_password,
+    hash_password_async,
+    verify_and_rehash_password_async,
     validate_password_strength,
     create_access_token,
     create_refresh_token,
@@ -27,16 +28,33 @@ from app.utils import (
     generate_secure_token,
     hash_token,
     verify_token_hash,
+    generate_opaque_refresh_token,
+    parse_opaque_refresh_token,
 )
-from app.services.email import email_service
+from app.services.email import (
+    TEMPLATE_PASSWORD_RESET,
+    TEMPLATE_VERIFICATION,
+    build_password_reset_url,
+    build_verification_url,
+)
+from app.services.audit import audit_service
+from app.services.email_outbox import email_outbox
 from app.services.rate_limiter import brute_force_protection
+from app.services.session_cache import CachedSession, session_cache
+
+logger = logging.getLogger(__name__)
 
 
 class AuthService:
     """Authentication service"""
 
     async def register_user(
-        self, db: AsyncSession, app_id: str, user_data: UserCreate
+        self,
+        db: AsyncSession,
+        app_id: str,
+        user_data: UserCreate,
+        ip_address: Optional[str] = None,
+        user_agent: Optional[str] = None,
     ) -> User:
         """
         Register a new user
@@ -45,6 +63,8 @@ class AuthService:
             db: Database session
             app_id: Application ID
             user_data: User creation data
+            ip_address: Client IP address
+            user_agent: Client user agent
 
         Returns:
             Created user object
@@ -72,7 +92,7 @@ class AuthService:
             )
 
         # Hash password
-        password_hash = hash_password(user_data.password)
+        password_hash = await hash_password_async(user_data.password, partition=app_id)
 
         # Create user
         user = User(
@@ -95,29 +115,30 @@ class AuthService:
         )
         db.add(verification_record)
 
-        # Get application name for email
-        app_stmt = select(Application).where(Application.app_id == app_id)
-        app_result = await db.execute(app_stmt)
-        application = app_result.scalar_one_or_none()
-        app_name = application.name if application else "DevAuth"
-
-        # Send verification email (async, don't wait)
-        try:
-            await email_service.send_verification_email(
-                to_email=user.email,
-                app_name=app_name,
-                verification_token=verification_token,
-            )
-        except Exception as e:
-            # Log error but don't fail registration
-            import logging
-
-            logger = logging.getLogger(__name__)
-            logger.error(f"Failed to send verification email: {str(e)}")
+        # Queue verification email with the token, sent in the background
+        # (the dispatcher brands it with the app name)
+        email_outbox.enqueue(
+            db,
+            to_email=user.email,
+            template=TEMPLATE_VERIFICATION,
+            context={
+                "verification_url": build_verification_url(verification_token),
+            },
+            app_id=app_id,
+        )
 
         await db.commit()
+        email_outbox.notify()
         await db.refresh(user)
 
+        await audit_service.log_event(
+            audit_service.ACTION_SIGNUP,
+            user_id=user.id,
+            app_id=app_id,
+            ip_address=ip_address,
+            user_agent=user_agent,
+        )
+
         return user
 
     async def verify_email(self, db: AsyncSession, app_id: str, token: str) -> bool:
@@ -217,23 +238,60 @@ class AuthService:
         )
         db.add(verification_record)
 
-        # Get application name
-        app_stmt = select(Application).where(Application.app_id == app_id)
-        app_result = await db.execute(app_stmt)
-        application = app_result.scalar_one_or_none()
-        app_name = application.name if application else "DevAuth"
-
-        # Send email
-        await email_service.send_verification_email(
+        # Queue email
+        email_outbox.enqueue(
+            db,
             to_email=user.email,
-            app_name=app_name,
-            verification_token=verification_token,
+            template=TEMPLATE_VERIFICATION,
+            context={
+                "verification_url": build_verification_url(verification_token),
+            },
+            app_id=app_id,
         )
 
         await db.commit()
+        email_outbox.notify()
 
         return True
 
+    @staticmethod
+    def _issue_refresh_token(
+        user_id: Optional[UUID], app_id: str, session_id: UUID
+    ) -> str:
+        """Create a refresh token in the configured format
+
+        The user is only needed for JWTs; opaque tokens don't carry it.
+        """
+        if settings.REFRESH_TOKEN_FORMAT == "opaque":
+            return generate_opaque_refresh_token(session_id)
+        return create_refresh_token(
+            user_id=user_id, app_id=app_id, session_id=session_id
+        )
+
+    @staticmethod
+    def _read_refresh_token(
+        refresh_token: str,
+    ) -> Optional[Tuple[UUID, Optional[UUID], Optional[str]]]:
+        """
+        Extract the session reference from a refresh token of either format
+
+        Returns:
+            Tuple of (session_id, user_id, app_id), where user_id and app_id
+            are None for opaque tokens, or None if the token is invalid
+        """
+        session_id = parse_opaque_refresh_token(refresh_token)
+        if session_id is not None:
+            return session_id, None, None
+
+        payload = verify_token(refresh_token)
+        if not payload or payload.get("type") != "refresh":
+            return None
+        return (
+            UUID(payload.get("session_id")),
+            UUID(payload.get("sub")),
+            payload.get("app_id"),
+        )
+
     async def login(
         self,
         db: AsyncSession,
@@ -258,12 +316,22 @@ class AuthService:
         Raises:
             HTTPException: If credentials are invalid or account is locked
         """
-        # Check brute force protection
+        # Check brute force protection before any hashing work
         if ip_address:
             is_locked = await brute_force_protection.check_lockout(
-                credentials.email, ip_address
+                app_id, credentials.email, ip_address
             )
             if is_locked:
+                await audit_service.log_event(
+                    audit_service.ACTION_LOGIN_FAILED,
+                    app_id=app_id,
+                    ip_address=ip_address,
+                    user_agent=user_agent,
+                    metadata={
+                        "email_hash": hash_token(credentials.email.lower()),
+                        "reason": "locked",
+                    },
+                )
                 raise HTTPException(
                     status_code=status.HTTP_429_TOO_MANY_REQUESTS,
                     detail={
@@ -279,18 +347,35 @@ class AuthService:
         result = await db.execute(stmt)
         user = result.scalar_one_or_none()
 
-        # Verify password (even if user doesn't exist to prevent timing attacks)
-        password_valid = False
-        if user:
-            password_valid = verify_password(credentials.password, user.password_hash)
+        # Verify password (against a dummy hash if the user doesn't exist, so
+        # the response time doesn't reveal whether the account exists)
+        password_valid, upgraded_hash = await verify_and_rehash_password_async(
+            credentials.password,
+            user.password_hash if user else None,
+            partition=app_id,
+        )
 
         if not user or not password_valid:
             # Record failed attempt
             if ip_address:
                 await brute_force_protection.record_failed_attempt(
-                    credentials.email, ip_address
+                    app_id, credentials.email, ip_address
                 )
 
+            # Only a hash of the submitted email: failed attempts include
+            # typos and passwords pasted into the email field
+            await audit_service.log_event(
+                audit_service.ACTION_LOGIN_FAILED,
+                user_id=user.id if user else None,
+                app_id=app_id,
+                ip_address=ip_address,
+                user_agent=user_agent,
+                metadata={
+                    "email_hash": hash_token(credentials.email.lower()),
+                    "reason": "invalid_credentials",
+                },
+            )
+
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail={
@@ -301,7 +386,13 @@ class AuthService:
 
         # Clear failed attempts on success
         if ip_address:
-            await brute_force_protection.clear_attempts(credentials.email, ip_address)
+            await brute_force_protection.clear_attempts(
+                app_id, credentials.email, ip_address
+            )
+
+        # Upgrade the stored hash if the hashing policy has changed
+        if upgraded_hash:
+            user.password_hash = upgraded_hash
 
         # Update last login
         user.last_login_at = datetime.utcnow()
@@ -311,38 +402,36 @@ class AuthService:
             user_id=user.id, app_id=app_id, email=user.email
         )
 
-        refresh_token_plain = create_refresh_token(
-            user_id=user.id,
-            app_id=app_id,
-            session_id=UUID(
-                "00000000-0000-0000-0000-000000000000"
-            ),  # Will be updated after session creation
-        )
-
-        refresh_token_hash = hash_token(refresh_token_plain)
+        # Session ID is generated up front so the refresh token is signed
+        # once and the session row is written with a single INSERT
+        session_id = uuid4()
+        refresh_token_plain = self._issue_refresh_token(user.id, app_id, session_id)
         expires_at = datetime.utcnow() + timedelta(days=7)
 
         # Create session
         session = Session(
+            id=session_id,
             user_id=user.id,
             app_id=app_id,
-            refresh_token_hash=refresh_token_hash,
+            refresh_token_hash=hash_token(refresh_token_plain),
             user_agent=user_agent,
             ip_address=ip_address,
             expires_at=expires_at,
         )
         db.add(session)
-        await db.flush()
-
-        # Update refresh token with session ID (requires re-encoding)
-        refresh_token_plain = create_refresh_token(
-            user_id=user.id, app_id=app_id, session_id=session.id
-        )
-        refresh_token_hash = hash_token(refresh_token_plain)
-        session.refresh_token_hash = refresh_token_hash
 
         await db.commit()
         await db.refresh(user)
+        await session_cache.set(CachedSession.from_session(session, user.email))
+
+        await audit_service.log_event(
+            audit_service.ACTION_LOGIN,
+            user_id=user.id,
+            app_id=app_id,
+            ip_address=ip_address,
+            user_agent=user_agent,
+            metadata={"session_id": str(session_id)},
+        )
 
         return user, access_token, refresh_token_plain
 
@@ -364,14 +453,15 @@ class AuthService:
             HTTPException: If token is invalid or expired
         """
         # Verify token
-        payload = verify_token(refresh_token)
-        if not payload or payload.get("type") != "refresh":
+        token = self._read_refresh_token(refresh_token)
+        if token is None:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail={"code": "INVALID_TOKEN", "message": "Invalid refresh token"},
             )
 
-        if payload.get("app_id") != app_id:
+        session_id, user_id, token_app_id = token
+        if token_app_id is not None and token_app_id != app_id:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail={
@@ -380,21 +470,30 @@ class AuthService:
                 },
             )
 
-        session_id = UUID(payload.get("session_id"))
-        user_id = UUID(payload.get("sub"))
-
-        # Find session
-        stmt = select(Session).where(
-            Session.id == session_id,
-            Session.user_id == user_id,
-            Session.app_id == app_id,
-            Session.revoked.is_(False),
-            Session.expires_at > datetime.utcnow(),
-        )
-        result = await db.execute(stmt)
-        session = result.scalar_one_or_none()
+        if settings.REFRESH_TOKEN_ROTATION:
+            return await self._rotate_refresh_token(
+                db, app_id, session_id, user_id, refresh_token
+            )
 
-        if not session:
+        # Find session, from the session cache when possible
+        session = await session_cache.get(session_id)
+        if session is None:
+            stmt = (
+                select(Session, User.email)
+                .join(User, User.id == Session.user_id)
+                .where(Session.id == session_id)
+            )
+            row = (await db.execute(stmt)).first()
+            if row:
+                session = CachedSession.from_session(row.Session, row.email)
+                await session_cache.set(session, overwrite=False)
+
+        if (
+            not session
+            or not session.active
+            or (user_id is not None and session.user_id != user_id)
+            or session.app_id != app_id
+        ):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail={
@@ -410,25 +509,206 @@ class AuthService:
                 detail={"code": "INVALID_TOKEN", "message": "Invalid refresh token"},
             )
 
-        # Get user
-        user_stmt = select(User).where(User.id == user_id)
-        user_result = await db.execute(user_stmt)
-        user = user_result.scalar_one()
-
         # Generate new access token
         access_token = create_access_token(
-            user_id=user.id, app_id=app_id, email=user.email
+            user_id=session.user_id, app_id=app_id, email=session.email
         )
 
         # Optionally rotate refresh token (for MVP, we'll keep same token)
         # In production, you might want to rotate it for security
         new_refresh_token = None
 
+        return access_token, new_refresh_token
+
+    async def _rotate_refresh_token(
+        self,
+        db: AsyncSession,
+        app_id: str,
+        session_id: UUID,
+        user_id: Optional[UUID],
+        refresh_token: str,
+    ) -> Tuple[str, str]:
+        """
+        Exchange a refresh token for a new access and refresh token
+
+        All refresh tokens of a session form one family; only the latest is
+        valid. The swap is a single conditional UPDATE on the current token
+        hash, so of two concurrent refreshes with the same token exactly one
+        succeeds. The loser presents the token the winner just replaced and
+        gets a 409 for REFRESH_TOKEN_REUSE_GRACE_SECONDS, so the session
+        survives and the client can retry with the winner's token. Presenting
+        an older token of a live session otherwise means it was leaked or
+        replayed, and the whole session is revoked.
+
+        Returns:
+            Tuple of (access_token, new_refresh_token)
+
+        Raises:
+            HTTPException: If the token is invalid, expired or reused, or
+                was rotated by a concurrent request (409)
+        """
+        invalid_session = HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail={"code": "INVALID_TOKEN", "message": "Session not found or expired"},
+        )
+
+        # A JWT's signature proves we issued it; an opaque token only names a
+        # session until its secret is checked against the stored hashes
+        signed = user_id is not None
+
+        # Revoked sessions are rejected from the cache without a write
+        cached = await session_cache.get(session_id)
+        if cached:
+            if user_id is None:
+                user_id = cached.user_id
+            if (
+                not cached.active
+                or cached.user_id != user_id
+                or cached.app_id != app_id
+            ):
+                raise invalid_session
+
+        if user_id is None and settings.REFRESH_TOKEN_FORMAT != "opaque":
+            # An opaque token exchanged after switching to JWTs, which need
+            # the user (otherwise it comes back from the UPDATE below)
+            user_id = (
+                await db.execute(
+                    select(Session.user_id).where(
+                        Session.id == session_id, Session.app_id == app_id
+                    )
+                )
+            ).scalar_one_or_none()
+            if user_id is None:
+                raise invalid_session
+
+        now = datetime.utcnow()
+        new_refresh_token = self._issue_refresh_token(user_id, app_id, session_id)
+        new_refresh_token_hash = hash_token(new_refresh_token)
+        refresh_token_hash = hash_token(refresh_token)
+
+        conditions = [
+            Session.id == session_id,
+            Session.app_id == app_id,
+            Session.refresh_token_hash == refresh_token_hash,
+            Session.revoked.is_(False),
+            Session.expires_at > now,
+        ]
+        if user_id is not None:
+            conditions.append(Session.user_id == user_id)
+        stmt = (
+            update(Session)
+            .where(*conditions)
+            .values(
+                previous_refresh_token_hash=Session.refresh_token_hash,
+                refresh_token_hash=new_refresh_token_hash,
+                rotated_at=now,
+            )
+            .returning(Session.user_id, Session.expires_at)
+        )
+        rotated = (await db.execute(stmt)).first()
+
+        if rotated is None:
+            grace_start = now - timedelta(
+                seconds=settings.REFRESH_TOKEN_REUSE_GRACE_SECONDS
+            )
+            current = (
+                await db.execute(
+                    select(
+                        Session.previous_refresh_token_hash,
+                        (Session.rotated_at > grace_start).label("in_grace"),
+                    ).where(
+                        Session.id == session_id,
+                        Session.app_id == app_id,
+                        Session.revoked.is_(False),
+                        Session.expires_at > now,
+                    )
+                )
+            ).first()
+            await db.rollback()
+            if current is None:
+                raise invalid_session
+
+            replaced = current.previous_refresh_token_hash == refresh_token_hash
+            if replaced and current.in_grace:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail={
+                        "code": "REFRESH_TOKEN_ROTATED",
+                        "message": "Refresh token was just rotated by a concurrent request",
+                    },
+                )
+            if not signed and not replaced:
+                # Someone who only knows the session ID must not be able to
+                # revoke it
+                raise invalid_session
+
+            # Issued by us but not the current token of a live session: an
+            # old token of the family is being reused
+            revoke_stmt = (
+                update(Session)
+                .where(
+                    Session.id == session_id,
+                    Session.app_id == app_id,
+                    Session.revoked.is_(False),
+                    Session.expires_at > now,
+                )
+                .values(revoked=True, revoked_at=now)
+                .returning(Session.user_id, Session.expires_at)
+            )
+            revoked = (await db.execute(revoke_stmt)).first()
+            await db.commit()
+            if revoked is not None:
+                logger.warning(
+                    f"Refresh token reuse detected, revoked session {session_id}"
+                )
+                await session_cache.revoke(
+                    [
+                        CachedSession(
+                            id=session_id,
+                            user_id=revoked.user_id,
+                            app_id=app_id,
+                            refresh_token_hash="",
+                            expires_at=revoked.expires_at,
+                            revoked=True,
+                            email="",
+                        )
+                    ]
+                )
+            raise invalid_session
+
         await db.commit()
+        user_id = rotated.user_id
+
+        if cached:
+            email = cached.email
+        else:
+            email = (
+                await db.execute(select(User.email).where(User.id == user_id))
+            ).scalar_one()
+
+        await session_cache.set(
+            CachedSession(
+                id=session_id,
+                user_id=user_id,
+                app_id=app_id,
+                refresh_token_hash=new_refresh_token_hash,
+                expires_at=rotated.expires_at,
+                revoked=False,
+                email=email,
+            )
+        )
 
+        access_token = create_access_token(user_id=user_id, app_id=app_id, email=email)
         return access_token, new_refresh_token
 
-    async def logout(self, db: AsyncSession, app_id: str, refresh_token: str) -> bool:
+    async def logout(
+        self,
+        db: AsyncSession,
+        app_id: str,
+        refresh_token: str,
+        ip_address: Optional[str] = None,
+        user_agent: Optional[str] = None,
+    ) -> bool:
         """
         Logout user by revoking session
 
@@ -436,36 +716,61 @@ class AuthService:
             db: Database session
             app_id: Application ID
             refresh_token: Refresh token string
+            ip_address: Client IP address
+            user_agent: Client user agent
 
         Returns:
             True if logged out successfully
         """
         # Decode token to get session ID
-        payload = verify_token(refresh_token)
-        if not payload or payload.get("type") != "refresh":
+        token = self._read_refresh_token(refresh_token)
+        if token is None:
             # If token is invalid, consider it already logged out
             return True
 
-        session_id = UUID(payload.get("session_id"))
+        session_id = token[0]
 
-        # Find and revoke session
+        # Find and revoke session (already revoked sessions too, so a retried
+        # logout writes the revocation through to the cache again)
         stmt = select(Session).where(
             Session.id == session_id,
             Session.app_id == app_id,
-            Session.revoked.is_(False),
         )
         result = await db.execute(stmt)
         session = result.scalar_one_or_none()
 
+        # Opaque tokens aren't signed, so check the secret before acting on
+        # the session they name
+        if session and token[1] is None:
+            if not verify_token_hash(refresh_token, session.refresh_token_hash):
+                session = None
+
         if session:
-            session.revoked = True
-            session.revoked_at = datetime.utcnow()
-            await db.commit()
+            if not session.revoked:
+                session.revoked = True
+                session.revoked_at = datetime.utcnow()
+                await db.commit()
+
+                await audit_service.log_event(
+                    audit_service.ACTION_LOGOUT,
+                    user_id=session.user_id,
+                    app_id=app_id,
+                    ip_address=ip_address,
+                    user_agent=user_agent,
+                    metadata={"session_id": str(session.id)},
+                )
+
+            await session_cache.revoke([CachedSession.from_session(session, "")])
 
         return True
 
     async def request_password_reset(
-        self, db: AsyncSession, app_id: str, email: str
+        self,
+        db: AsyncSession,
+        app_id: str,
+        email: str,
+        ip_address: Optional[str] = None,
+        user_agent: Optional[str] = None,
     ) -> bool:
         """
         Request password reset
@@ -474,6 +779,8 @@ class AuthService:
             db: Database session
             app_id: Application ID
             email: User email
+            ip_address: Client IP address
+            user_agent: Client user agent
 
         Returns:
             True if email sent (even if user doesn't exist for security)
@@ -497,23 +804,38 @@ class AuthService:
         )
         db.add(reset_record)
 
-        # Get application name
-        app_stmt = select(Application).where(Application.app_id == app_id)
-        app_result = await db.execute(app_stmt)
-        application = app_result.scalar_one_or_none()
-        app_name = application.name if application else "DevAuth"
-
-        # Send email
-        await email_service.send_password_reset_email(
-            to_email=user.email, app_name=app_name, reset_token=reset_token
+        # Queue email
+        email_outbox.enqueue(
+            db,
+            to_email=user.email,
+            template=TEMPLATE_PASSWORD_RESET,
+            context={
+                "reset_url": build_password_reset_url(reset_token),
+            },
+            app_id=app_id,
         )
 
         await db.commit()
+        email_outbox.notify()
+
+        await audit_service.log_event(
+            audit_service.ACTION_PASSWORD_RESET_REQUEST,
+            user_id=user.id,
+            app_id=app_id,
+            ip_address=ip_address,
+            user_agent=user_agent,
+        )
 
         return True
 
     async def confirm_password_reset(
-        self, db: AsyncSession, app_id: str, token: str, new_password: str
+        self,
+        db: AsyncSession,
+        app_id: str,
+        token: str,
+        new_password: str,
+        ip_address: Optional[str] = None,
+        user_agent: Optional[str] = None,
     ) -> bool:
         """
         Confirm password reset and update password
@@ -523,6 +845,8 @@ class AuthService:
             app_id: Application ID
             token: Password reset token
             new_password: New password
+            ip_address: Client IP address
+            user_agent: Client user agent
 
         Returns:
             True if password reset successfully
@@ -569,7 +893,7 @@ class AuthService:
 
         # Update password
         user = reset_token.user
-        user.password_hash = hash_password(new_password)
+        user.password_hash = await hash_password_async(new_password, partition=app_id)
 
         # Revoke all user sessions
         sessions_stmt = select(Session).where(
@@ -583,6 +907,18 @@ class AuthService:
             session.revoked_at = datetime.utcnow()
 
         await db.commit()
+        await session_cache.revoke(
+            [CachedSession.from_session(session, user.email) for session in sessions]
+        )
+
+        await audit_service.log_event(
+            audit_service.ACTION_PASSWORD_RESET_CONFIRM,
+            user_id=user.id,
+            app_id=app_id,
+            ip_address=ip_address,
+            user_agent=user_agent,
+            metadata={"sessions_revoked": len(sessions)},
+        )
 
         return True
 
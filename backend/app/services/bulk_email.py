@@ -0,0 +1,334 @@
+"""
+Bulk email jobs for the developer portal
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Set
+from uuid import UUID, uuid4
+
+from fastapi import HTTPException, status
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.redis import get_redis
+from app.models import EmailOutbox, EmailVerificationToken, User
+from app.models.email_outbox import (
+    EMAIL_OUTBOX_DEAD,
+    EMAIL_OUTBOX_PENDING,
+    EMAIL_PRIORITY_BULK,
+)
+from app.services.application import application_service
+from app.services.email import build_verification_url
+from app.services.email_outbox import email_outbox, encrypt_context
+from app.services.email_templates import TEMPLATE_VERIFICATION
+from app.utils import generate_secure_token, hash_token
+
+logger = logging.getLogger(__name__)
+
+JOB_STATUS_RUNNING = "running"
+JOB_STATUS_COMPLETED = "completed"
+JOB_STATUS_FAILED = "failed"
+
+# Job progress is kept this long after the job starts
+_JOB_TTL_SECONDS = 7 * 24 * 3600
+
+# Extend or release the per-app job lock if this job still holds it.
+# KEYS[1] = lock key
+# ARGV = job ID, lease (ms; 0 releases the lock)
+# Returns 1 if the lock was held
+_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) ~= ARGV[1] then
+    return 0
+end
+if tonumber(ARGV[2]) > 0 then
+    redis.call('PEXPIRE', KEYS[1], ARGV[2])
+else
+    redis.call('DEL', KEYS[1])
+end
+return 1
+"""
+
+
+class BulkEmailService:
+    """
+    Re-verification campaigns over all unverified users of an application
+
+    A job walks the users in keyset-paginated chunks and writes each
+    chunk's verification tokens and outbox rows with one multi-row INSERT
+    per table, so a chunk costs a handful of statements regardless of its
+    size. Delivery goes through the outbox dispatcher and its pooled SMTP
+    connections at bulk priority, behind transactional email. Progress is
+    kept in Redis; delivery counts come from the job's outbox rows.
+
+    One job runs per application at a time. The lock is a short lease the
+    running job renews every third of ``lock_lease_seconds``, so a job lost
+    with its process stops blocking new jobs once the lease runs out.
+    """
+
+    def __init__(self, chunk_size: int = 1000, lock_lease_seconds: float = 60.0):
+        self.chunk_size = chunk_size
+        self.lock_lease_seconds = lock_lease_seconds
+        self._tasks: Set[asyncio.Task] = set()
+
+    @staticmethod
+    def _job_key(job_id: UUID) -> str:
+        return f"bulk_email_job:{job_id}"
+
+    @staticmethod
+    def _lock_key(app_id: str) -> str:
+        return f"bulk_email_lock:{app_id}"
+
+    async def start_reverification(
+        self, db: AsyncSession, developer_id: UUID, app_id: str
+    ) -> Dict[str, Any]:
+        """
+        Start re-sending verification emails to all unverified users
+
+        Args:
+            db: Database session
+            developer_id: Developer ID (must own the application)
+            app_id: Application ID
+
+        Returns:
+            Job progress
+
+        Raises:
+            HTTPException: If the application is not found or a job is
+                already running for it
+        """
+        await application_service.get_application(
+            db=db, developer_id=developer_id, app_id=app_id
+        )
+
+        total_stmt = select(func.count()).where(
+            User.app_id == app_id, User.email_verified.is_(False)
+        )
+        total = (await db.execute(total_stmt)).scalar_one()
+
+        job_id = uuid4()
+        redis_client = await get_redis()
+        locked = await redis_client.set(
+            self._lock_key(app_id),
+            str(job_id),
+            nx=True,
+            px=int(self.lock_lease_seconds * 1000),
+        )
+        if not locked:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail={
+                    "code": "BULK_JOB_RUNNING",
+                    "message": "A bulk email job is already running for this application",
+                },
+            )
+
+        job = {
+            "job_id": str(job_id),
+            "app_id": app_id,
+            "status": JOB_STATUS_RUNNING,
+            "total": total,
+            "queued": 0,
+            "started_at": datetime.utcnow().isoformat(),
+        }
+        await redis_client.hset(self._job_key(job_id), mapping=job)
+        await redis_client.expire(self._job_key(job_id), _JOB_TTL_SECONDS)
+
+        task = asyncio.create_task(self._run(job_id, app_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+        return await self.get_job(db, developer_id, app_id, job_id)
+
+    async def _queue_chunk(
+        self, db: AsyncSession, job_id: UUID, app_id: str, users: list
+    ):
+        now = datetime.utcnow()
+        expires_at = now + timedelta(hours=48)
+        tokens = []
+        messages = []
+        for user_id, email in users:
+            verification_token = generate_secure_token(32)
+            tokens.append(
+                {
+                    "id": uuid4(),
+                    "user_id": user_id,
+                    "token_hash": hash_token(verification_token),
+                    "expires_at": expires_at,
+                    "used": False,
+                }
+            )
+            messages.append(
+                {
+                    "id": uuid4(),
+                    "app_id": app_id,
+                    "to_email": email,
+                    "template": TEMPLATE_VERIFICATION,
+                    "context": encrypt_context(
+                        {"verification_url": build_verification_url(verification_token)}
+                    ),
+                    "status": EMAIL_OUTBOX_PENDING,
+                    "priority": EMAIL_PRIORITY_BULK,
+                    "batch_id": job_id,
+                    "attempts": 0,
+                    "next_attempt_at": now,
+                }
+            )
+
+        await db.execute(insert(EmailVerificationToken.__table__).values(tokens))
+        await db.execute(insert(EmailOutbox.__table__).values(messages))
+        await db.commit()
+
+    async def _update_lock(self, job_id: UUID, app_id: str, lease_ms: int) -> bool:
+        redis_client = await get_redis()
+        script = redis_client.register_script(_LOCK_SCRIPT)
+        held = await script(keys=[self._lock_key(app_id)], args=[str(job_id), lease_ms])
+        return bool(held)
+
+    async def _heartbeat(self, job_id: UUID, app_id: str):
+        """Keep renewing the job lock while the job runs"""
+        lease_ms = int(self.lock_lease_seconds * 1000)
+        while True:
+            await asyncio.sleep(self.lock_lease_seconds / 3)
+            try:
+                if not await self._update_lock(job_id, app_id, lease_ms):
+                    logger.warning(f"Bulk email job {job_id} lost its lock")
+                    return
+            except Exception as e:
+                logger.warning(f"Bulk email job {job_id} lock renewal failed: {str(e)}")
+
+    async def _run(self, job_id: UUID, app_id: str):
+        redis_client = await get_redis()
+        job_key = self._job_key(job_id)
+        last_user_id: Optional[UUID] = None
+        queued = 0
+        heartbeat = asyncio.create_task(self._heartbeat(job_id, app_id))
+
+        try:
+            async with AsyncSessionLocal() as db:
+                while True:
+                    stmt = (
+                        select(User.id, User.email)
+                        .where(User.app_id == app_id, User.email_verified.is_(False))
+                        .order_by(User.id)
+                        .limit(self.chunk_size)
+                    )
+                    if last_user_id is not None:
+                        stmt = stmt.where(User.id > last_user_id)
+                    users = (await db.execute(stmt)).all()
+                    if not users:
+                        break
+
+                    await self._queue_chunk(db, job_id, app_id, users)
+                    last_user_id = users[-1][0]
+                    queued += len(users)
+                    await redis_client.hset(job_key, "queued", queued)
+                    email_outbox.notify()
+
+            await redis_client.hset(
+                job_key,
+                mapping={
+                    "status": JOB_STATUS_COMPLETED,
+                    "finished_at": datetime.utcnow().isoformat(),
+                },
+            )
+            logger.info(f"Bulk email job {job_id} queued {queued} emails for {app_id}")
+        except asyncio.CancelledError:
+            await redis_client.hset(
+                job_key,
+                mapping={
+                    "status": JOB_STATUS_FAILED,
+                    "error": "Interrupted by shutdown",
+                    "finished_at": datetime.utcnow().isoformat(),
+                },
+            )
+            raise
+        except Exception as e:
+            logger.error(f"Bulk email job {job_id} failed: {str(e)}")
+            await redis_client.hset(
+                job_key,
+                mapping={
+                    "status": JOB_STATUS_FAILED,
+                    "error": str(e)[:500],
+                    "finished_at": datetime.utcnow().isoformat(),
+                },
+            )
+        finally:
+            heartbeat.cancel()
+            await self._update_lock(job_id, app_id, 0)
+
+    async def get_job(
+        self, db: AsyncSession, developer_id: UUID, app_id: str, job_id: UUID
+    ) -> Dict[str, Any]:
+        """
+        Get the progress of a bulk email job
+
+        Args:
+            db: Database session
+            developer_id: Developer ID (must own the application)
+            app_id: Application ID
+            job_id: Job ID
+
+        Returns:
+            Job progress
+
+        Raises:
+            HTTPException: If the application or job is not found
+        """
+        await application_service.get_application(
+            db=db, developer_id=developer_id, app_id=app_id
+        )
+
+        redis_client = await get_redis()
+        job = await redis_client.hgetall(self._job_key(job_id))
+        if not job or job["app_id"] != app_id:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail={"code": "JOB_NOT_FOUND", "message": "Bulk email job not found"},
+            )
+
+        # Sent emails are deleted from the outbox, the rest are still there
+        counts_stmt = (
+            select(EmailOutbox.status, func.count())
+            .where(EmailOutbox.batch_id == job_id)
+            .group_by(EmailOutbox.status)
+        )
+        counts = dict((await db.execute(counts_stmt)).all())
+        queued = int(job["queued"])
+        pending = counts.get(EMAIL_OUTBOX_PENDING, 0)
+        failed = counts.get(EMAIL_OUTBOX_DEAD, 0)
+
+        return {
+            "job_id": job_id,
+            "app_id": app_id,
+            "status": job["status"],
+            "total": int(job["total"]),
+            "queued": queued,
+            "delivered": max(queued - pending - failed, 0),
+            "pending": pending,
+            "failed": failed,
+            "started_at": datetime.fromisoformat(job["started_at"]),
+            "finished_at": (
+                datetime.fromisoformat(job["finished_at"])
+                if job.get("finished_at")
+                else None
+            ),
+            "error": job.get("error"),
+        }
+
+    async def stop(self):
+        """Cancel running jobs (their queued chunks stay queued)"""
+        for task in list(self._tasks):
+            task.cancel()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+# Global bulk email service instance
+bulk_email_service = BulkEmailService(
+    chunk_size=settings.BULK_EMAIL_CHUNK_SIZE,
+    lock_lease_seconds=settings.BULK_EMAIL_LOCK_LEASE_SECONDS,
+)
@@ -9,8 +9,8 @@ from fastapi import HTTPException, status
 from app.models import Developer
 from app.schemas import DeveloperSignup, DeveloperLogin
 from app.utils import (
-    hash_password,
-    verify_password,
+    hash_password_async,
+    verify_and_rehash_password_async,
     validate_password_strength,
     create_access_token,
 )
@@ -54,7 +54,7 @@ class DeveloperAuthService:
         # Create developer
         developer = Developer(
             email=developer_data.email,
-            password_hash=hash_password(developer_data.password),
+            password_hash=await hash_password_async(developer_data.password),
             name=developer_data.name,
         )
         db.add(developer)
@@ -81,9 +81,11 @@ class DeveloperAuthService:
         result = await db.execute(stmt)
         developer = result.scalar_one_or_none()
 
-        if not developer or not verify_password(
-            credentials.password, developer.password_hash
-        ):
+        # Unknown developers are checked against a dummy hash (same latency)
+        password_valid, upgraded_hash = await verify_and_rehash_password_async(
+            credentials.password, developer.password_hash if developer else None
+        )
+        if not developer or not password_valid:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail={
@@ -92,6 +94,11 @@ class DeveloperAuthService:
                 },
             )
 
+        # Upgrade the stored hash if the hashing policy has changed
+        if upgraded_hash:
+            developer.password_hash = upgraded_hash
+            await db.commit()
+
         # Generate access token (simpler token for portal, no app_id)
         access_token = create_access_token(
             user_id=developer.id,
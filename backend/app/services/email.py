@@ -2,15 +2,37 @@
 Email service for sending verification and password reset emails
 """
 
-import aiosmtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from app.core.config import settings
+from app.services.email_templates import (
+    DEFAULT_APP_NAME,
+    TEMPLATE_PASSWORD_RESET,
+    TEMPLATE_VERIFICATION,
+    RenderedEmail,
+    get_template,
+)
+from app.services.smtp_pool import SMTPConnectionPool
 import logging
-from typing import Optional
+from typing import Any, Dict, Optional
 
 logger = logging.getLogger(__name__)
 
+# Default frontend URL for links in emails
+DEFAULT_BASE_URL = "https://app.devauth.dev"
+
+
+def build_verification_url(
+    verification_token: str, base_url: Optional[str] = None
+) -> str:
+    """Build the email verification link for a token"""
+    return f"{base_url or DEFAULT_BASE_URL}/verify-email?token={verification_token}"
+
+
+def build_password_reset_url(reset_token: str, base_url: Optional[str] = None) -> str:
+    """Build the password reset link for a token"""
+    return f"{base_url or DEFAULT_BASE_URL}/reset-password?token={reset_token}"
+
 
 class EmailService:
     """Email service for sending transactional emails"""
@@ -22,6 +44,17 @@ class EmailService:
         self.smtp_password = settings.SMTP_PASSWORD
         self.from_email = settings.SMTP_FROM_EMAIL
         self.use_tls = settings.SMTP_USE_TLS
+        self.pool = SMTPConnectionPool(
+            hostname=self.smtp_host,
+            port=self.smtp_port,
+            username=self.smtp_user,
+            password=self.smtp_password,
+            use_tls=self.use_tls,
+            max_connections=settings.SMTP_POOL_MAX_CONNECTIONS,
+            max_messages_per_connection=settings.SMTP_POOL_MAX_MESSAGES_PER_CONNECTION,
+            idle_timeout_seconds=settings.SMTP_POOL_IDLE_TIMEOUT_SECONDS,
+            timeout=settings.SMTP_TIMEOUT_SECONDS,
+        )
 
     async def send_email(
         self,
@@ -44,6 +77,34 @@ class EmailService:
         Returns:
             True if sent successfully, False otherwise
         """
+        message = self._build_message(to_email, subject, html_body, text_body)
+
+        for attempt in range(max_retries):
+            try:
+                await self._deliver(message)
+                logger.info(f"Email sent successfully to {to_email}")
+                return True
+            except Exception as e:
+                logger.error(f"Email send attempt {attempt + 1} failed: {str(e)}")
+                if attempt == max_retries - 1:
+                    logger.error(
+                        f"Failed to send email to {to_email} after {max_retries} attempts"
+                    )
+                    return False
+                # Wait before retry (exponential backoff)
+                import asyncio
+
+                await asyncio.sleep(2**attempt)
+
+        return False
+
+    def _build_message(
+        self,
+        to_email: str,
+        subject: str,
+        html_body: str,
+        text_body: Optional[str] = None,
+    ) -> MIMEMultipart:
         if text_body is None:
             # Simple HTML to text conversion
             text_body = html_body.replace("<br>", "\n").replace("<br/>", "\n")
@@ -62,120 +123,50 @@ class EmailService:
 
         message.attach(text_part)
         message.attach(html_part)
+        return message
 
-        for attempt in range(max_retries):
-            try:
-                await aiosmtplib.send(
-                    message,
-                    hostname=self.smtp_host,
-                    port=self.smtp_port,
-                    username=self.smtp_user,
-                    password=self.smtp_password,
-                    use_tls=self.use_tls,
-                )
-                logger.info(f"Email sent successfully to {to_email}")
-                return True
-            except Exception as e:
-                logger.error(f"Email send attempt {attempt + 1} failed: {str(e)}")
-                if attempt == max_retries - 1:
-                    logger.error(
-                        f"Failed to send email to {to_email} after {max_retries} attempts"
-                    )
-                    return False
-                # Wait before retry (exponential backoff)
-                import asyncio
-
-                await asyncio.sleep(2**attempt)
+    async def _deliver(self, message: MIMEMultipart):
+        await self.pool.send(message)
 
-        return False
+    async def close(self):
+        """Close pooled SMTP connections"""
+        await self.pool.close()
 
-    def _render_verification_email(
-        self, app_name: str, verification_url: str
-    ) -> tuple[str, str]:
+    def render_template(self, template: str, context: Dict[str, Any]) -> RenderedEmail:
         """
-        Render email verification email template
+        Render a named email template
+
+        Batch senders should brand templates through email_template_cache
+        instead, which reuses them across messages.
 
         Args:
-            app_name: Application name
-            verification_url: Email verification URL
+            template: Template name (TEMPLATE_VERIFICATION or
+                TEMPLATE_PASSWORD_RESET)
+            context: Template variables (app_name and the link)
 
         Returns:
-            Tuple of (subject, html_body)
-        """
-        subject = f"Verify your email for {app_name}"
-        html_body = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="utf-8">
-            <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        </head>
-        <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
-            <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
-                <h1 style="color: #4A90E2;">Verify Your Email</h1>
-                <p>Thank you for signing up for {app_name}!</p>
-                <p>Please click the button below to verify your email address:</p>
-                <p style="text-align: center; margin: 30px 0;">
-                    <a href="{verification_url}" 
-                       style="background-color: #4A90E2; color: white; padding: 12px 24px; 
-                              text-decoration: none; border-radius: 4px; display: inline-block;">
-                        Verify Email
-                    </a>
-                </p>
-                <p>Or copy and paste this link into your browser:</p>
-                <p style="word-break: break-all; color: #666;">{verification_url}</p>
-                <p style="color: #999; font-size: 12px; margin-top: 30px;">
-                    This link will expire in 48 hours. If you didn't create an account, please ignore this email.
-                </p>
-            </div>
-        </body>
-        </html>
+            Rendered subject, HTML and text bodies
+
+        Raises:
+            ValueError: If the template is unknown
         """
-        return subject, html_body
+        app_name = context.get("app_name", DEFAULT_APP_NAME)
+        return get_template(template).brand(app_name).render(context)
 
-    def _render_password_reset_email(
-        self, app_name: str, reset_url: str
-    ) -> tuple[str, str]:
+    async def deliver(self, to_email: str, rendered: RenderedEmail):
         """
-        Render password reset email template
+        Send a rendered email once, without retrying
 
-        Args:
-            app_name: Application name
-            reset_url: Password reset URL
+        Used by the outbox dispatcher, which schedules retries itself.
 
-        Returns:
-            Tuple of (subject, html_body)
+        Raises:
+            Exception: If delivery fails
         """
-        subject = f"Reset your password for {app_name}"
-        html_body = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="utf-8">
-            <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        </head>
-        <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
-            <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
-                <h1 style="color: #4A90E2;">Reset Your Password</h1>
-                <p>We received a request to reset your password for {app_name}.</p>
-                <p>Click the button below to reset your password:</p>
-                <p style="text-align: center; margin: 30px 0;">
-                    <a href="{reset_url}" 
-                       style="background-color: #4A90E2; color: white; padding: 12px 24px; 
-                              text-decoration: none; border-radius: 4px; display: inline-block;">
-                        Reset Password
-                    </a>
-                </p>
-                <p>Or copy and paste this link into your browser:</p>
-                <p style="word-break: break-all; color: #666;">{reset_url}</p>
-                <p style="color: #999; font-size: 12px; margin-top: 30px;">
-                    This link will expire in 1 hour. If you didn't request a password reset, please ignore this email.
-                </p>
-            </div>
-        </body>
-        </html>
-        """
-        return subject, html_body
+        await self._deliver(
+            self._build_message(
+                to_email, rendered.subject, rendered.html_body, rendered.text_body
+            )
+        )
 
     async def send_verification_email(
         self,
@@ -196,13 +187,17 @@ class EmailService:
         Returns:
             True if sent successfully
         """
-        if base_url is None:
-            base_url = "https://app.devauth.dev"  # Default frontend URL
-
-        verification_url = f"{base_url}/verify-email?token={verification_token}"
-        subject, html_body = self._render_verification_email(app_name, verification_url)
-
-        return await self.send_email(to_email, subject, html_body)
+        rendered = self.render_template(
+            TEMPLATE_VERIFICATION,
+            {
+                "app_name": app_name,
+                "verification_url": build_verification_url(
+                    verification_token, base_url
+                ),
+            },
+        )
+
+        return await self.send_email(to_email, *rendered)
 
     async def send_password_reset_email(
         self,
@@ -223,13 +218,15 @@ class EmailService:
         Returns:
             True if sent successfully
         """
-        if base_url is None:
-            base_url = "https://app.devauth.dev"  # Default frontend URL
-
-        reset_url = f"{base_url}/reset-password?token={reset_token}"
-        subject, html_body = self._render_password_reset_email(app_name, reset_url)
-
-        return await self.send_email(to_email, subject, html_body)
+        rendered = self.render_template(
+            TEMPLATE_PASSWORD_RESET,
+            {
+                "app_name": app_name,
+                "reset_url": build_password_reset_url(reset_token, base_url),
+            },
+        )
+
+        return await self.send_email(to_email, *rendered)
 
 
 # Global email service instance
@@ -0,0 +1,296 @@
+"""
+Durable outbox for transactional email
+"""
+
+import asyncio
+import json
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import bindparam, delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models import EmailOutbox
+from app.models.email_outbox import EMAIL_OUTBOX_DEAD, EMAIL_OUTBOX_PENDING
+from app.services.email import email_service
+from app.services.email_templates import BrandedTemplate, email_template_cache
+from app.utils import decrypt_secret, encrypt_secret
+
+logger = logging.getLogger(__name__)
+
+
+def encrypt_context(context: Dict[str, Any]) -> str:
+    """
+    Encrypt template variables for storage in the outbox
+
+    The variables hold links with raw verification and reset tokens, so
+    they must not sit in the database in the clear.
+    """
+    return encrypt_secret(json.dumps(context))
+
+
+def decrypt_context(ciphertext: str) -> Dict[str, Any]:
+    """Decrypt template variables stored by encrypt_context()"""
+    return json.loads(decrypt_secret(ciphertext))
+
+
+class EmailOutboxDispatcher:
+    """
+    Background dispatcher for the email outbox
+
+    Request handlers only add an outbox row in their own transaction, so
+    they never wait on SMTP and a message is queued if and only if its token
+    was committed. The dispatcher claims due rows in batches (pushing their
+    next_attempt_at past ``claim_timeout_seconds`` so other workers skip
+    them), sends them with at most ``concurrency`` messages in flight,
+    deletes sent rows and reschedules failures with exponential backoff.
+    Rows still failing after ``max_attempts`` are dead-lettered. A worker
+    that dies mid-send leaves its rows to be picked up again once the claim
+    expires, so delivery is at least once.
+
+    Template variables are stored encrypted. Dead-lettered rows are kept for
+    inspection with their variables cleared, so their links can't be
+    recovered (the user has to request a new email).
+    """
+
+    def __init__(
+        self,
+        concurrency: int = 10,
+        batch_size: int = 100,
+        poll_seconds: float = 2.0,
+        max_attempts: int = 5,
+        retry_base_seconds: float = 30.0,
+        claim_timeout_seconds: float = 300.0,
+    ):
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.poll_seconds = poll_seconds
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+        self.claim_timeout_seconds = claim_timeout_seconds
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def enqueue(
+        self,
+        db: AsyncSession,
+        to_email: str,
+        template: str,
+        context: Dict[str, Any],
+        app_id: Optional[str] = None,
+    ) -> EmailOutbox:
+        """
+        Queue an email in the caller's transaction
+
+        The row is written when the caller commits; call notify() afterwards
+        to have it sent without waiting for the next poll.
+
+        Args:
+            db: Database session of the surrounding transaction
+            to_email: Recipient email address
+            template: Email template name
+            context: Template variables
+            app_id: Application the email belongs to
+
+        Returns:
+            Pending outbox row
+        """
+        message = EmailOutbox(
+            app_id=app_id,
+            to_email=to_email,
+            template=template,
+            context=encrypt_context(context),
+            status=EMAIL_OUTBOX_PENDING,
+            attempts=0,
+            next_attempt_at=datetime.utcnow(),
+        )
+        db.add(message)
+        return message
+
+    def notify(self):
+        """Wake the dispatcher after queued emails were committed"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _claim(
+        self,
+    ) -> Tuple[List[EmailOutbox], Dict[Tuple[Optional[str], str], BrandedTemplate]]:
+        now = datetime.utcnow()
+        async with AsyncSessionLocal() as db:
+            stmt = (
+                select(EmailOutbox)
+                .where(
+                    EmailOutbox.status == EMAIL_OUTBOX_PENDING,
+                    EmailOutbox.next_attempt_at <= now,
+                )
+                .order_by(EmailOutbox.priority, EmailOutbox.next_attempt_at)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+            )
+            messages = list((await db.execute(stmt)).scalars().all())
+            if not messages:
+                return [], {}
+
+            claimed_until = now + timedelta(seconds=self.claim_timeout_seconds)
+            await db.execute(
+                update(EmailOutbox)
+                .where(EmailOutbox.id.in_([message.id for message in messages]))
+                .values(
+                    attempts=EmailOutbox.attempts + 1,
+                    next_attempt_at=claimed_until,
+                )
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+
+            # Branded templates of the whole batch, app names in one query
+            templates = await email_template_cache.resolve(
+                db, [(message.app_id, message.template) for message in messages]
+            )
+
+        for message in messages:
+            message.attempts += 1
+        return messages, templates
+
+    async def _send(
+        self,
+        semaphore: asyncio.Semaphore,
+        message: EmailOutbox,
+        template: Optional[BrandedTemplate],
+    ) -> Optional[str]:
+        if template is None:
+            return f"Unknown email template: {message.template}"
+        async with semaphore:
+            try:
+                rendered = template.render(decrypt_context(message.context))
+                await email_service.deliver(message.to_email, rendered)
+            except Exception as e:
+                return str(e) or type(e).__name__
+        return None
+
+    def _retry_delay(self, attempts: int) -> timedelta:
+        return timedelta(seconds=self.retry_base_seconds * 2 ** (attempts - 1))
+
+    async def _record(self, results: List[Tuple[EmailOutbox, Optional[str]]]):
+        sent = [message.id for message, error in results if error is None]
+        now = datetime.utcnow()
+        failed: List[Dict[str, Any]] = []
+        for message, error in results:
+            if error is None:
+                continue
+            dead = message.attempts >= self.max_attempts
+            if dead:
+                logger.error(
+                    f"Dead-lettered email {message.id} ({message.template}) "
+                    f"after {message.attempts} attempts: {error}"
+                )
+            else:
+                logger.warning(
+                    f"Email {message.id} attempt {message.attempts} failed: {error}"
+                )
+            failed.append(
+                {
+                    "message_id": message.id,
+                    "status": EMAIL_OUTBOX_DEAD if dead else EMAIL_OUTBOX_PENDING,
+                    # Dead rows don't keep their (encrypted) links around
+                    "context": None if dead else message.context,
+                    "last_error": error[:1000],
+                    "next_attempt_at": now + self._retry_delay(message.attempts),
+                }
+            )
+
+        table = EmailOutbox.__table__
+        async with AsyncSessionLocal() as db:
+            if sent:
+                await db.execute(delete(table).where(table.c.id.in_(sent)))
+            if failed:
+                await db.execute(
+                    update(table)
+                    .where(table.c.id == bindparam("message_id"))
+                    .values(
+                        status=bindparam("status"),
+                        context=bindparam("context"),
+                        last_error=bindparam("last_error"),
+                        next_attempt_at=bindparam("next_attempt_at"),
+                    ),
+                    failed,
+                )
+            await db.commit()
+
+    async def dispatch(self) -> int:
+        """
+        Send one batch of due emails
+
+        Returns:
+            Number of emails claimed (sent or rescheduled)
+        """
+        messages, templates = await self._claim()
+        if not messages:
+            return 0
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        errors = await asyncio.gather(
+            *(
+                self._send(
+                    semaphore,
+                    message,
+                    templates.get((message.app_id, message.template)),
+                )
+                for message in messages
+            )
+        )
+        await self._record(list(zip(messages, errors)))
+        return len(messages)
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            try:
+                claimed = await self.dispatch()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Email outbox dispatch failed: {str(e)}")
+                claimed = 0
+
+            # Keep draining full batches, otherwise wait for new mail
+            if claimed < self.batch_size:
+                try:
+                    await asyncio.wait_for(
+                        self._wakeup.wait(), timeout=self.poll_seconds
+                    )
+                except asyncio.TimeoutError:
+                    pass
+
+    def start(self):
+        """Start the background dispatch loop"""
+        if self._task is not None and not self._task.done():
+            return
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the dispatch loop; claimed rows are retried after their claim"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._wakeup = None
+
+
+# Global email outbox dispatcher instance
+email_outbox = EmailOutboxDispatcher(
+    concurrency=settings.EMAIL_OUTBOX_CONCURRENCY,
+    batch_size=settings.EMAIL_OUTBOX_BATCH_SIZE,
+    poll_seconds=settings.EMAIL_OUTBOX_POLL_SECONDS,
+    max_attempts=settings.EMAIL_OUTBOX_MAX_ATTEMPTS,
+    retry_base_seconds=settings.EMAIL_OUTBOX_RETRY_BASE_SECONDS,
+    claim_timeout_seconds=settings.EMAIL_OUTBOX_CLAIM_TIMEOUT_SECONDS,
+)
@@ -0,0 +1,290 @@
+"""
+Precompiled transactional email templates with per-app branding
+"""
+
+import html
+import re
+import time
+from collections import OrderedDict
+from string import Template
+from typing import Dict, Iterable, NamedTuple, Optional, Set, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models import Application
+
+# Template names, as stored in the email outbox
+TEMPLATE_VERIFICATION = "verification"
+TEMPLATE_PASSWORD_RESET = "password_reset"
+
+# Shown when an email has no application (or the application is gone)
+DEFAULT_APP_NAME = "DevAuth"
+
+_VERIFICATION_HTML = """
+<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="utf-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+</head>
+<body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
+    <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
+        <h1 style="color: #4A90E2;">Verify Your Email</h1>
+        <p>Thank you for signing up for $app_name!</p>
+        <p>Please click the button below to verify your email address:</p>
+        <p style="text-align: center; margin: 30px 0;">
+            <a href="$verification_url"
+               style="background-color: #4A90E2; color: white; padding: 12px 24px;
+                      text-decoration: none; border-radius: 4px; display: inline-block;">
+                Verify Email
+            </a>
+        </p>
+        <p>Or copy and paste this link into your browser:</p>
+        <p style="word-break: break-all; color: #666;">$verification_url</p>
+        <p style="color: #999; font-size: 12px; margin-top: 30px;">
+            This link will expire in 48 hours. If you didn't create an account, please ignore this email.
+        </p>
+    </div>
+</body>
+</html>
+"""
+
+_PASSWORD_RESET_HTML = """
+<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="utf-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+</head>
+<body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
+    <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
+        <h1 style="color: #4A90E2;">Reset Your Password</h1>
+        <p>We received a request to reset your password for $app_name.</p>
+        <p>Click the button below to reset your password:</p>
+        <p style="text-align: center; margin: 30px 0;">
+            <a href="$reset_url"
+               style="background-color: #4A90E2; color: white; padding: 12px 24px;
+                      text-decoration: none; border-radius: 4px; display: inline-block;">
+                Reset Password
+            </a>
+        </p>
+        <p>Or copy and paste this link into your browser:</p>
+        <p style="word-break: break-all; color: #666;">$reset_url</p>
+        <p style="color: #999; font-size: 12px; margin-top: 30px;">
+            This link will expire in 1 hour. If you didn't request a password reset, please ignore this email.
+        </p>
+    </div>
+</body>
+</html>
+"""
+
+
+def html_to_text(html_body: str) -> str:
+    """Derive a plain text alternative from an HTML body"""
+    text = re.sub(r"(?is)<head>.*?</head>", "", html_body)
+    text = re.sub(r"(?i)<br\s*/?>", "\n", text)
+    text = re.sub(r"<[^>]+>", "", text)
+    text = html.unescape(text)
+    lines = [line.strip() for line in text.splitlines()]
+    # Collapse the blank lines left behind by block elements
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(lines)).strip() + "\n"
+
+
+class RenderedEmail(NamedTuple):
+    """A rendered message"""
+
+    subject: str
+    html_body: str
+    text_body: str
+
+
+class BrandedTemplate:
+    """
+    A template with the app's branding filled in
+
+    Only the per-message variables (the link) are left to substitute.
+    """
+
+    __slots__ = ("subject", "html", "text")
+
+    def __init__(self, subject: str, html_template: Template, text_template: Template):
+        self.subject = subject
+        self.html = html_template
+        self.text = text_template
+
+    def render(self, variables: Dict[str, str]) -> RenderedEmail:
+        """
+        Render a message
+
+        Args:
+            variables: Per-message template variables
+
+        Returns:
+            Rendered subject, HTML and text bodies
+        """
+        escaped = {name: html.escape(str(value)) for name, value in variables.items()}
+        return RenderedEmail(
+            subject=self.subject,
+            html_body=self.html.substitute(escaped),
+            text_body=self.text.substitute(variables),
+        )
+
+
+class EmailTemplate:
+    """
+    An email template compiled once at import
+
+    The plain text alternative is derived from the HTML here rather than on
+    every send. Bump ``version`` when changing a template so cached
+    branded variants are rebuilt.
+    """
+
+    def __init__(self, name: str, version: int, subject: str, html_body: str):
+        self.name = name
+        self.version = version
+        self.subject = Template(subject)
+        self.html = Template(html_body.strip() + "\n")
+        self.text = Template(html_to_text(html_body))
+
+    def brand(self, app_name: str) -> BrandedTemplate:
+        """Fill in the app-level variables"""
+        # The result is a template again, so "$" in the name must stay literal
+        literal_name = app_name.replace("$", "$$")
+        return BrandedTemplate(
+            subject=self.subject.substitute(app_name=app_name),
+            html_template=Template(
+                self.html.safe_substitute(app_name=html.escape(literal_name))
+            ),
+            text_template=Template(self.text.safe_substitute(app_name=literal_name)),
+        )
+
+
+# Registered templates by name
+EMAIL_TEMPLATES: Dict[str, EmailTemplate] = {
+    template.name: template
+    for template in (
+        EmailTemplate(
+            TEMPLATE_VERIFICATION,
+            version=1,
+            subject="Verify your email for $app_name",
+            html_body=_VERIFICATION_HTML,
+        ),
+        EmailTemplate(
+            TEMPLATE_PASSWORD_RESET,
+            version=1,
+            subject="Reset your password for $app_name",
+            html_body=_PASSWORD_RESET_HTML,
+        ),
+    )
+}
+
+
+def get_template(name: str) -> EmailTemplate:
+    """
+    Get a registered template
+
+    Raises:
+        ValueError: If the template is unknown
+    """
+    template = EMAIL_TEMPLATES.get(name)
+    if template is None:
+        raise ValueError(f"Unknown email template: {name}")
+    return template
+
+
+# (app_id, template name, template version)
+_CacheKey = Tuple[Optional[str], str, int]
+
+
+class EmailTemplateCache:
+    """
+    Cache of branded templates keyed by app, template and template version
+
+    Application names are looked up once per app for a whole batch of
+    messages and kept for ``ttl_seconds`` (applications can't be renamed,
+    the TTL only bounds staleness after a deletion in another worker).
+    """
+
+    def __init__(self, ttl_seconds: float = 300.0, max_entries: int = 1000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[_CacheKey, Tuple[float, BrandedTemplate]]" = (
+            OrderedDict()
+        )
+
+    def _get(self, app_id: Optional[str], name: str) -> Optional[BrandedTemplate]:
+        key = (app_id, name, get_template(name).version)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, branded = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return branded
+
+    def _set(self, app_id: Optional[str], name: str, app_name: str) -> BrandedTemplate:
+        template = get_template(name)
+        branded = template.brand(app_name)
+        key = (app_id, name, template.version)
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, branded)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return branded
+
+    async def resolve(
+        self, db: AsyncSession, keys: Iterable[Tuple[Optional[str], str]]
+    ) -> Dict[Tuple[Optional[str], str], BrandedTemplate]:
+        """
+        Get branded templates, loading missing app names in one query
+
+        Args:
+            db: Database session
+            keys: (app_id, template name) pairs
+
+        Returns:
+            Branded template per requested pair (unknown templates are left
+            out)
+        """
+        resolved: Dict[Tuple[Optional[str], str], BrandedTemplate] = {}
+        missing: Set[Tuple[Optional[str], str]] = set()
+        for app_id, name in set(keys):
+            if name not in EMAIL_TEMPLATES:
+                continue
+            branded = self._get(app_id, name)
+            if branded is None:
+                missing.add((app_id, name))
+            else:
+                resolved[(app_id, name)] = branded
+
+        if missing:
+            app_ids = {app_id for app_id, _ in missing if app_id is not None}
+            names: Dict[str, str] = {}
+            if app_ids:
+                result = await db.execute(
+                    select(Application.app_id, Application.name).where(
+                        Application.app_id.in_(app_ids)
+                    )
+                )
+                names = dict(result.all())
+            for app_id, name in missing:
+                app_name = names.get(app_id, DEFAULT_APP_NAME)
+                resolved[(app_id, name)] = self._set(app_id, name, app_name)
+
+        return resolved
+
+    def invalidate(self, app_id: str):
+        """Drop cached templates of an application"""
+        for key in [key for key in self._entries if key[0] == app_id]:
+            del self._entries[key]
+
+
+# Global email template cache instance
+email_template_cache = EmailTemplateCache(
+    ttl_seconds=settings.EMAIL_TEMPLATE_CACHE_TTL_SECONDS,
+    max_entries=settings.EMAIL_TEMPLATE_CACHE_MAX_ENTRIES,
+)
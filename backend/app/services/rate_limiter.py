@@ -2,87 +2,396 @@
 Rate limiting service using Redis
 """
 
-from app.core.redis import get_redis
-from typing import Optional
+import asyncio
+import os
 import time
+from typing import Dict, NamedTuple, Optional
 
+from redis.commands.core import AsyncScript
 
-class RateLimiter:
-    """Rate limiting service"""
+from app.core.config import settings
+from app.core.redis import get_redis
 
-    def __init__(self, requests_per_minute: int = 60):
-        self.requests_per_minute = requests_per_minute
-        self.window_seconds = 60
+ALGORITHM_SLIDING_WINDOW_LOG = "sliding_window_log"
+ALGORITHM_SLIDING_WINDOW_COUNTER = "sliding_window_counter"
+ALGORITHM_GCRA = "gcra"
+
+# Exact sliding window: one sorted set member per accepted request.
+# KEYS[1] = log key
+# ARGV = now (ms), window (ms), limit, unique member
+# Returns {allowed, remaining, retry_after_ms}
+_SLIDING_WINDOW_LOG_SCRIPT = """
+local key = KEYS[1]
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local limit = tonumber(ARGV[3])
+
+redis.call('ZREMRANGEBYSCORE', key, '-inf', now - window)
+local count = redis.call('ZCARD', key)
+
+if count >= limit then
+    -- Wait until enough entries leave the window to admit one more
+    local index = count - limit
+    local entry = redis.call('ZRANGE', key, index, index, 'WITHSCORES')
+    local retry_after = window
+    if entry[2] then
+        retry_after = math.max(tonumber(entry[2]) + window - now, 1)
+    end
+    return {0, 0, retry_after}
+end
+
+redis.call('ZADD', key, now, ARGV[4])
+redis.call('PEXPIRE', key, window)
+return {1, limit - count - 1, 0}
+"""
 
-    async def check_rate_limit(
+# Approximate sliding window: the previous fixed window's count is weighted
+# by how much of it still overlaps the sliding window. State is a single
+# hash of three integers regardless of the limit.
+# KEYS[1] = counter hash (w = current window index, c = current, p = previous)
+# ARGV = now (ms), window (ms), limit
+# Returns {allowed, remaining, retry_after_ms}
+_SLIDING_WINDOW_COUNTER_SCRIPT = """
+local key = KEYS[1]
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local limit = tonumber(ARGV[3])
+
+local index = math.floor(now / window)
+local state = redis.call('HMGET', key, 'w', 'c', 'p')
+local stored_index = tonumber(state[1])
+local current = tonumber(state[2]) or 0
+local previous = tonumber(state[3]) or 0
+
+if stored_index ~= index then
+    if stored_index == index - 1 then
+        previous = current
+    else
+        previous = 0
+    end
+    current = 0
+end
+
+local elapsed = now - index * window
+local estimated = previous * (window - elapsed) / window + current
+
+if estimated + 1 > limit then
+    local retry_after
+    if current + 1 > limit then
+        -- Blocked for the rest of this window and part of the next one
+        retry_after = window - elapsed + window * (1 - (limit - 1) / current)
+    else
+        retry_after = window - (limit - 1 - current) * window / previous - elapsed
+    end
+    return {0, 0, math.max(math.ceil(retry_after), 1)}
+end
+
+current = current + 1
+redis.call('HSET', key, 'w', index, 'c', current, 'p', previous)
+redis.call('PEXPIRE', key, window * 2)
+return {1, math.floor(limit - estimated - 1), 0}
+"""
+
+# Generic cell rate algorithm (a token bucket of `limit` tokens refilled
+# over the window). State is a single number, the theoretical arrival time.
+# Several tokens can be taken at once, which is how local leases are filled.
+# KEYS[1] = TAT key
+# ARGV = now (ms), window (ms), limit, tokens requested
+# Returns {tokens_granted, remaining, retry_after_ms}
+_GCRA_SCRIPT = """
+local key = KEYS[1]
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local limit = tonumber(ARGV[3])
+local requested = tonumber(ARGV[4])
+
+local interval = window / limit
+local tat = math.max(tonumber(redis.call('GET', key)) or now, now)
+local available = math.floor((now + window - tat) / interval + 1e-9)
+local granted = math.min(requested, available)
+
+if granted <= 0 then
+    return {0, 0, math.max(math.ceil(tat + interval - window - now), 1)}
+end
+
+tat = tat + granted * interval
+redis.call('SET', key, string.format('%.3f', tat), 'PX', math.ceil(tat - now))
+return {granted, available - granted, 0}
+"""
+
+
+class RateLimitResult(NamedTuple):
+    """Outcome of a rate limit check"""
+
+    allowed: bool
+    limit: int
+    remaining: int
+    retry_after: float
+
+
+class _Lease:
+    """Tokens a worker has taken from Redis for one identifier"""
+
+    __slots__ = ("limit", "tokens", "remaining", "expires_at", "retry_at")
+
+    def __init__(
+        self,
+        limit: int,
+        tokens: int,
+        remaining: int,
+        expires_at: float,
+        retry_at: float,
+    ):
+        self.limit = limit
+        self.tokens = tokens
+        self.remaining = remaining
+        self.expires_at = expires_at
+        self.retry_at = retry_at
+
+
+class RateLimiter:
+    """
+    Rate limiting service
+
+    Each check runs as a single Lua script (EVALSHA) that evicts, counts
+    and records atomically in one round trip. Two algorithms are available:
+
+    - ``sliding_window_log``: exact, stores one entry per accepted request
+    - ``sliding_window_counter``: approximate, constant memory per identifier
+    - ``gcra``: token bucket, a single number per identifier
+
+    With ``gcra`` the limiter can also run in hybrid mode (``lease_size``
+    > 0): each worker takes tokens from Redis ``lease_size`` at a time and
+    answers checks from that local allowance, and remembers rejections
+    until their retry time, so most checks never leave the process. A
+    lease is dropped after ``lease_ttl`` seconds. Tokens are charged in
+    Redis when leased, so every worker can overshoot the limit by at
+    most ``lease_size`` tokens per ``lease_ttl``.
+    """
+
+    _SCRIPTS = {
+        ALGORITHM_SLIDING_WINDOW_LOG: _SLIDING_WINDOW_LOG_SCRIPT,
+        ALGORITHM_SLIDING_WINDOW_COUNTER: _SLIDING_WINDOW_COUNTER_SCRIPT,
+        ALGORITHM_GCRA: _GCRA_SCRIPT,
+    }
+    _KEY_PREFIXES = {
+        ALGORITHM_SLIDING_WINDOW_LOG: "rate_limit",
+        ALGORITHM_SLIDING_WINDOW_COUNTER: "rate_limit_swc",
+        ALGORITHM_GCRA: "rate_limit_gcra",
+    }
+    # Bound on locally tracked identifiers before expired leases are pruned
+    _MAX_LEASES = 10_000
+
+    def __init__(
+        self,
+        requests_per_minute: int = 60,
+        algorithm: str = ALGORITHM_SLIDING_WINDOW_LOG,
+        window_seconds: int = 60,
+        lease_size: int = 0,
+        lease_ttl: float = 1.0,
+    ):
+        if algorithm not in self._SCRIPTS:
+            raise ValueError(f"Unknown rate limit algorithm: {algorithm}")
+        if lease_size and algorithm != ALGORITHM_GCRA:
+            raise ValueError("Token leasing requires the gcra algorithm")
+        self.requests_per_minute = requests_per_minute
+        self.algorithm = algorithm
+        self.window_seconds = window_seconds
+        self.lease_size = lease_size
+        self.lease_ttl = lease_ttl
+        self._scripts: Dict[str, AsyncScript] = {}
+        self._leases: Dict[str, _Lease] = {}
+        self._lease_requests: Dict[str, asyncio.Future] = {}
+
+    def _key(self, identifier: str) -> str:
+        return f"{self._KEY_PREFIXES[self.algorithm]}:{identifier}"
+
+    def _script(self, redis_client) -> AsyncScript:
+        # Scripts are registered once and run with EVALSHA, falling back to
+        # EVAL (which caches the script server side) on NOSCRIPT
+        script = self._scripts.get(self.algorithm)
+        if script is None:
+            script = redis_client.register_script(self._SCRIPTS[self.algorithm])
+            self._scripts[self.algorithm] = script
+        return script
+
+    async def check(
         self, identifier: str, limit: Optional[int] = None
-    ) -> tuple[bool, int]:
+    ) -> RateLimitResult:
         """
-        Check if rate limit is exceeded using sliding window algorithm
+        Check the rate limit and record the request if it is allowed
 
         Args:
             identifier: Unique identifier (API key hash, IP address, etc.)
             limit: Optional custom limit (defaults to requests_per_minute)
 
         Returns:
-            Tuple of (is_allowed, remaining_requests)
+            Rate limit result
         """
         limit = limit or self.requests_per_minute
+        if self.lease_size:
+            return await self._check_leased(identifier, limit)
+
+        granted, remaining, retry_after_ms = await self._run_script(identifier, limit)
+        return RateLimitResult(
+            allowed=granted > 0,
+            limit=limit,
+            remaining=remaining,
+            retry_after=retry_after_ms / 1000,
+        )
+
+    async def _run_script(
+        self, identifier: str, limit: int, requested: int = 1
+    ) -> tuple[int, int, int]:
         redis_client = await get_redis()
 
-        key = f"rate_limit:{identifier}"
-        now = time.time()
-        window_start = now - self.window_seconds
+        now_ms = int(time.time() * 1000)
+        args = [now_ms, self.window_seconds * 1000, limit]
+        if self.algorithm == ALGORITHM_SLIDING_WINDOW_LOG:
+            # Random suffix keeps members unique for requests in the same ms
+            args.append(f"{now_ms}-{os.urandom(6).hex()}")
+        elif self.algorithm == ALGORITHM_GCRA:
+            args.append(requested)
+
+        result = await self._script(redis_client)(
+            keys=[self._key(identifier)], args=args, client=redis_client
+        )
+        return int(result[0]), int(result[1]), int(result[2])
+
+    async def _check_leased(self, identifier: str, limit: int) -> RateLimitResult:
+        while True:
+            now = time.monotonic()
+            lease = self._leases.get(identifier)
+            if lease is not None and lease.limit == limit:
+                if lease.tokens > 0 and now < lease.expires_at:
+                    lease.tokens -= 1
+                    return RateLimitResult(True, limit, lease.remaining, 0.0)
+                if now < lease.retry_at:
+                    return RateLimitResult(False, limit, 0, lease.retry_at - now)
+
+            # One lease request per identifier at a time; concurrent
+            # callers wait for it and then share the leased tokens
+            request = self._lease_requests.get(identifier)
+            if request is None:
+                request = asyncio.ensure_future(self._lease(identifier, limit))
+                self._lease_requests[identifier] = request
+                request.add_done_callback(
+                    lambda _: self._lease_requests.pop(identifier, None)
+                )
+            await asyncio.shield(request)
+
+    async def _lease(self, identifier: str, limit: int):
+        granted, remaining, retry_after_ms = await self._run_script(
+            identifier, limit, requested=min(self.lease_size, limit)
+        )
+        now = time.monotonic()
+        if len(self._leases) >= self._MAX_LEASES:
+            self._leases = {
+                key: lease
+                for key, lease in self._leases.items()
+                if lease.expires_at > now or lease.retry_at > now
+            }
+        self._leases[identifier] = _Lease(
+            limit=limit,
+            tokens=granted,
+            remaining=remaining,
+            expires_at=now + self.lease_ttl,
+            retry_at=0.0 if granted else now + retry_after_ms / 1000,
+        )
 
-        # Use sorted set for sliding window
-        pipe = redis_client.pipeline()
-
-        # Remove expired entries
-        pipe.zremrangebyscore(key, 0, window_start)
-
-        # Count current requests in window
-        pipe.zcard(key)
-
-        # Add current request
-        pipe.zadd(key, {str(now): now})
-
-        # Set expiration
-        pipe.expire(key, self.window_seconds)
-
-        results = await pipe.execute()
-        current_count = results[1]  # Count before adding current request
+    async def check_rate_limit(
+        self, identifier: str, limit: Optional[int] = None
+    ) -> tuple[bool, int]:
+        """
+        Check if rate limit is exceeded
 
-        if current_count >= limit:
-            # Still add the request for tracking, but return False
-            await redis_client.zadd(key, {str(now): now})
-            await redis_client.expire(key, self.window_seconds)
-            return False, 0
+        Args:
+            identifier: Unique identifier (API key hash, IP address, etc.)
+            limit: Optional custom limit (defaults to requests_per_minute)
 
-        remaining = limit - current_count - 1
-        return True, remaining
+        Returns:
+            Tuple of (is_allowed, remaining_requests)
+        """
+        result = await self.check(identifier, limit)
+        return result.allowed, result.remaining
 
     async def get_remaining_requests(self, identifier: str) -> int:
         """Get remaining requests for an identifier"""
         redis_client = await get_redis()
-        key = f"rate_limit:{identifier}"
-        count = await redis_client.zcard(key)
-        return max(0, self.requests_per_minute - count)
+        key = self._key(identifier)
+        now_ms = int(time.time() * 1000)
+        window_ms = self.window_seconds * 1000
+
+        if self.algorithm == ALGORITHM_SLIDING_WINDOW_LOG:
+            count = await redis_client.zcount(key, now_ms - window_ms, "+inf")
+        elif self.algorithm == ALGORITHM_GCRA:
+            # Tokens in use are the part of the window the TAT is ahead by
+            tat = await redis_client.get(key)
+            interval = window_ms / self.requests_per_minute
+            count = max(float(tat) - now_ms, 0) / interval if tat else 0
+        else:
+            stored_index, current, previous = await redis_client.hmget(
+                key, "w", "c", "p"
+            )
+            index = now_ms // window_ms
+            weight = (window_ms - (now_ms - index * window_ms)) / window_ms
+            if stored_index is None or int(stored_index) < index - 1:
+                count = 0
+            elif int(stored_index) == index - 1:
+                # Stored current window has become the previous one
+                count = int(current) * weight
+            else:
+                count = int(previous) * weight + int(current)
+        return max(0, int(self.requests_per_minute - count))
 
 
 class BruteForceProtection:
-    """Brute force protection service"""
-
-    def __init__(self, max_attempts: int = 5, lockout_minutes: int = 15):
+    """
+    Brute force protection service
+
+    Failed logins are counted separately per email and per IP address, so
+    rotating IPs doesn't reset the count for an account and one IP can't
+    spray many accounts. Both counters are scoped to the application, so
+    failures against one tenant never lock users out of another. A subject
+    is locked out once its counter reaches its threshold; the counter
+    itself is the lockout flag and expires ``lockout_minutes`` after the
+    last failure. Every operation is a single Redis round trip.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 5,
+        lockout_minutes: int = 15,
+        max_ip_attempts: int = 20,
+    ):
         self.max_attempts = max_attempts
+        self.max_ip_attempts = max_ip_attempts
         self.lockout_seconds = lockout_minutes * 60
 
+    @staticmethod
+    def _keys(app_id: str, email: str, ip_address: str) -> tuple[str, str]:
+        return (
+            f"login_attempts:{app_id}:email:{email.lower()}",
+            f"login_attempts:{app_id}:ip:{ip_address}",
+        )
+
+    def _remaining(self, email_attempts: int, ip_attempts: int) -> int:
+        return max(
+            0,
+            min(
+                self.max_attempts - email_attempts,
+                self.max_ip_attempts - ip_attempts,
+            ),
+        )
+
     async def record_failed_attempt(
-        self, email: str, ip_address: str
+        self, app_id: str, email: str, ip_address: str
     ) -> tuple[bool, int]:
         """
         Record a failed login attempt
 
         Args:
+            app_id: Application ID
             email: User email
             ip_address: Client IP address
 
@@ -90,55 +399,63 @@ class BruteForceProtection:
             Tuple of (is_locked, remaining_attempts)
         """
         redis_client = await get_redis()
-        key = f"login_attempts:{email}:{ip_address}"
+        email_key, ip_key = self._keys(app_id, email, ip_address)
 
-        # Increment counter
-        attempts = await redis_client.incr(key)
-        await redis_client.expire(key, self.lockout_seconds)
+        pipe = redis_client.pipeline(transaction=True)
+        pipe.incr(email_key)
+        pipe.expire(email_key, self.lockout_seconds)
+        pipe.incr(ip_key)
+        pipe.expire(ip_key, self.lockout_seconds)
+        email_attempts, _, ip_attempts, _ = await pipe.execute()
 
-        if attempts >= self.max_attempts:
-            # Set lockout flag
-            lockout_key = f"login_blocked:{email}:{ip_address}"
-            await redis_client.setex(lockout_key, self.lockout_seconds, "1")
-            return True, 0
+        remaining = self._remaining(email_attempts, ip_attempts)
+        return remaining == 0, remaining
 
-        remaining = self.max_attempts - attempts
-        return False, remaining
-
-    async def check_lockout(self, email: str, ip_address: str) -> bool:
+    async def check_lockout(self, app_id: str, email: str, ip_address: str) -> bool:
         """
-        Check if account is locked out
+        Check if account or IP address is locked out
 
         Args:
+            app_id: Application ID
             email: User email
             ip_address: Client IP address
 
         Returns:
             True if locked out, False otherwise
         """
-        redis_client = await get_redis()
-        lockout_key = f"login_blocked:{email}:{ip_address}"
-        blocked = await redis_client.get(lockout_key)
-        return blocked is not None
+        return await self.get_remaining_attempts(app_id, email, ip_address) == 0
 
-    async def clear_attempts(self, email: str, ip_address: str):
-        """Clear failed attempts on successful login"""
+    async def clear_attempts(self, app_id: str, email: str, ip_address: str):
+        """
+        Clear failed attempts for an account on successful login
+
+        The IP counter is left to expire on its own, otherwise an attacker
+        could reset it by logging in to an account they control.
+        """
         redis_client = await get_redis()
-        attempts_key = f"login_attempts:{email}:{ip_address}"
-        lockout_key = f"login_blocked:{email}:{ip_address}"
-        await redis_client.delete(attempts_key, lockout_key)
+        email_key, _ = self._keys(app_id, email, ip_address)
+        await redis_client.delete(email_key)
 
-    async def get_remaining_attempts(self, email: str, ip_address: str) -> int:
+    async def get_remaining_attempts(
+        self, app_id: str, email: str, ip_address: str
+    ) -> int:
         """Get remaining login attempts"""
         redis_client = await get_redis()
-        key = f"login_attempts:{email}:{ip_address}"
-        attempts = await redis_client.get(key)
-        if attempts is None:
-            return self.max_attempts
-        attempts = int(attempts)
-        return max(0, self.max_attempts - attempts)
+        email_attempts, ip_attempts = await redis_client.mget(
+            self._keys(app_id, email, ip_address)
+        )
+        return self._remaining(int(email_attempts or 0), int(ip_attempts or 0))
 
 
 # Global instances
-rate_limiter = RateLimiter(requests_per_minute=60)
-brute_force_protection = BruteForceProtection(max_attempts=5, lockout_minutes=15)
+rate_limiter = RateLimiter(
+    requests_per_minute=settings.RATE_LIMIT_PER_MINUTE,
+    algorithm=settings.RATE_LIMIT_ALGORITHM,
+    lease_size=settings.RATE_LIMIT_LEASE_SIZE,
+    lease_ttl=settings.RATE_LIMIT_LEASE_TTL_SECONDS,
+)
+brute_force_protection = BruteForceProtection(
+    max_attempts=settings.BRUTE_FORCE_MAX_ATTEMPTS,
+    lockout_minutes=settings.BRUTE_FORCE_LOCKOUT_MINUTES,
+    max_ip_attempts=settings.BRUTE_FORCE_MAX_IP_ATTEMPTS,
+)
@@ -0,0 +1,205 @@
+"""
+Redis cache of active sessions for the token refresh path
+"""
+
+import json
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Optional
+from uuid import UUID
+
+from fastapi import HTTPException, status
+
+from app.core.redis import get_redis
+from app.models import Session
+
+logger = logging.getLogger(__name__)
+
+
+def _naive_utc(value: datetime) -> datetime:
+    # Sessions are compared against datetime.utcnow() throughout
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+class CachedSession:
+    """Snapshot of a session and its user's email"""
+
+    __slots__ = (
+        "id",
+        "user_id",
+        "app_id",
+        "refresh_token_hash",
+        "expires_at",
+        "revoked",
+        "email",
+    )
+
+    def __init__(
+        self,
+        id: UUID,
+        user_id: UUID,
+        app_id: str,
+        refresh_token_hash: str,
+        expires_at: datetime,
+        revoked: bool,
+        email: str,
+    ):
+        self.id = id
+        self.user_id = user_id
+        self.app_id = app_id
+        self.refresh_token_hash = refresh_token_hash
+        self.expires_at = _naive_utc(expires_at)
+        self.revoked = revoked
+        self.email = email
+
+    @classmethod
+    def from_session(cls, session: Session, email: str) -> "CachedSession":
+        return cls(
+            id=session.id,
+            user_id=session.user_id,
+            app_id=session.app_id,
+            refresh_token_hash=session.refresh_token_hash,
+            expires_at=session.expires_at,
+            revoked=session.revoked,
+            email=email,
+        )
+
+    def to_json(self) -> str:
+        return json.dumps(
+            {
+                "id": str(self.id),
+                "user_id": str(self.user_id),
+                "app_id": self.app_id,
+                "refresh_token_hash": self.refresh_token_hash,
+                "expires_at": self.expires_at.isoformat(),
+                "revoked": self.revoked,
+                "email": self.email,
+            }
+        )
+
+    @classmethod
+    def from_json(cls, data: str) -> "CachedSession":
+        fields: Dict[str, Any] = json.loads(data)
+        return cls(
+            id=UUID(fields["id"]),
+            user_id=UUID(fields["user_id"]),
+            app_id=fields["app_id"],
+            refresh_token_hash=fields["refresh_token_hash"],
+            expires_at=datetime.fromisoformat(fields["expires_at"]),
+            revoked=fields["revoked"],
+            email=fields["email"],
+        )
+
+    @property
+    def active(self) -> bool:
+        """Whether the session can still be used to refresh"""
+        return not self.revoked and self.expires_at > datetime.utcnow()
+
+
+class SessionCache:
+    """
+    Cache of sessions keyed by session ID
+
+    Entries live until the session expires. Postgres stays the source of
+    truth: entries are only ever populated from committed rows, and
+    revocations are written through as revoked entries that cache fills
+    from the database (which use SET NX) can't overwrite. Redis errors are
+    logged and callers fall back to the database, except when a revocation
+    can't be written: then the entries are deleted instead, and if that
+    fails too the revocation request fails rather than leaving an active
+    entry behind.
+    """
+
+    @staticmethod
+    def _key(session_id: UUID) -> str:
+        return f"session:{session_id}"
+
+    @staticmethod
+    def _ttl(session: CachedSession) -> int:
+        return int((session.expires_at - datetime.utcnow()).total_seconds())
+
+    async def get(self, session_id: UUID) -> Optional[CachedSession]:
+        """
+        Look up a cached session
+
+        Args:
+            session_id: Session ID from the refresh token
+
+        Returns:
+            Cached session or None on a miss
+        """
+        try:
+            redis_client = await get_redis()
+            cached = await redis_client.get(self._key(session_id))
+        except Exception as e:
+            logger.warning(f"Session cache lookup failed: {str(e)}")
+            return None
+        return CachedSession.from_json(cached) if cached else None
+
+    async def set(self, session: CachedSession, overwrite: bool = True):
+        """
+        Cache a session
+
+        Args:
+            session: Session snapshot
+            overwrite: Replace an existing entry; pass False when filling
+                the cache from a database read so a concurrent revocation
+                isn't undone
+        """
+        ttl = self._ttl(session)
+        if ttl <= 0:
+            return
+        try:
+            redis_client = await get_redis()
+            await redis_client.set(
+                self._key(session.id), session.to_json(), ex=ttl, nx=not overwrite
+            )
+        except Exception as e:
+            logger.warning(f"Session cache write failed: {str(e)}")
+
+    async def revoke(self, sessions: Iterable[CachedSession]):
+        """
+        Write through the revocation of sessions
+
+        Raises:
+            HTTPException: If the cache could neither mark the sessions
+                revoked nor drop them (the revocation is already committed,
+                so the request can be retried)
+        """
+        sessions = list(sessions)
+        if not sessions:
+            return
+        try:
+            redis_client = await get_redis()
+            pipe = redis_client.pipeline(transaction=False)
+            for session in sessions:
+                session.revoked = True
+                ttl = self._ttl(session)
+                if ttl > 0:
+                    pipe.set(self._key(session.id), session.to_json(), ex=ttl)
+            await pipe.execute()
+            return
+        except Exception as e:
+            logger.error(f"Session cache revocation failed: {str(e)}")
+
+        # Without an entry the next refresh reads the revoked row instead
+        try:
+            redis_client = await get_redis()
+            await redis_client.delete(*[self._key(session.id) for session in sessions])
+        except Exception as e:
+            logger.error(
+                f"Session cache delete after failed revocation failed: {str(e)}"
+            )
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail={
+                    "code": "SESSION_CACHE_UNAVAILABLE",
+                    "message": "Session revocation could not be completed, please retry",
+                },
+            )
+
+
+# Global session cache instance
+session_cache = SessionCache()
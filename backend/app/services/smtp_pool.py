@@ -0,0 +1,161 @@
+"""
+Pool of persistent SMTP connections
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from email.message import Message
+from typing import Deque, Optional
+
+import aiosmtplib
+from aiosmtplib.errors import (
+    SMTPDataError,
+    SMTPRecipientsRefused,
+    SMTPSenderRefused,
+)
+
+logger = logging.getLogger(__name__)
+
+# Errors about one message; the connection itself is still usable
+_MESSAGE_ERRORS = (SMTPDataError, SMTPRecipientsRefused, SMTPSenderRefused)
+
+
+class _PooledConnection:
+    """An SMTP client with its usage counters"""
+
+    __slots__ = ("client", "messages_sent", "idle_since")
+
+    def __init__(self, client: aiosmtplib.SMTP):
+        self.client = client
+        self.messages_sent = 0
+        self.idle_since = time.monotonic()
+
+
+class SMTPConnectionPool:
+    """
+    Pool of authenticated SMTP connections reused across messages
+
+    Sending over a pooled connection skips the TCP connect, TLS handshake
+    and AUTH that ``aiosmtplib.send`` pays per message. At most
+    ``max_connections`` messages are in flight at once; further senders
+    wait for a free connection. Connections are retired after
+    ``max_messages_per_connection`` messages (servers commonly cap this) or
+    when idle for longer than ``idle_timeout_seconds``. A reused
+    connection that turns out to be dead is replaced and the message is
+    retried once on a fresh connection.
+    """
+
+    def __init__(
+        self,
+        hostname: str,
+        port: int,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        use_tls: bool = False,
+        max_connections: int = 5,
+        max_messages_per_connection: int = 100,
+        idle_timeout_seconds: float = 30.0,
+        timeout: float = 60.0,
+    ):
+        self.hostname = hostname
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.max_connections = max_connections
+        self.max_messages_per_connection = max_messages_per_connection
+        self.idle_timeout_seconds = idle_timeout_seconds
+        self.timeout = timeout
+        self._idle: Deque[_PooledConnection] = deque()
+        self._slots = asyncio.Semaphore(max_connections)
+        self.connections_opened = 0
+
+    @property
+    def idle_count(self) -> int:
+        """Number of open connections waiting for a message"""
+        return len(self._idle)
+
+    async def _connect(self) -> _PooledConnection:
+        client = aiosmtplib.SMTP(
+            hostname=self.hostname,
+            port=self.port,
+            username=self.username or None,
+            password=self.password or None,
+            use_tls=self.use_tls,
+            timeout=self.timeout,
+        )
+        # Connects, negotiates TLS and logs in
+        await client.connect()
+        self.connections_opened += 1
+        return _PooledConnection(client)
+
+    async def _close(self, connection: _PooledConnection, graceful: bool = True):
+        try:
+            if graceful and connection.client.is_connected:
+                await connection.client.quit()
+            else:
+                connection.client.close()
+        except Exception:
+            connection.client.close()
+
+    async def _acquire(self) -> Optional[_PooledConnection]:
+        """Take a live idle connection, or None if one has to be opened"""
+        now = time.monotonic()
+        while self._idle:
+            connection = self._idle.pop()
+            if (
+                connection.client.is_connected
+                and now - connection.idle_since < self.idle_timeout_seconds
+            ):
+                return connection
+            await self._close(connection)
+        return None
+
+    async def _release(self, connection: _PooledConnection):
+        if connection.messages_sent >= self.max_messages_per_connection:
+            await self._close(connection)
+            return
+        connection.idle_since = time.monotonic()
+        self._idle.append(connection)
+
+    async def send(self, message: Message):
+        """
+        Send a message over a pooled connection
+
+        Args:
+            message: Message with From and To headers
+
+        Raises:
+            aiosmtplib.SMTPException: If the server rejects the message or
+                can't be reached
+        """
+        async with self._slots:
+            connection = await self._acquire()
+            reused = connection is not None
+            while True:
+                if connection is None:
+                    connection = await self._connect()
+                try:
+                    await connection.client.send_message(message)
+                except _MESSAGE_ERRORS:
+                    await self._release(connection)
+                    raise
+                except Exception as e:
+                    await self._close(connection, graceful=False)
+                    if not reused:
+                        raise
+                    # The server may have dropped the idle connection
+                    logger.info(f"Reconnecting stale SMTP connection: {str(e)}")
+                    connection, reused = None, False
+                    continue
+
+                connection.messages_sent += 1
+                await self._release(connection)
+                return
+
+    async def close(self):
+        """Close all idle connections"""
+        while self._idle:
+            await self._close(self._idle.pop())
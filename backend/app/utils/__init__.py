@@ -5,7 +5,13 @@ Utility functions
 from app.utils.password import (
     hash_password,
     verify_password,
+    hash_password_async,
+    hash_passwords_async,
+    verify_password_async,
+    verify_and_rehash_password_async,
+    password_needs_rehash,
     validate_password_strength,
+    password_hash_executor,
 )
 from app.utils.jwt import (
     create_access_token,
@@ -19,6 +25,8 @@ from app.utils.hashing import (
     hash_api_key,
     generate_api_key,
     verify_token_hash,
+    generate_opaque_refresh_token,
+    parse_opaque_refresh_token,
 )
 from app.utils.encryption import encrypt_secret, decrypt_secret
 
@@ -26,7 +34,13 @@ __all__ = [
     # Password
     "hash_password",
     "verify_password",
+    "hash_password_async",
+    "hash_passwords_async",
+    "verify_password_async",
+    "verify_and_rehash_password_async",
+    "password_needs_rehash",
     "validate_password_strength",
+    "password_hash_executor",
     # JWT
     "create_access_token",
     "create_refresh_token",
@@ -38,6 +52,8 @@ __all__ = [
     "hash_api_key",
     "generate_api_key",
     "verify_token_hash",
+    "generate_opaque_refresh_token",
+    "parse_opaque_refresh_token",
     # Encryption
     "encrypt_secret",
     "decrypt_secret",
@@ -4,7 +4,11 @@ Token and API key hashing utilities
 
 import hashlib
 import secrets
-from typing import Tuple
+from typing import Optional, Tuple
+from uuid import UUID
+
+# Prefix of opaque refresh tokens (JWT refresh tokens never start with it)
+OPAQUE_REFRESH_TOKEN_PREFIX = "rt_"
 
 
 def generate_secure_token(length: int = 32) -> str:
@@ -71,3 +75,46 @@ def verify_token_hash(token: str, token_hash: str) -> bool:
     """
     computed_hash = hash_token(token)
     return secrets.compare_digest(computed_hash, token_hash)
+
+
+def generate_opaque_refresh_token(session_id: UUID) -> str:
+    """
+    Generate an opaque refresh token for a session
+
+    The token is ``rt_<session id hex>.<256-bit random secret>``; the
+    session ID locates the session row and the whole token is checked
+    against the stored hash.
+
+    Args:
+        session_id: Session UUID
+
+    Returns:
+        Opaque refresh token string
+    """
+    secret = secrets.token_urlsafe(32)
+    return f"{OPAQUE_REFRESH_TOKEN_PREFIX}{session_id.hex}.{secret}"
+
+
+def parse_opaque_refresh_token(token: str) -> Optional[UUID]:
+    """
+    Extract the session ID from an opaque refresh token
+
+    Parsing doesn't authenticate the token: anyone who knows a session ID
+    can build one. Callers must check the whole token against the session's
+    stored hash before acting on the session.
+
+    Args:
+        token: Refresh token string
+
+    Returns:
+        Session UUID, or None if the token is not a well-formed opaque token
+    """
+    if not token.startswith(OPAQUE_REFRESH_TOKEN_PREFIX):
+        return None
+    session_hex, _, secret = token[len(OPAQUE_REFRESH_TOKEN_PREFIX) :].partition(".")
+    if not secret:
+        return None
+    try:
+        return UUID(hex=session_hex)
+    except ValueError:
+        return None
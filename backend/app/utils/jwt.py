@@ -4,16 +4,22 @@ JWT token generation and validation utilities
 
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any
-from uuid import UUID
+from uuid import UUID, uuid4
 from jose import jwt
 from jose.exceptions import JWTError as PyJWTError
-import base64
 from app.core.config import settings
+from app.utils.keys import key_store
 
 
-def decode_key(key_str: str) -> bytes:
-    """Decode base64 encoded key string to bytes"""
-    return base64.b64decode(key_str)
+def _sign(payload: Dict[str, Any]) -> str:
+    """Sign a payload with the current signing key, stamping its key ID"""
+    signing_key = key_store.signing_key
+    return jwt.encode(
+        payload,
+        signing_key.private_key,
+        algorithm=signing_key.algorithm,
+        headers={"kid": signing_key.kid},
+    )
 
 
 def create_access_token(
@@ -45,9 +51,7 @@ def create_access_token(
         "type": "access",
     }
 
-    private_key = decode_key(settings.JWT_PRIVATE_KEY)
-    token = jwt.encode(payload, private_key, algorithm=settings.JWT_ALGORITHM)
-    return token
+    return _sign(payload)
 
 
 def create_refresh_token(
@@ -77,14 +81,14 @@ def create_refresh_token(
         "sub": str(user_id),
         "app_id": app_id,
         "session_id": str(session_id),
+        # Unique per token so rotated tokens never collide
+        "jti": uuid4().hex,
         "iat": datetime.utcnow(),
         "exp": expire,
         "type": "refresh",
     }
 
-    private_key = decode_key(settings.JWT_PRIVATE_KEY)
-    token = jwt.encode(payload, private_key, algorithm=settings.JWT_ALGORITHM)
-    return token
+    return _sign(payload)
 
 
 def verify_token(token: str) -> Optional[Dict[str, Any]]:
@@ -98,11 +102,15 @@ def verify_token(token: str) -> Optional[Dict[str, Any]]:
         Decoded payload dict or None if invalid
     """
     try:
-        public_key = decode_key(settings.JWT_PUBLIC_KEY)
+        header = jwt.get_unverified_header(token)
+        verification_key = key_store.get_verification_key(header.get("kid"))
+        if verification_key is None:
+            return None
+
         payload = jwt.decode(
             token,
-            public_key,
-            algorithms=[settings.JWT_ALGORITHM],
+            verification_key.public_key,
+            algorithms=[verification_key.algorithm],
             options={"verify_exp": True},
         )
         return payload
@@ -0,0 +1,452 @@
+"""
+JWT key material management
+"""
+
+import base64
+import hashlib
+import json
+import logging
+import math
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+from jose import jwk
+from jose.backends.base import Key
+from jose.exceptions import JWKError
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+ALGORITHM_RS256 = "RS256"
+ALGORITHM_ES256 = "ES256"
+ALGORITHM_EDDSA = "EdDSA"
+SUPPORTED_ALGORITHMS = (ALGORITHM_RS256, ALGORITHM_ES256, ALGORITHM_EDDSA)
+
+KEY_STATUS_CURRENT = "current"
+KEY_STATUS_NEXT = "next"
+KEY_STATUS_RETIRING = "retiring"
+
+# RFC 7638 required members per key type
+_THUMBPRINT_MEMBERS = {
+    "RSA": ("e", "kty", "n"),
+    "EC": ("crv", "kty", "x", "y"),
+    "OKP": ("crv", "kty", "x"),
+}
+
+
+def decode_key(key_str: str) -> bytes:
+    """
+    Decode a configured key into PEM bytes
+
+    Keys may be configured either as raw PEM or as base64 encoded PEM.
+
+    Args:
+        key_str: Key string from settings
+
+    Returns:
+        PEM encoded key bytes
+    """
+    key_str = key_str.strip()
+    if key_str.startswith("-----BEGIN"):
+        return key_str.encode("utf-8")
+    return base64.b64decode(key_str)
+
+
+def compute_key_id(public_jwk: Dict[str, Any]) -> str:
+    """
+    Compute the RFC 7638 thumbprint of a public JWK
+
+    Args:
+        public_jwk: Public key in JWK form
+
+    Returns:
+        Base64url encoded SHA-256 thumbprint
+    """
+    members = _THUMBPRINT_MEMBERS[public_jwk["kty"]]
+    canonical = json.dumps(
+        {name: public_jwk[name] for name in members},
+        separators=(",", ":"),
+        sort_keys=True,
+    )
+    digest = hashlib.sha256(canonical.encode("utf-8")).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode("ascii")
+
+
+def _b64url_encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64url_decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+class Ed25519Key(Key):
+    """
+    EdDSA (Ed25519) key for python-jose, which only ships RSA, EC and HMAC
+
+    Registered with ``jwk.register_key`` so jose signs and verifies
+    ``EdDSA`` tokens through it like any built-in key type.
+    """
+
+    def __init__(self, key: Any, algorithm: str):
+        if algorithm != ALGORITHM_EDDSA:
+            raise JWKError(f"Ed25519 keys only support {ALGORITHM_EDDSA}")
+        self._algorithm = algorithm
+
+        if isinstance(key, (ed25519.Ed25519PrivateKey, ed25519.Ed25519PublicKey)):
+            self._key = key
+        elif isinstance(key, dict):
+            self._key = self._process_jwk(key)
+        else:
+            self._key = self._load_pem(key)
+
+    @staticmethod
+    def _process_jwk(jwk_dict: Dict[str, Any]) -> Any:
+        if jwk_dict.get("kty") != "OKP" or jwk_dict.get("crv") != "Ed25519":
+            raise JWKError("Expected an OKP Ed25519 JWK")
+        if "d" in jwk_dict:
+            return ed25519.Ed25519PrivateKey.from_private_bytes(
+                _b64url_decode(jwk_dict["d"])
+            )
+        return ed25519.Ed25519PublicKey.from_public_bytes(_b64url_decode(jwk_dict["x"]))
+
+    @staticmethod
+    def _load_pem(key: Any) -> Any:
+        if isinstance(key, str):
+            key = key.encode("utf-8")
+        try:
+            loaded = serialization.load_pem_private_key(key, password=None)
+        except ValueError:
+            try:
+                loaded = serialization.load_pem_public_key(key)
+            except ValueError as e:
+                raise JWKError(f"Invalid Ed25519 key: {str(e)}")
+        if not isinstance(
+            loaded, (ed25519.Ed25519PrivateKey, ed25519.Ed25519PublicKey)
+        ):
+            raise JWKError("Key is not an Ed25519 key")
+        return loaded
+
+    def is_public(self) -> bool:
+        return isinstance(self._key, ed25519.Ed25519PublicKey)
+
+    def sign(self, msg: bytes) -> bytes:
+        return self._key.sign(msg)
+
+    def verify(self, msg: bytes, sig: bytes) -> bool:
+        public = self._key if self.is_public() else self._key.public_key()
+        try:
+            public.verify(sig, msg)
+        except InvalidSignature:
+            return False
+        return True
+
+    def public_key(self) -> "Ed25519Key":
+        if self.is_public():
+            return self
+        return Ed25519Key(self._key.public_key(), self._algorithm)
+
+    def to_pem(self) -> bytes:
+        if self.is_public():
+            return self._key.public_bytes(
+                serialization.Encoding.PEM,
+                serialization.PublicFormat.SubjectPublicKeyInfo,
+            )
+        return self._key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption(),
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        public = self._key if self.is_public() else self._key.public_key()
+        data = {
+            "alg": self._algorithm,
+            "kty": "OKP",
+            "crv": "Ed25519",
+            "x": _b64url_encode(
+                public.public_bytes(
+                    serialization.Encoding.Raw, serialization.PublicFormat.Raw
+                )
+            ),
+        }
+        if not self.is_public():
+            data["d"] = _b64url_encode(
+                self._key.private_bytes(
+                    serialization.Encoding.Raw,
+                    serialization.PrivateFormat.Raw,
+                    serialization.NoEncryption(),
+                )
+            )
+        return data
+
+
+jwk.register_key(ALGORITHM_EDDSA, Ed25519Key)
+
+
+def infer_algorithm(key_str: str) -> str:
+    """
+    Pick the signing algorithm for a configured key from its key type
+
+    Args:
+        key_str: Private or public key from settings (PEM or base64 PEM)
+
+    Returns:
+        RS256 for RSA keys, ES256 for P-256 keys, EdDSA for Ed25519 keys
+
+    Raises:
+        ValueError: If the key type is not supported
+    """
+    pem = decode_key(key_str)
+    try:
+        key = serialization.load_pem_private_key(pem, password=None)
+    except ValueError:
+        key = serialization.load_pem_public_key(pem)
+
+    if isinstance(key, (rsa.RSAPrivateKey, rsa.RSAPublicKey)):
+        return ALGORITHM_RS256
+    if isinstance(key, (ec.EllipticCurvePrivateKey, ec.EllipticCurvePublicKey)):
+        if isinstance(key.curve, ec.SECP256R1):
+            return ALGORITHM_ES256
+        raise ValueError(f"Unsupported EC curve for JWT keys: {key.curve.name}")
+    if isinstance(key, (ed25519.Ed25519PrivateKey, ed25519.Ed25519PublicKey)):
+        return ALGORITHM_EDDSA
+    raise ValueError(f"Unsupported JWT key type: {type(key).__name__}")
+
+
+def _to_timestamp(value: Optional[datetime]) -> Optional[float]:
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+class ManagedKey:
+    """A JWT key together with its lifecycle state"""
+
+    def __init__(
+        self,
+        kid: str,
+        algorithm: str,
+        public_key: Key,
+        private_key: Optional[Key] = None,
+        status: str = KEY_STATUS_CURRENT,
+        retire_at: Optional[float] = None,
+    ):
+        self.kid = kid
+        self.algorithm = algorithm
+        self.public_key = public_key
+        self.private_key = private_key
+        self.status = status
+        self.retire_at = retire_at
+
+    def to_jwk(self) -> Dict[str, Any]:
+        """Public JWK representation for publication in the JWKS"""
+        public_jwk = self.public_key.to_dict()
+        public_jwk.update({"kid": self.kid, "use": "sig", "alg": self.algorithm})
+        return public_jwk
+
+
+class KeyStore:
+    """
+    Cache of parsed JWT signing and verification keys
+
+    PEM parsing is done once and the resulting key objects are reused for
+    every sign/verify call. The configured key settings are re-checked on
+    access so the cache reloads transparently when they change.
+
+    Besides the current signing key the store tracks an optional next key,
+    which is published ahead of time and takes over signing at its
+    activation time, and retiring keys that are only used for verification
+    until tokens signed with them have expired.
+
+    Every key carries its own algorithm, so a rotation can also move to a
+    different algorithm (e.g. RS256 to ES256 or EdDSA): tokens are verified
+    with the algorithm of the key named by their ``kid`` while both keys are
+    published.
+    """
+
+    def __init__(self):
+        self._source: Optional[Tuple[Any, ...]] = None
+        self._current: Optional[ManagedKey] = None
+        self._next: Optional[ManagedKey] = None
+        self._next_activates_at: Optional[float] = None
+        self._retiring: List[ManagedKey] = []
+        self._keys_by_kid: Dict[str, ManagedKey] = {}
+        self._jwks: Dict[str, Any] = {"keys": []}
+        self._next_transition_at = math.inf
+
+    @staticmethod
+    def _current_source() -> Tuple[Any, ...]:
+        return (
+            settings.JWT_PRIVATE_KEY,
+            settings.JWT_PUBLIC_KEY,
+            settings.JWT_ALGORITHM,
+            settings.JWT_KEY_ID,
+            settings.JWT_NEXT_PRIVATE_KEY,
+            settings.JWT_NEXT_KEY_ID,
+            settings.JWT_NEXT_ALGORITHM,
+            settings.JWT_NEXT_KEY_ACTIVATES_AT,
+            tuple(settings.JWT_RETIRING_PUBLIC_KEYS),
+        )
+
+    @staticmethod
+    def _build_key(
+        algorithm: str,
+        status: str,
+        private_key: Optional[str] = None,
+        public_key: Optional[str] = None,
+        kid: Optional[str] = None,
+    ) -> ManagedKey:
+        if algorithm not in SUPPORTED_ALGORITHMS:
+            raise ValueError(f"Unsupported JWT algorithm: {algorithm}")
+
+        private = None
+        if private_key:
+            private = jwk.construct(decode_key(private_key), algorithm)
+        if public_key:
+            public = jwk.construct(decode_key(public_key), algorithm)
+        else:
+            public = private.public_key()
+
+        return ManagedKey(
+            kid=kid or compute_key_id(public.to_dict()),
+            algorithm=algorithm,
+            public_key=public,
+            private_key=private,
+            status=status,
+        )
+
+    def load(self):
+        """Parse the configured keys, replacing any cached key objects"""
+        source = self._current_source()
+        algorithm = settings.JWT_ALGORITHM
+
+        current = self._build_key(
+            algorithm,
+            KEY_STATUS_CURRENT,
+            private_key=settings.JWT_PRIVATE_KEY,
+            public_key=settings.JWT_PUBLIC_KEY,
+            kid=settings.JWT_KEY_ID,
+        )
+
+        next_key = None
+        if settings.JWT_NEXT_PRIVATE_KEY:
+            next_key = self._build_key(
+                settings.JWT_NEXT_ALGORITHM
+                or infer_algorithm(settings.JWT_NEXT_PRIVATE_KEY),
+                KEY_STATUS_NEXT,
+                private_key=settings.JWT_NEXT_PRIVATE_KEY,
+                kid=settings.JWT_NEXT_KEY_ID,
+            )
+
+        # Retiring keys may use another algorithm than the current key
+        retiring = [
+            self._build_key(
+                infer_algorithm(public_key),
+                KEY_STATUS_RETIRING,
+                public_key=public_key,
+            )
+            for public_key in settings.JWT_RETIRING_PUBLIC_KEYS
+        ]
+
+        self._current = current
+        self._next = next_key
+        self._next_activates_at = (
+            _to_timestamp(settings.JWT_NEXT_KEY_ACTIVATES_AT) if next_key else None
+        )
+        self._retiring = retiring
+        self._source = source
+        self._maybe_rotate(time.time())
+        self._reindex()
+
+    def _reindex(self):
+        keys = [self._current]
+        if self._next is not None:
+            keys.append(self._next)
+        keys.extend(self._retiring)
+
+        self._keys_by_kid = {key.kid: key for key in keys}
+        self._jwks = {"keys": [key.to_jwk() for key in keys]}
+
+        transitions = [key.retire_at for key in self._retiring if key.retire_at]
+        if self._next_activates_at is not None:
+            transitions.append(self._next_activates_at)
+        self._next_transition_at = min(transitions, default=math.inf)
+
+    def _maybe_rotate(self, now: float) -> bool:
+        changed = False
+
+        if self._next_activates_at is not None and now >= self._next_activates_at:
+            # Old signing key stays verifiable until its longest-lived
+            # tokens (refresh tokens) have expired
+            retention = timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+            previous = self._current
+            previous.status = KEY_STATUS_RETIRING
+            previous.retire_at = self._next_activates_at + retention.total_seconds()
+
+            self._current = self._next
+            self._current.status = KEY_STATUS_CURRENT
+            self._next = None
+            self._next_activates_at = None
+            self._retiring.insert(0, previous)
+            changed = True
+            logger.info(
+                f"Rotated JWT signing key from {previous.kid} to {self._current.kid}"
+            )
+
+        expired = [
+            key for key in self._retiring if key.retire_at and key.retire_at <= now
+        ]
+        if expired:
+            self._retiring = [key for key in self._retiring if key not in expired]
+            changed = True
+            for key in expired:
+                logger.info(f"Removed retired JWT key {key.kid}")
+
+        return changed
+
+    def _ensure_loaded(self):
+        if self._source != self._current_source():
+            self.load()
+        elif time.time() >= self._next_transition_at:
+            if self._maybe_rotate(time.time()):
+                self._reindex()
+
+    @property
+    def signing_key(self) -> ManagedKey:
+        """Key used to sign new tokens"""
+        self._ensure_loaded()
+        return self._current
+
+    def get_verification_key(self, kid: Optional[str] = None) -> Optional[ManagedKey]:
+        """
+        Look up the key used to verify a token
+
+        Args:
+            kid: Key ID from the token header (tokens without one are
+                checked against the current key)
+
+        Returns:
+            Matching key or None if the key ID is unknown
+        """
+        self._ensure_loaded()
+        if kid is None:
+            return self._current
+        return self._keys_by_kid.get(kid)
+
+    @property
+    def jwks(self) -> Dict[str, Any]:
+        """Public JSON Web Key Set of all keys that may verify tokens"""
+        self._ensure_loaded()
+        return self._jwks
+
+
+# Global key store instance
+key_store = KeyStore()
@@ -2,10 +2,24 @@
 Password hashing and validation utilities
 """
 
-import bcrypt
+import asyncio
+import logging
+import multiprocessing
+import os
 import re
-from typing import Tuple
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
+from app.core.config import settings
+from app.core.exceptions import ServiceUnavailableError
+from app.utils.password_hashers import get_hasher, identify_hasher
+
+logger = logging.getLogger(__name__)
+
+# Password hashing executor backends
+BACKEND_THREAD = "thread"
+BACKEND_PROCESS = "process"
 
 # Password strength requirements
 MIN_PASSWORD_LENGTH = 8
@@ -16,16 +30,15 @@ PASSWORD_COMPLEXITY_PATTERN = re.compile(
 
 def hash_password(password: str) -> str:
     """
-    Hash a password using bcrypt with work factor 12
+    Hash a password with the configured algorithm and parameters
 
     Args:
         password: Plain text password
 
     Returns:
-        Hashed password string
+        Hashed password string, tagged with its algorithm and parameters
     """
-    salt = bcrypt.gensalt(rounds=12)
-    return bcrypt.hashpw(password.encode("utf-8"), salt).decode("utf-8")
+    return get_hasher().hash(password)
 
 
 def verify_password(password: str, password_hash: str) -> bool:
@@ -34,12 +47,403 @@ def verify_password(password: str, password_hash: str) -> bool:
 
     Args:
         password: Plain text password
-        password_hash: Bcrypt hash string
+        password_hash: Hash string of any registered algorithm
 
     Returns:
         True if password matches, False otherwise
     """
-    return bcrypt.checkpw(password.encode("utf-8"), password_hash.encode("utf-8"))
+    return identify_hasher(password_hash).verify(password, password_hash)
+
+
+def password_needs_rehash(password_hash: str) -> bool:
+    """
+    Check whether a hash was made with another algorithm or parameters than
+    the configured ones
+
+    Args:
+        password_hash: Stored hash string
+
+    Returns:
+        True if the hash should be replaced
+    """
+    hasher = get_hasher()
+    if not password_hash.startswith(hasher.prefixes):
+        return True
+    return hasher.needs_rehash(password_hash)
+
+
+def verify_and_rehash_password(
+    password: str, password_hash: str
+) -> Tuple[bool, Optional[str]]:
+    """
+    Verify a password and upgrade its hash to the current policy
+
+    Args:
+        password: Plain text password
+        password_hash: Stored hash string
+
+    Returns:
+        Tuple of (is_valid, new_hash); new_hash is None unless the password
+        is valid and the stored hash is outdated
+    """
+    if not verify_password(password, password_hash):
+        return False, None
+    if password_needs_rehash(password_hash):
+        return True, hash_password(password)
+    return True, None
+
+
+_dummy_password_hashes: Dict[str, str] = {}
+
+
+def _dummy_password_hash() -> str:
+    # Hash of a random password with the same cost as real hashes
+    policy = get_hasher().policy
+    if policy not in _dummy_password_hashes:
+        _dummy_password_hashes[policy] = hash_password(os.urandom(16).hex())
+    return _dummy_password_hashes[policy]
+
+
+def verify_dummy_password(password: str) -> bool:
+    """
+    Spend the same work as verify_password without a stored hash
+
+    Used when the user doesn't exist so that login latency doesn't reveal
+    whether an account is registered.
+
+    Args:
+        password: Plain text password
+
+    Returns:
+        Always False
+    """
+    verify_password(password, _dummy_password_hash())
+    return False
+
+
+def _seed_dummy_password_hashes(hashes: Dict[str, str]):
+    # Process pool initializer: workers reuse the server's dummy hashes
+    # instead of each computing one on its first unknown-user login
+    _dummy_password_hashes.update(hashes)
+
+
+def _run_batch(func: Callable[..., Any], args_list: List[Tuple[Any, ...]]) -> list:
+    # Runs inside a worker so a whole chunk costs one submission
+    return [func(*args) for args in args_list]
+
+
+class PasswordHashExecutor:
+    """
+    Bounded worker pool for password hashing work
+
+    Two backends are available. ``thread`` runs hashes on a small thread
+    pool: bcrypt, argon2-cffi and hashlib.scrypt release the GIL while
+    hashing, so this keeps the event loop responsive and uses several
+    cores. ``process`` runs them on a process pool instead, which keeps
+    hashing off the GIL entirely and scales with cores inside one server
+    process; workers are started up front, health checked and replaced if
+    the pool breaks.
+
+    The number of in-flight operations (running + queued) is capped; once the
+    cap is reached new work is rejected immediately instead of piling up.
+    Work can also be tagged with a partition (the application ID), each of
+    which gets its own smaller cap so a single tenant under a credential
+    stuffing attack can't take the whole pool.
+    """
+
+    def __init__(
+        self,
+        max_workers: int,
+        max_queue: int,
+        max_pending_per_partition: Optional[int] = None,
+        backend: str = BACKEND_THREAD,
+    ):
+        if backend not in (BACKEND_THREAD, BACKEND_PROCESS):
+            raise ValueError(f"Unknown password hash backend: {backend}")
+        # 0 sizes the pool to the machine
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_pending = self.max_workers + max_queue
+        self.max_pending_per_partition = max_pending_per_partition
+        self.backend = backend
+        self._pending = 0
+        self._pending_by_partition: Dict[str, int] = {}
+        self._executor: Optional[Executor] = None
+
+    @property
+    def pending(self) -> int:
+        """Number of operations currently running or queued"""
+        return self._pending
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.backend == BACKEND_PROCESS:
+                # spawn, not fork: the server process runs threads and an
+                # event loop that must not be copied into the workers
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_seed_dummy_password_hashes,
+                    initargs=(dict(_dummy_password_hashes),),
+                )
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="password-hash"
+                )
+        return self._executor
+
+    def _restart(self, broken: Executor):
+        # Every waiter on a broken pool gets BrokenProcessPool; only the
+        # first may replace it, or later ones would shut down (and cancel
+        # work on) the replacement
+        if self._executor is not broken:
+            return
+        self._executor = None
+        logger.warning("Password hash worker pool broken, restarting it")
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def pending_for(self, partition: str) -> int:
+        """Number of operations running or queued for a partition"""
+        return self._pending_by_partition.get(partition, 0)
+
+    def _acquire(self, partition: Optional[str], count: int = 1):
+        if self._pending + count > self.max_pending or (
+            partition is not None
+            and self.max_pending_per_partition is not None
+            and self.pending_for(partition) + count > self.max_pending_per_partition
+        ):
+            raise ServiceUnavailableError(
+                "Authentication service is busy. Please retry shortly."
+            )
+
+        self._pending += count
+        if partition is not None:
+            self._pending_by_partition[partition] = self.pending_for(partition) + count
+
+    def _release(self, partition: Optional[str], count: int = 1):
+        self._pending -= count
+        if partition is not None:
+            remaining = self._pending_by_partition[partition] - count
+            if remaining:
+                self._pending_by_partition[partition] = remaining
+            else:
+                del self._pending_by_partition[partition]
+
+    async def _submit(self, func: Callable[..., Any], *args: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        try:
+            return await loop.run_in_executor(executor, func, *args)
+        except BrokenProcessPool:
+            # A worker died; replace the pool (unless another caller already
+            # has) and retry once on the current one
+            self._restart(executor)
+            return await loop.run_in_executor(self._get_executor(), func, *args)
+
+    async def run(
+        self, func: Callable[..., Any], *args: Any, partition: Optional[str] = None
+    ) -> Any:
+        """
+        Run a blocking hash function on the pool
+
+        Raises:
+            ServiceUnavailableError: If the pool or the partition is saturated
+        """
+        self._acquire(partition)
+        try:
+            return await self._submit(func, *args)
+        finally:
+            self._release(partition)
+
+    async def run_batch(
+        self,
+        func: Callable[..., Any],
+        args_list: List[Tuple[Any, ...]],
+        partition: Optional[str] = None,
+    ) -> list:
+        """
+        Run a hash function over many argument tuples
+
+        The batch is split into one chunk per worker and each chunk is
+        submitted as a single task.
+
+        Args:
+            func: Hash function
+            args_list: Positional arguments for each call
+            partition: Application ID to count the work against
+
+        Returns:
+            Results in the order of args_list
+
+        Raises:
+            ServiceUnavailableError: If the batch doesn't fit in the pool
+        """
+        if not args_list:
+            return []
+
+        count = len(args_list)
+        self._acquire(partition, count)
+        try:
+            chunk_size = -(-count // self.max_workers)
+            chunks = [
+                args_list[i : i + chunk_size] for i in range(0, count, chunk_size)
+            ]
+            results = await asyncio.gather(
+                *[self._submit(_run_batch, func, chunk) for chunk in chunks]
+            )
+            return [result for chunk in results for result in chunk]
+        finally:
+            self._release(partition, count)
+
+    async def start(self):
+        """
+        Create the pool and start every worker ahead of the first login
+
+        Raises:
+            RuntimeError: If the configured hash algorithm is unavailable
+        """
+        # Computing the dummy hash up front keeps its cost off the first
+        # unknown-user login, and fails startup rather than every hash if
+        # the configured algorithm is unavailable (e.g. argon2id without
+        # argon2-cffi installed)
+        _dummy_password_hash()
+        if self.backend != BACKEND_PROCESS:
+            return
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        await asyncio.gather(
+            *[
+                loop.run_in_executor(executor, os.getpid)
+                for _ in range(self.max_workers)
+            ]
+        )
+        logger.info(f"Started {self.max_workers} password hash worker processes")
+
+    async def health_check(self, timeout: float = 5.0) -> bool:
+        """
+        Check that the pool can run work, restarting it if it can't
+
+        Returns:
+            True if the pool was healthy
+        """
+        executor = self._executor
+        if executor is None:
+            return True
+        loop = asyncio.get_running_loop()
+        try:
+            await asyncio.wait_for(loop.run_in_executor(executor, os.getpid), timeout)
+            return True
+        except (BrokenProcessPool, asyncio.TimeoutError):
+            self._restart(executor)
+            await self.start()
+            return False
+
+    def shutdown(self, wait: bool = True):
+        """Shutdown the workers, finishing work already started"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+
+
+# Global password hashing executor
+password_hash_executor = PasswordHashExecutor(
+    max_workers=settings.PASSWORD_HASH_MAX_WORKERS,
+    max_queue=settings.PASSWORD_HASH_MAX_QUEUE,
+    max_pending_per_partition=settings.PASSWORD_HASH_MAX_PENDING_PER_APP,
+    backend=settings.PASSWORD_HASH_BACKEND,
+)
+
+
+async def hash_password_async(password: str, partition: Optional[str] = None) -> str:
+    """
+    Hash a password without blocking the event loop
+
+    Args:
+        password: Plain text password
+        partition: Application ID to count the work against
+
+    Returns:
+        Hashed password string
+
+    Raises:
+        ServiceUnavailableError: If the hashing pool is saturated
+    """
+    return await password_hash_executor.run(
+        hash_password, password, partition=partition
+    )
+
+
+async def hash_passwords_async(
+    passwords: List[str], partition: Optional[str] = None
+) -> List[str]:
+    """
+    Hash many passwords in one batch (bulk imports, migrations)
+
+    Args:
+        passwords: Plain text passwords
+        partition: Application ID to count the work against
+
+    Returns:
+        Hashed password strings in the same order
+
+    Raises:
+        ServiceUnavailableError: If the hashing pool can't take the batch
+    """
+    return await password_hash_executor.run_batch(
+        hash_password, [(password,) for password in passwords], partition=partition
+    )
+
+
+async def verify_password_async(
+    password: str, password_hash: Optional[str], partition: Optional[str] = None
+) -> bool:
+    """
+    Verify a password against a hash without blocking the event loop
+
+    A missing hash (unknown user) is checked against a dummy hash so the
+    call costs the same either way.
+
+    Args:
+        password: Plain text password
+        password_hash: Stored hash string, or None if there is no user
+        partition: Application ID to count the work against
+
+    Returns:
+        True if password matches, False otherwise
+
+    Raises:
+        ServiceUnavailableError: If the hashing pool is saturated
+    """
+    if password_hash is None:
+        return await password_hash_executor.run(
+            verify_dummy_password, password, partition=partition
+        )
+    return await password_hash_executor.run(
+        verify_password, password, password_hash, partition=partition
+    )
+
+
+async def verify_and_rehash_password_async(
+    password: str, password_hash: Optional[str], partition: Optional[str] = None
+) -> Tuple[bool, Optional[str]]:
+    """
+    Verify a password and upgrade an outdated hash in one executor call
+
+    Args:
+        password: Plain text password
+        password_hash: Stored hash string, or None if there is no user
+        partition: Application ID to count the work against
+
+    Returns:
+        Tuple of (is_valid, new_hash); store new_hash when it is not None
+
+    Raises:
+        ServiceUnavailableError: If the hashing pool is saturated
+    """
+    if password_hash is None:
+        return await verify_password_async(password, None, partition=partition), None
+    return await password_hash_executor.run(
+        verify_and_rehash_password, password, password_hash, partition=partition
+    )
 
 
 def validate_password_strength(password: str) -> Tuple[bool, str]:
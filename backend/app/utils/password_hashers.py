@@ -0,0 +1,281 @@
+"""
+Password hasher registry
+
+Every stored hash carries its algorithm and cost parameters, so hashes
+created under an older policy keep verifying and can be upgraded when
+the user next logs in.
+"""
+
+import base64
+import hashlib
+import hmac
+import os
+import re
+from abc import ABC, abstractmethod
+from typing import Dict, Optional, Type
+
+import bcrypt
+
+from app.core.config import settings
+
+try:
+    import argon2
+except ImportError:  # pragma: no cover - optional dependency
+    argon2 = None
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.b64decode(data + "=" * (-len(data) % 4))
+
+
+class PasswordHasher(ABC):
+    """Base class for password hashing algorithms"""
+
+    algorithm: str = ""
+    prefixes: tuple = ()
+
+    @property
+    @abstractmethod
+    def policy(self) -> str:
+        """Algorithm and parameters, e.g. ``bcrypt:rounds=12``"""
+
+    @abstractmethod
+    def hash(self, password: str) -> str:
+        """Hash a password with this hasher's parameters"""
+
+    @abstractmethod
+    def verify(self, password: str, encoded: str) -> bool:
+        """Check a password, returning False for malformed hashes"""
+
+    @abstractmethod
+    def needs_rehash(self, encoded: str) -> bool:
+        """Whether a hash of this algorithm uses other parameters"""
+
+
+class BcryptHasher(PasswordHasher):
+    """bcrypt, encoded as ``$2b$<rounds>$<salt+hash>``"""
+
+    algorithm = "bcrypt"
+    prefixes = ("$2a$", "$2b$", "$2y$")
+    # 22 salt + 31 hash characters of bcrypt's base64 alphabet
+    _pattern = re.compile(r"^\$2[aby]\$\d{2}\$[./A-Za-z0-9]{53}$")
+
+    def __init__(self, rounds: int = 12):
+        self.rounds = rounds
+
+    @property
+    def policy(self) -> str:
+        return f"bcrypt:rounds={self.rounds}"
+
+    def hash(self, password: str) -> str:
+        salt = bcrypt.gensalt(rounds=self.rounds)
+        return bcrypt.hashpw(password.encode("utf-8"), salt).decode("utf-8")
+
+    def verify(self, password: str, encoded: str) -> bool:
+        # Checked up front: bcrypt can panic (a BaseException) rather than
+        # raise ValueError on some malformed hashes
+        if not self._pattern.match(encoded):
+            return False
+        try:
+            return bcrypt.checkpw(password.encode("utf-8"), encoded.encode("utf-8"))
+        except ValueError:
+            # Malformed stored hash, e.g. an out-of-range cost
+            return False
+
+    def needs_rehash(self, encoded: str) -> bool:
+        return int(encoded.split("$")[2]) != self.rounds
+
+
+class Argon2idHasher(PasswordHasher):
+    """
+    Argon2id (requires argon2-cffi), encoded in the PHC string format
+    ``$argon2id$v=19$m=<KiB>,t=<iterations>,p=<lanes>$<salt>$<hash>``
+    """
+
+    algorithm = "argon2id"
+    prefixes = ("$argon2id$",)
+
+    def __init__(
+        self, time_cost: int = 3, memory_cost: int = 65536, parallelism: int = 1
+    ):
+        if argon2 is None:
+            raise RuntimeError(
+                "The argon2id password hasher requires the argon2-cffi package"
+            )
+        self.time_cost = time_cost
+        self.memory_cost = memory_cost
+        self.parallelism = parallelism
+        self._hasher = argon2.PasswordHasher(
+            time_cost=time_cost,
+            memory_cost=memory_cost,
+            parallelism=parallelism,
+            type=argon2.Type.ID,
+        )
+
+    @property
+    def policy(self) -> str:
+        return f"argon2id:t={self.time_cost},m={self.memory_cost},p={self.parallelism}"
+
+    def hash(self, password: str) -> str:
+        return self._hasher.hash(password)
+
+    def verify(self, password: str, encoded: str) -> bool:
+        try:
+            return self._hasher.verify(encoded, password)
+        except (argon2.exceptions.VerificationError, argon2.exceptions.InvalidHash):
+            # Wrong password, or a malformed or corrupted stored hash
+            return False
+
+    def needs_rehash(self, encoded: str) -> bool:
+        return self._hasher.check_needs_rehash(encoded)
+
+
+class ScryptHasher(PasswordHasher):
+    """
+    scrypt from hashlib, encoded as
+    ``$scrypt$ln=<log2 N>,r=<block size>,p=<parallelism>$<salt>$<hash>``
+    """
+
+    algorithm = "scrypt"
+    prefixes = ("$scrypt$",)
+    salt_bytes = 16
+    hash_bytes = 32
+
+    def __init__(self, ln: int = 15, r: int = 8, p: int = 1):
+        self.ln = ln
+        self.r = r
+        self.p = p
+
+    @property
+    def policy(self) -> str:
+        return f"scrypt:ln={self.ln},r={self.r},p={self.p}"
+
+    @staticmethod
+    def _derive(password: str, salt: bytes, ln: int, r: int, p: int) -> bytes:
+        n = 1 << ln
+        return hashlib.scrypt(
+            password.encode("utf-8"),
+            salt=salt,
+            n=n,
+            r=r,
+            p=p,
+            # Default OpenSSL limit is 32 MiB, too low for larger N
+            maxmem=128 * r * (n + p + 2) + 1024 * 1024,
+            dklen=ScryptHasher.hash_bytes,
+        )
+
+    @staticmethod
+    def _parse(encoded: str) -> tuple:
+        _, _, params, salt, digest = encoded.split("$")
+        values = dict(item.split("=") for item in params.split(","))
+        return (
+            int(values["ln"]),
+            int(values["r"]),
+            int(values["p"]),
+            _b64decode(salt),
+            _b64decode(digest),
+        )
+
+    def hash(self, password: str) -> str:
+        salt = os.urandom(self.salt_bytes)
+        digest = self._derive(password, salt, self.ln, self.r, self.p)
+        return (
+            f"$scrypt$ln={self.ln},r={self.r},p={self.p}"
+            f"${_b64encode(salt)}${_b64encode(digest)}"
+        )
+
+    def verify(self, password: str, encoded: str) -> bool:
+        try:
+            ln, r, p, salt, digest = self._parse(encoded)
+        except (ValueError, KeyError):
+            # Malformed stored hash
+            return False
+        return hmac.compare_digest(self._derive(password, salt, ln, r, p), digest)
+
+    def needs_rehash(self, encoded: str) -> bool:
+        ln, r, p, _, _ = self._parse(encoded)
+        return (ln, r, p) != (self.ln, self.r, self.p)
+
+
+# Registered password hashers by algorithm name
+PASSWORD_HASHERS: Dict[str, Type[PasswordHasher]] = {
+    hasher.algorithm: hasher for hasher in (BcryptHasher, Argon2idHasher, ScryptHasher)
+}
+
+
+def build_hasher(algorithm: str) -> PasswordHasher:
+    """
+    Create a hasher for an algorithm with the configured parameters
+
+    Raises:
+        ValueError: If the algorithm is not registered
+    """
+    if algorithm == BcryptHasher.algorithm:
+        return BcryptHasher(rounds=settings.PASSWORD_HASH_BCRYPT_ROUNDS)
+    if algorithm == Argon2idHasher.algorithm:
+        return Argon2idHasher(
+            time_cost=settings.PASSWORD_HASH_ARGON2_TIME_COST,
+            memory_cost=settings.PASSWORD_HASH_ARGON2_MEMORY_KIB,
+            parallelism=settings.PASSWORD_HASH_ARGON2_PARALLELISM,
+        )
+    if algorithm == ScryptHasher.algorithm:
+        return ScryptHasher(
+            ln=settings.PASSWORD_HASH_SCRYPT_LN,
+            r=settings.PASSWORD_HASH_SCRYPT_R,
+            p=settings.PASSWORD_HASH_SCRYPT_P,
+        )
+    raise ValueError(f"Unknown password hash algorithm: {algorithm}")
+
+
+def _current_source() -> tuple:
+    return (
+        settings.PASSWORD_HASH_BCRYPT_ROUNDS,
+        settings.PASSWORD_HASH_ARGON2_TIME_COST,
+        settings.PASSWORD_HASH_ARGON2_MEMORY_KIB,
+        settings.PASSWORD_HASH_ARGON2_PARALLELISM,
+        settings.PASSWORD_HASH_SCRYPT_LN,
+        settings.PASSWORD_HASH_SCRYPT_R,
+        settings.PASSWORD_HASH_SCRYPT_P,
+    )
+
+
+_hashers: Dict[str, PasswordHasher] = {}
+_hashers_source: Optional[tuple] = None
+
+
+def get_hasher(algorithm: Optional[str] = None) -> PasswordHasher:
+    """
+    Get the hasher for an algorithm (the configured default if omitted)
+
+    Hashers are cached and rebuilt when their configured parameters change.
+    """
+    global _hashers_source
+
+    algorithm = algorithm or settings.PASSWORD_HASH_ALGORITHM
+    source = _current_source()
+    if source != _hashers_source:
+        _hashers.clear()
+        _hashers_source = source
+
+    hasher = _hashers.get(algorithm)
+    if hasher is None:
+        hasher = build_hasher(algorithm)
+        _hashers[algorithm] = hasher
+    return hasher
+
+
+def identify_hasher(encoded: str) -> PasswordHasher:
+    """
+    Get the hasher that produced a stored hash
+
+    Raises:
+        ValueError: If the hash format is not recognised
+    """
+    for algorithm, hasher_class in PASSWORD_HASHERS.items():
+        if encoded.startswith(hasher_class.prefixes):
+            return get_hasher(algorithm)
+    raise ValueError("Unrecognised password hash format")
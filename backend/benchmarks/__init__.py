@@ -0,0 +1 @@
+"""Microbenchmarks for hot code paths"""
@@ -0,0 +1,133 @@
+"""
+JWT sign/verify microbenchmark
+
+Compares the per-call cost of parsing the PEM keys on every sign/verify
+against reusing the cached key objects from the key store, then reports
+sign/verify throughput of each supported signing algorithm with freshly
+generated keys (RSA 2048, P-256, Ed25519).
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_jwt [--iterations N]
+"""
+
+import argparse
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+from jose import jwk, jwt
+
+from app.core.config import settings
+from app.utils.jwt import create_access_token, verify_token
+from app.utils.keys import (
+    ALGORITHM_EDDSA,
+    ALGORITHM_ES256,
+    ALGORITHM_RS256,
+    decode_key,
+)
+
+
+def _payload() -> dict:
+    return {
+        "sub": str(uuid.uuid4()),
+        "app_id": "bench-app",
+        "email": "bench@example.com",
+        "iat": datetime.utcnow(),
+        "exp": datetime.utcnow() + timedelta(minutes=15),
+        "type": "access",
+    }
+
+
+def uncached_sign() -> str:
+    """Sign the way tokens were issued before the key store existed"""
+    private_key = decode_key(settings.JWT_PRIVATE_KEY)
+    return jwt.encode(_payload(), private_key, algorithm=settings.JWT_ALGORITHM)
+
+
+def uncached_verify(token: str) -> dict:
+    """Verify the way tokens were checked before the key store existed"""
+    public_key = decode_key(settings.JWT_PUBLIC_KEY)
+    return jwt.decode(token, public_key, algorithms=[settings.JWT_ALGORITHM])
+
+
+def cached_sign() -> str:
+    return create_access_token(
+        user_id=uuid.uuid4(), app_id="bench-app", email="bench@example.com"
+    )
+
+
+def _generate_private_key(algorithm: str) -> bytes:
+    if algorithm == ALGORITHM_ES256:
+        private_key = ec.generate_private_key(ec.SECP256R1())
+    elif algorithm == ALGORITHM_EDDSA:
+        private_key = ed25519.Ed25519PrivateKey.generate()
+    else:
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    return private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    )
+
+
+def _algorithm_throughput(algorithm: str, iterations: int) -> tuple:
+    """Sign and verify ops/s with parsed keys, as the key store uses them"""
+    private_key = jwk.construct(_generate_private_key(algorithm), algorithm)
+    public_key = private_key.public_key()
+    payload = _payload()
+
+    def sign() -> str:
+        return jwt.encode(payload, private_key, algorithm=algorithm)
+
+    token = sign()
+
+    def verify() -> dict:
+        return jwt.decode(token, public_key, algorithms=[algorithm])
+
+    sign_ops = 1_000_000 / _time_per_call(sign, iterations)
+    verify_ops = 1_000_000 / _time_per_call(verify, iterations)
+    return sign_ops, verify_ops, len(token)
+
+
+def _time_per_call(func, iterations: int, *args) -> float:
+    func(*args)  # warm up
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func(*args)
+    return (time.perf_counter() - start) / iterations * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=500)
+    args = parser.parse_args()
+
+    token = cached_sign()
+    rows = [
+        ("sign (parse per call)", _time_per_call(uncached_sign, args.iterations)),
+        ("sign (cached key)", _time_per_call(cached_sign, args.iterations)),
+        (
+            "verify (parse per call)",
+            _time_per_call(uncached_verify, args.iterations, token),
+        ),
+        (
+            "verify (cached key)",
+            _time_per_call(verify_token, args.iterations, token),
+        ),
+    ]
+
+    print(f"{settings.JWT_ALGORITHM}, {args.iterations} iterations")
+    for name, micros in rows:
+        print(f"{name:<26} {micros:>10.1f} us/op")
+
+    print()
+    print(f"{'algorithm':<10} {'sign ops/s':>12} {'verify ops/s':>13} {'token':>7}")
+    for algorithm in (ALGORITHM_RS256, ALGORITHM_ES256, ALGORITHM_EDDSA):
+        sign_ops, verify_ops, size = _algorithm_throughput(algorithm, args.iterations)
+        print(f"{algorithm:<10} {sign_ops:>12,.0f} {verify_ops:>13,.0f} {size:>6}B")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Rate limiter throughput benchmark
+
+Compares the previous pipelined ZSET implementation against the Lua
+sliding window log, sliding window counter and GCRA scripts, and GCRA
+with local token leasing, under concurrent load. Reports the Redis
+memory held per identifier.
+
+Runs against an in-process fakeredis server unless --redis-url is given.
+The fake server has no network round trip, so it understates the gain of
+collapsing several round trips into one; use a real Redis for absolute
+numbers.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_rate_limiter [--redis-url URL]
+        [--requests N] [--concurrency N] [--identifiers N] [--limit N]
+        [--lease-size N]
+"""
+
+import argparse
+import asyncio
+import time
+
+import redis.asyncio as redis
+
+from app.core.redis import RedisClient
+from app.services.rate_limiter import (
+    ALGORITHM_GCRA,
+    ALGORITHM_SLIDING_WINDOW_COUNTER,
+    ALGORITHM_SLIDING_WINDOW_LOG,
+    RateLimiter,
+)
+
+
+class PipelineRateLimiter(RateLimiter):
+    """The pre-Lua implementation: 4-command pipeline, 2 more on rejection"""
+
+    async def check_rate_limit(self, identifier, limit=None):
+        limit = limit or self.requests_per_minute
+        redis_client = RedisClient._instance
+        key = f"rate_limit_pipeline:{identifier}"
+        now = time.time()
+
+        pipe = redis_client.pipeline()
+        pipe.zremrangebyscore(key, 0, now - self.window_seconds)
+        pipe.zcard(key)
+        pipe.zadd(key, {str(now): now})
+        pipe.expire(key, self.window_seconds)
+        results = await pipe.execute()
+
+        if results[1] >= limit:
+            await redis_client.zadd(key, {str(now): now})
+            await redis_client.expire(key, self.window_seconds)
+            return False, 0
+        return True, limit - results[1] - 1
+
+
+def _connect(redis_url):
+    if redis_url:
+        return redis.from_url(redis_url, decode_responses=True, max_connections=100)
+
+    import fakeredis
+
+    return fakeredis.FakeAsyncRedis(decode_responses=True)
+
+
+async def _memory_per_key(redis_client, pattern: str) -> str:
+    keys = [key async for key in redis_client.scan_iter(match=pattern)]
+    if not keys:
+        return "-"
+    try:
+        total = sum([await redis_client.memory_usage(key) or 0 for key in keys])
+    except Exception:
+        return "n/a"
+    return f"{total / len(keys):.0f} B"
+
+
+async def _run(limiter, args) -> tuple:
+    queue = asyncio.Queue()
+    for i in range(args.requests):
+        queue.put_nowait(f"client-{i % args.identifiers}")
+    allowed = 0
+
+    async def worker():
+        nonlocal allowed
+        while not queue.empty():
+            identifier = queue.get_nowait()
+            ok, _ = await limiter.check_rate_limit(identifier, args.limit)
+            allowed += ok
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(args.concurrency)])
+    return time.perf_counter() - start, allowed
+
+
+async def main_async(args):
+    RedisClient._instance = _connect(args.redis_url)
+    redis_client = RedisClient._instance
+    await redis_client.flushdb()
+
+    limiters = [
+        ("pipeline (before)", PipelineRateLimiter(), "rate_limit_pipeline:*"),
+        (
+            "lua sliding log",
+            RateLimiter(algorithm=ALGORITHM_SLIDING_WINDOW_LOG),
+            "rate_limit:*",
+        ),
+        (
+            "lua sliding counter",
+            RateLimiter(algorithm=ALGORITHM_SLIDING_WINDOW_COUNTER),
+            "rate_limit_swc:*",
+        ),
+        ("lua gcra", RateLimiter(algorithm=ALGORITHM_GCRA), "rate_limit_gcra:*"),
+        (
+            f"lua gcra, lease {args.lease_size}",
+            RateLimiter(algorithm=ALGORITHM_GCRA, lease_size=args.lease_size),
+            "rate_limit_gcra:*",
+        ),
+    ]
+
+    print(
+        f"{args.requests} requests, concurrency {args.concurrency}, "
+        f"{args.identifiers} identifiers, limit {args.limit}/min, "
+        f"{args.redis_url or 'fakeredis'}"
+    )
+    print(f"{'':<22}{'req/s':>10}{'allowed':>10}{'mem/key':>10}")
+    for name, limiter, pattern in limiters:
+        elapsed, allowed = await _run(limiter, args)
+        memory = await _memory_per_key(redis_client, pattern)
+        await redis_client.flushdb()
+        print(f"{name:<22}{args.requests / elapsed:>10.0f}{allowed:>10}{memory:>10}")
+
+    await redis_client.flushdb()
+    await RedisClient.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--redis-url", default=None)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--identifiers", type=int, default=20)
+    parser.add_argument("--limit", type=int, default=500)
+    parser.add_argument("--lease-size", type=int, default=20)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
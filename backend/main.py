@@ -13,8 +13,16 @@ from app.core.config import settings
 from app.core.database import engine, Base
 from app.core.logging_config import setup_logging, RequestLoggingMiddleware
 from app.core.exceptions import DevAuthException
+from app.core.middleware import RateLimitMiddleware
 from app.core.scheduler import start_scheduler, shutdown_scheduler
-from app.api.v1 import auth, portal, introspect
+from app.services.api_key_usage import api_key_usage_tracker
+from app.services.audit import audit_service
+from app.services.bulk_email import bulk_email_service
+from app.services.email import email_service
+from app.services.email_outbox import email_outbox
+from app.utils.keys import key_store
+from app.utils.password import password_hash_executor
+from app.api.v1 import auth, portal, introspect, jwks
 
 # Setup logging
 logger = setup_logging()
@@ -23,17 +31,32 @@ logger = setup_logging()
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Lifespan context manager for startup and shutdown events"""
-    # Startup: Create database tables
+    # Startup: Parse JWT keys once so the first request doesn't pay for it
+    key_store.load()
+
+    # Start password hashing workers before accepting logins
+    await password_hash_executor.start()
+
+    # Create database tables
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
 
-    # Start background scheduler
+    # Start background scheduler, email dispatcher and audit log writer
     start_scheduler()
+    email_outbox.start()
+    audit_service.start()
 
     yield
 
-    # Shutdown: Stop scheduler and close database connections
+    # Shutdown: Stop scheduler, email dispatcher, hashing workers, flush
+    # queued audit events and close SMTP and database connections
     shutdown_scheduler()
+    await bulk_email_service.stop()
+    await email_outbox.stop()
+    await email_service.close()
+    await api_key_usage_tracker.flush()
+    await audit_service.stop()
+    password_hash_executor.shutdown()
     await engine.dispose()
 
 
@@ -47,6 +70,10 @@ app = FastAPI(
 # Request logging middleware
 app.add_middleware(RequestLoggingMiddleware)
 
+# Rate limiting middleware (added after logging so it runs first and sheds
+# load before any other work; CORS still wraps 429 responses)
+app.add_middleware(RateLimitMiddleware)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -97,6 +124,7 @@ async def general_exception_handler(request: Request, exc: Exception):
 app.include_router(auth.router, prefix="/v1/auth", tags=["authentication"])
 app.include_router(portal.router, prefix="/v1/portal", tags=["developer-portal"])
 app.include_router(introspect.router, prefix="/v1/auth", tags=["token-introspection"])
+app.include_router(jwks.router, tags=["jwks"])
 
 
 @app.get("/health")
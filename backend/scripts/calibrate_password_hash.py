@@ -0,0 +1,109 @@
+"""
+Password hash parameter calibration
+
+Measures verify latency on this machine and picks the strongest
+parameters for an algorithm that stay within a target latency. Run it on
+the hardware that serves logins and copy the printed settings into the
+environment; existing hashes are upgraded as users log in.
+
+Usage (from the backend directory):
+    python -m scripts.calibrate_password_hash [--algorithm bcrypt|argon2id|scrypt]
+        [--target-ms 250] [--argon2-memory-kib 65536] [--samples 3]
+"""
+
+import argparse
+import time
+from typing import Callable, Dict, Iterator, Tuple
+
+from app.utils.password_hashers import (
+    Argon2idHasher,
+    BcryptHasher,
+    PasswordHasher,
+    ScryptHasher,
+)
+
+_PASSWORD = "calibration-Password-123!"
+
+
+def _verify_ms(hasher: PasswordHasher, samples: int) -> float:
+    encoded = hasher.hash(_PASSWORD)
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        hasher.verify(_PASSWORD, encoded)
+        timings.append((time.perf_counter() - start) * 1000)
+    return min(timings)
+
+
+def _bcrypt_candidates(args) -> Iterator[Tuple[PasswordHasher, Dict[str, int]]]:
+    for rounds in range(10, 20):
+        yield BcryptHasher(rounds=rounds), {"PASSWORD_HASH_BCRYPT_ROUNDS": rounds}
+
+
+def _argon2_candidates(args) -> Iterator[Tuple[PasswordHasher, Dict[str, int]]]:
+    # Memory is fixed by the operator; iterations are raised to fill the budget
+    for time_cost in range(1, 21):
+        hasher = Argon2idHasher(
+            time_cost=time_cost,
+            memory_cost=args.argon2_memory_kib,
+            parallelism=args.argon2_parallelism,
+        )
+        yield hasher, {
+            "PASSWORD_HASH_ARGON2_TIME_COST": time_cost,
+            "PASSWORD_HASH_ARGON2_MEMORY_KIB": args.argon2_memory_kib,
+            "PASSWORD_HASH_ARGON2_PARALLELISM": args.argon2_parallelism,
+        }
+
+
+def _scrypt_candidates(args) -> Iterator[Tuple[PasswordHasher, Dict[str, int]]]:
+    for ln in range(12, 22):
+        yield ScryptHasher(ln=ln, r=8, p=1), {
+            "PASSWORD_HASH_SCRYPT_LN": ln,
+            "PASSWORD_HASH_SCRYPT_R": 8,
+            "PASSWORD_HASH_SCRYPT_P": 1,
+        }
+
+
+CANDIDATES: Dict[str, Callable] = {
+    BcryptHasher.algorithm: _bcrypt_candidates,
+    Argon2idHasher.algorithm: _argon2_candidates,
+    ScryptHasher.algorithm: _scrypt_candidates,
+}
+
+
+def calibrate(args) -> Dict[str, int]:
+    """Return the settings of the strongest candidate within the target"""
+    chosen = None
+    for hasher, candidate_settings in CANDIDATES[args.algorithm](args):
+        elapsed = _verify_ms(hasher, args.samples)
+        print(f"  {hasher.policy:<40} {elapsed:>8.1f} ms")
+        if elapsed > args.target_ms:
+            break
+        chosen = candidate_settings
+    if chosen is None:
+        raise SystemExit(
+            f"Even the cheapest {args.algorithm} parameters exceed {args.target_ms} ms"
+        )
+    return chosen
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--algorithm", choices=sorted(CANDIDATES), default="bcrypt")
+    parser.add_argument("--target-ms", type=float, default=250.0)
+    parser.add_argument("--argon2-memory-kib", type=int, default=65536)
+    parser.add_argument("--argon2-parallelism", type=int, default=1)
+    parser.add_argument("--samples", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"Calibrating {args.algorithm} for a {args.target_ms:.0f} ms verify")
+    chosen = calibrate(args)
+
+    print("\nRecommended settings:")
+    print(f"PASSWORD_HASH_ALGORITHM={args.algorithm}")
+    for name, value in chosen.items():
+        print(f"{name}={value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,7 @@ Pytest configuration and fixtures
 
 import os
 
+import fakeredis
 import pytest
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.pool import StaticPool
@@ -13,6 +14,7 @@ os.environ.setdefault("DISABLE_SCHEDULER", "1")
 os.environ.setdefault("ENVIRONMENT", "test")
 
 from app.core.database import Base, get_db
+from app.core.redis import RedisClient
 from main import app
 
 
@@ -46,6 +48,14 @@ async def db_session():
         await conn.run_sync(Base.metadata.drop_all)
 
 
+@pytest.fixture
+async def redis_client():
+    """Replace the shared Redis client with an in-memory fake"""
+    RedisClient._instance = fakeredis.FakeAsyncRedis(decode_responses=True)
+    yield RedisClient._instance
+    await RedisClient.close()
+
+
 @pytest.fixture
 def client(db_session):
     """Create a test client"""
@@ -0,0 +1,72 @@
+"""
+API key resolution cache tests
+"""
+
+import uuid
+
+from app.models import Application
+from app.services.api_key_cache import APIKeyCache
+
+
+def _application(app_id: str = "test-app") -> Application:
+    return Application(
+        id=uuid.uuid4(),
+        developer_id=uuid.uuid4(),
+        name="Test App",
+        environment="dev",
+        app_id=app_id,
+    )
+
+
+async def test_cache_round_trip(redis_client):
+    """Test that a cached key resolves to its application"""
+    cache = APIKeyCache()
+    api_key_id = uuid.uuid4()
+    await cache.set("hash", api_key_id, _application())
+
+    cached_id, application = await cache.get("hash", "test-app")
+
+    assert cached_id == api_key_id
+    assert application.name == "Test App"
+
+
+async def test_shared_tier_serves_other_workers(redis_client):
+    """Test that entries written by one worker are visible to another"""
+    await APIKeyCache().set("hash", uuid.uuid4(), _application())
+
+    assert await APIKeyCache().get("hash", "test-app") is not None
+
+
+async def test_cache_checks_app_id(redis_client):
+    """Test that a key presented for another application misses"""
+    cache = APIKeyCache()
+    await cache.set("hash", uuid.uuid4(), _application())
+
+    assert await cache.get("hash", "other-app") is None
+
+
+async def test_invalidate_removes_both_tiers(redis_client):
+    """Test that invalidation drops local and shared entries"""
+    cache = APIKeyCache()
+    await cache.set("hash", uuid.uuid4(), _application())
+
+    await cache.invalidate(["hash"])
+
+    assert await cache.get("hash", "test-app") is None
+    assert await APIKeyCache().get("hash", "test-app") is None
+
+
+async def test_stale_read_cannot_recache_revoked_key(redis_client):
+    """Test that a lookup that raced with revocation doesn't cache the key"""
+    cache = APIKeyCache()
+    api_key_id = uuid.uuid4()
+    application = _application()
+
+    # A request reads the key row, then the key is revoked before the
+    # request writes it to the cache
+    assert await cache.get("hash", "test-app") is None
+    await cache.invalidate(["hash"])
+    await cache.set("hash", api_key_id, application)
+
+    assert await cache.get("hash", "test-app") is None
+    assert await APIKeyCache().get("hash", "test-app") is None
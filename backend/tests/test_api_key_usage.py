@@ -0,0 +1,74 @@
+"""
+API key usage write-behind tests
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select
+
+from app.models import APIKey, Application, Developer
+from app.services import api_key_usage
+from app.services.api_key_usage import APIKeyUsageTracker
+from tests.conftest import TestSessionLocal
+
+
+@pytest.fixture
+async def api_keys(db_session, monkeypatch):
+    """Create two API keys and route the tracker to the test database"""
+    monkeypatch.setattr(api_key_usage, "AsyncSessionLocal", TestSessionLocal)
+
+    developer = Developer(email="dev@example.com", password_hash="x")
+    db_session.add(developer)
+    await db_session.flush()
+    db_session.add(
+        Application(
+            developer_id=developer.id,
+            name="Test App",
+            environment="dev",
+            app_id="test-app",
+            app_secret_encrypted="x",
+        )
+    )
+    keys = [APIKey(app_id="test-app", key_hash=f"hash-{i}") for i in range(2)]
+    db_session.add_all(keys)
+    await db_session.commit()
+    return keys
+
+
+async def _last_used(db_session, key):
+    result = await db_session.execute(
+        select(APIKey.last_used_at)
+        .where(APIKey.id == key.id)
+        .execution_options(populate_existing=True)
+    )
+    return result.scalar_one()
+
+
+async def test_flush_writes_pending_timestamps(db_session, api_keys):
+    """Test that recorded usage is written on flush and not before"""
+    tracker = APIKeyUsageTracker()
+    for key in api_keys:
+        tracker.record(key.id)
+        tracker.record(key.id)
+
+    assert await _last_used(db_session, api_keys[0]) is None
+    assert await tracker.flush() == 2
+    assert tracker.pending_count == 0
+    for key in api_keys:
+        assert await _last_used(db_session, key) is not None
+
+
+async def test_flush_never_moves_timestamp_backwards(db_session, api_keys):
+    """Test that an older timestamp from another worker is ignored"""
+    newer = datetime.utcnow()
+    api_keys[0].last_used_at = newer
+    await db_session.commit()
+
+    tracker = APIKeyUsageTracker()
+    tracker.record(api_keys[0].id)
+    tracker._pending[api_keys[0].id] = newer - timedelta(minutes=5)
+    await tracker.flush()
+
+    stored = await _last_used(db_session, api_keys[0])
+    assert stored.replace(tzinfo=None) == newer
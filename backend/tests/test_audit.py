@@ -0,0 +1,168 @@
+"""
+Batched audit log writer tests
+"""
+
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import func, select
+
+from app.core.config import settings
+from app.models import Application, AuditLog, Developer
+from app.schemas import UserCreate, UserLogin
+from app.services import audit as audit_module
+from app.services.audit import AUDIT_OVERFLOW_BLOCK, AuditService, audit_service
+from app.services.auth import auth_service
+from app.utils import hash_token
+from tests.conftest import TestSessionLocal
+
+
+@pytest.fixture(autouse=True)
+def audit_db(db_session, monkeypatch):
+    """Route the audit writer to the test database"""
+    monkeypatch.setattr(audit_module, "AsyncSessionLocal", TestSessionLocal)
+
+
+async def _count(db_session, **filters) -> int:
+    stmt = select(func.count()).select_from(AuditLog).filter_by(**filters)
+    return (await db_session.execute(stmt)).scalar()
+
+
+async def _wait_for_rows(db_session, expected: int, timeout: float = 1.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while await _count(db_session) < expected:
+        assert asyncio.get_running_loop().time() < deadline
+        await asyncio.sleep(0.01)
+
+
+async def test_full_batch_is_written_immediately(db_session):
+    """Test that a full batch doesn't wait for the flush interval"""
+    service = AuditService(batch_size=3, flush_interval_seconds=60)
+    service.start()
+    for _ in range(3):
+        await service.log_event(AuditService.ACTION_LOGIN, app_id="test-app")
+
+    await _wait_for_rows(db_session, 3)
+    await service.stop()
+
+
+async def test_partial_batch_is_written_after_interval(db_session):
+    """Test that a partial batch is written once the interval has passed"""
+    service = AuditService(batch_size=100, flush_interval_seconds=0.05)
+    service.start()
+    await service.log_event(
+        AuditService.ACTION_LOGOUT, app_id="test-app", metadata={"a": 1}
+    )
+
+    await _wait_for_rows(db_session, 1)
+    (row,) = (await db_session.execute(select(AuditLog))).scalars().all()
+    assert row.action == AuditService.ACTION_LOGOUT
+    assert row.event_metadata == {"a": 1}
+    await service.stop()
+
+
+async def test_stop_flushes_queued_events(db_session):
+    """Test that stopping writes everything logged before it"""
+    service = AuditService(batch_size=100, flush_interval_seconds=60)
+    service.start()
+    for _ in range(4):
+        await service.log_event(AuditService.ACTION_SIGNUP)
+
+    await service.stop()
+    assert await _count(db_session) == 4
+    assert service.pending_count == 0
+
+
+async def test_drop_policy_bounds_the_queue(db_session):
+    """Test that events are dropped and counted while the queue is full"""
+    service = AuditService(max_queue_size=2)
+    for _ in range(3):
+        await service.log_event(AuditService.ACTION_LOGIN)
+
+    assert service.dropped_count == 1
+    assert await service.flush() == 2
+    assert await _count(db_session) == 2
+
+
+async def test_block_policy_waits_for_the_writer(db_session):
+    """Test that the block policy keeps every event"""
+    service = AuditService(
+        batch_size=1,
+        flush_interval_seconds=0.01,
+        max_queue_size=1,
+        overflow_policy=AUDIT_OVERFLOW_BLOCK,
+    )
+    service.start()
+    for _ in range(5):
+        await service.log_event(AuditService.ACTION_LOGIN)
+
+    await service.stop()
+    assert service.dropped_count == 0
+    assert await _count(db_session) == 5
+
+
+async def test_block_policy_gives_up_after_timeout(db_session):
+    """Test that a blocked caller drops its event instead of waiting forever"""
+    service = AuditService(
+        max_queue_size=1,
+        overflow_policy=AUDIT_OVERFLOW_BLOCK,
+        block_timeout_seconds=0.05,
+    )
+    # No writer is running, so the queue never drains
+    await service.log_event(AuditService.ACTION_LOGIN)
+    await asyncio.wait_for(service.log_event(AuditService.ACTION_LOGOUT), timeout=1)
+
+    assert service.dropped_count == 1
+    assert service.pending_count == 1
+
+
+async def test_auth_flows_are_audited(db_session, redis_client, monkeypatch):
+    """Test that signup, login and failed logins emit audit events"""
+    monkeypatch.setattr(settings, "PASSWORD_HASH_BCRYPT_ROUNDS", 4)
+    developer = Developer(email="dev@example.com", password_hash="x")
+    db_session.add(developer)
+    await db_session.flush()
+    db_session.add(
+        Application(
+            developer_id=developer.id,
+            name="Test App",
+            environment="dev",
+            app_id="test-app",
+            app_secret_encrypted="x",
+        )
+    )
+    await db_session.commit()
+
+    user = await auth_service.register_user(
+        db_session,
+        "test-app",
+        UserCreate(email="user@example.com", password="TestPassword123!"),
+        ip_address="127.0.0.1",
+    )
+    await auth_service.login(
+        db_session,
+        "test-app",
+        UserLogin(email="user@example.com", password="TestPassword123!"),
+        ip_address="127.0.0.1",
+    )
+    with pytest.raises(HTTPException):
+        await auth_service.login(
+            db_session,
+            "test-app",
+            UserLogin(email="user@example.com", password="WrongPassword123!"),
+            ip_address="127.0.0.1",
+        )
+
+    await audit_service.flush()
+    assert await _count(db_session, user_id=user.id, action="signup") == 1
+    assert await _count(db_session, user_id=user.id, action="login") == 1
+    assert await _count(db_session, user_id=user.id, action="login_failed") == 1
+
+    failed = (
+        await db_session.execute(
+            select(AuditLog).filter_by(user_id=user.id, action="login_failed")
+        )
+    ).scalar_one()
+    assert "user@example.com" not in str(failed.event_metadata)
+    assert failed.event_metadata["email_hash"] == hash_token("user@example.com")
@@ -0,0 +1,170 @@
+"""
+Bulk re-verification job tests
+"""
+
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import func, select
+
+from app.models import (
+    Application,
+    Developer,
+    EmailOutbox,
+    EmailVerificationToken,
+    User,
+)
+from app.services import bulk_email as bulk_email_module
+from app.services import email_outbox as email_outbox_module
+from app.services.bulk_email import BulkEmailService
+from app.services.email import email_service
+from app.services.email_outbox import EmailOutboxDispatcher
+from app.services.email_templates import TEMPLATE_VERIFICATION
+from tests.conftest import TestSessionLocal
+
+
+@pytest.fixture
+async def developer(db_session, monkeypatch):
+    """Create an application with 25 unverified and 5 verified users"""
+    monkeypatch.setattr(bulk_email_module, "AsyncSessionLocal", TestSessionLocal)
+    monkeypatch.setattr(email_outbox_module, "AsyncSessionLocal", TestSessionLocal)
+
+    developer = Developer(email="dev@example.com", password_hash="x")
+    db_session.add(developer)
+    await db_session.flush()
+    db_session.add(
+        Application(
+            developer_id=developer.id,
+            name="Test App",
+            environment="dev",
+            app_id="test-app",
+            app_secret_encrypted="x",
+        )
+    )
+    db_session.add_all(
+        User(
+            app_id="test-app",
+            email=f"user{i}@example.com",
+            password_hash="x",
+            email_verified=i >= 25,
+        )
+        for i in range(30)
+    )
+    await db_session.commit()
+    return developer
+
+
+async def _count(db_session, model) -> int:
+    return (await db_session.execute(select(func.count()).select_from(model))).scalar()
+
+
+async def test_reverification_queues_unverified_users(
+    db_session, redis_client, developer, monkeypatch
+):
+    """Test that a job queues one email per unverified user and reports progress"""
+    service = BulkEmailService(chunk_size=10)
+    job = await service.start_reverification(db_session, developer.id, "test-app")
+    assert job["total"] == 25
+    for task in list(service._tasks):
+        await task
+
+    assert await _count(db_session, EmailVerificationToken) == 25
+    assert await _count(db_session, EmailOutbox) == 25
+
+    progress = await service.get_job(
+        db_session, developer.id, "test-app", job["job_id"]
+    )
+    assert progress["status"] == "completed"
+    assert progress["queued"] == 25
+    assert progress["pending"] == 25
+    assert progress["delivered"] == 0
+
+    sent = []
+
+    async def deliver(to_email, rendered):
+        sent.append(to_email)
+
+    monkeypatch.setattr(email_service, "deliver", deliver)
+    assert await EmailOutboxDispatcher().dispatch() == 25
+
+    progress = await service.get_job(
+        db_session, developer.id, "test-app", job["job_id"]
+    )
+    assert progress["delivered"] == 25
+    assert len(set(sent)) == 25
+
+
+async def test_bulk_email_sent_after_transactional(
+    db_session, redis_client, developer, monkeypatch
+):
+    """Test that queued campaign emails don't delay transactional email"""
+    service = BulkEmailService(chunk_size=10)
+    await service.start_reverification(db_session, developer.id, "test-app")
+    for task in list(service._tasks):
+        await task
+
+    email_outbox_module.email_outbox.enqueue(
+        db_session,
+        to_email="new@example.com",
+        template=TEMPLATE_VERIFICATION,
+        context={"verification_url": "https://x"},
+        app_id="test-app",
+    )
+    await db_session.commit()
+
+    sent = []
+
+    async def deliver(to_email, rendered):
+        sent.append(to_email)
+
+    monkeypatch.setattr(email_service, "deliver", deliver)
+    await EmailOutboxDispatcher(batch_size=1).dispatch()
+
+    assert sent == ["new@example.com"]
+
+
+async def test_one_job_per_application(db_session, redis_client, developer):
+    """Test that a second job for the same application is rejected"""
+    service = BulkEmailService()
+    await service.start_reverification(db_session, developer.id, "test-app")
+
+    with pytest.raises(HTTPException) as exc_info:
+        await service.start_reverification(db_session, developer.id, "test-app")
+    assert exc_info.value.status_code == 409
+
+    for task in list(service._tasks):
+        await task
+
+
+async def test_lock_of_lost_job_expires(db_session, redis_client, developer):
+    """Test that a job that died with its process doesn't block new jobs"""
+    service = BulkEmailService(lock_lease_seconds=0.1)
+
+    async def lost(job_id, app_id):
+        """Never renews or releases the lock, like a crashed worker"""
+
+    service._run = lost
+    await service.start_reverification(db_session, developer.id, "test-app")
+    await asyncio.sleep(0.15)
+
+    await service.start_reverification(db_session, developer.id, "test-app")
+
+
+async def test_running_job_renews_its_lock(db_session, redis_client, developer):
+    """Test that a job outliving the lease keeps the lock until it finishes"""
+    service = BulkEmailService(chunk_size=10, lock_lease_seconds=0.1)
+    queue_chunk = service._queue_chunk
+
+    async def slow_queue_chunk(*args):
+        await asyncio.sleep(0.1)
+        await queue_chunk(*args)
+
+    service._queue_chunk = slow_queue_chunk
+    await service.start_reverification(db_session, developer.id, "test-app")
+    await asyncio.sleep(0.2)
+
+    assert await redis_client.exists("bulk_email_lock:test-app")
+    for task in list(service._tasks):
+        await task
+    assert not await redis_client.exists("bulk_email_lock:test-app")
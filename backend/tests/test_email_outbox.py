@@ -0,0 +1,141 @@
+"""
+Email outbox and dispatcher tests
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select, update
+
+from app.core.config import settings
+from app.models import Application, Developer, EmailOutbox
+from app.schemas import UserCreate
+from app.services import email_outbox as email_outbox_module
+from app.services.auth import auth_service
+from app.services.email import TEMPLATE_VERIFICATION, email_service
+from app.services.email_outbox import EmailOutboxDispatcher, decrypt_context
+from tests.conftest import TestSessionLocal
+
+
+class FakeSMTP:
+    """Records deliveries instead of talking to an SMTP server"""
+
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.sent = []
+
+    async def deliver(self, to_email, rendered):
+        if self.fail:
+            raise ConnectionError("SMTP unavailable")
+        self.sent.append((to_email, rendered))
+
+
+@pytest.fixture
+async def application(db_session, monkeypatch):
+    """Create an application and route the dispatcher to the test database"""
+    monkeypatch.setattr(email_outbox_module, "AsyncSessionLocal", TestSessionLocal)
+    monkeypatch.setattr(settings, "PASSWORD_HASH_BCRYPT_ROUNDS", 4)
+
+    developer = Developer(email="dev@example.com", password_hash="x")
+    db_session.add(developer)
+    await db_session.flush()
+    application = Application(
+        developer_id=developer.id,
+        name="Test App",
+        environment="dev",
+        app_id="test-app",
+        app_secret_encrypted="x",
+    )
+    db_session.add(application)
+    await db_session.commit()
+    return application
+
+
+@pytest.fixture
+def smtp(monkeypatch):
+    fake = FakeSMTP()
+    monkeypatch.setattr(email_service, "deliver", fake.deliver)
+    return fake
+
+
+async def _outbox(db_session):
+    result = await db_session.execute(
+        select(EmailOutbox).execution_options(populate_existing=True)
+    )
+    return list(result.scalars().all())
+
+
+async def test_signup_queues_email_without_sending(db_session, application, smtp):
+    """Test that signup writes an outbox row and leaves sending to the dispatcher"""
+    await auth_service.register_user(
+        db_session,
+        "test-app",
+        UserCreate(email="user@example.com", password="TestPassword123!"),
+    )
+
+    queued = await _outbox(db_session)
+    assert smtp.sent == []
+    assert len(queued) == 1
+    assert queued[0].template == TEMPLATE_VERIFICATION
+
+    assert await EmailOutboxDispatcher().dispatch() == 1
+    to_email, rendered = smtp.sent[0]
+    assert to_email == "user@example.com"
+    assert rendered.subject == "Verify your email for Test App"
+    assert await _outbox(db_session) == []
+
+
+async def test_links_are_stored_encrypted(db_session, application, smtp):
+    """Test that the outbox never holds a token link in the clear"""
+    EmailOutboxDispatcher().enqueue(
+        db_session,
+        to_email="user@example.com",
+        template=TEMPLATE_VERIFICATION,
+        context={"verification_url": "https://x/verify?token=secret-token"},
+    )
+    await db_session.commit()
+
+    (message,) = await _outbox(db_session)
+    assert "secret-token" not in message.context
+    assert decrypt_context(message.context) == {
+        "verification_url": "https://x/verify?token=secret-token"
+    }
+
+    assert await EmailOutboxDispatcher().dispatch() == 1
+    assert "secret-token" in smtp.sent[0][1].text_body
+
+
+async def test_failed_email_is_retried_then_dead_lettered(
+    db_session, application, smtp
+):
+    """Test that failures back off and end up dead-lettered"""
+    dispatcher = EmailOutboxDispatcher(max_attempts=2, retry_base_seconds=60)
+    dispatcher.enqueue(
+        db_session,
+        to_email="user@example.com",
+        template=TEMPLATE_VERIFICATION,
+        context={"verification_url": "https://x"},
+    )
+    await db_session.commit()
+    smtp.fail = True
+
+    assert await dispatcher.dispatch() == 1
+    (message,) = await _outbox(db_session)
+    assert message.status == "pending"
+    assert message.attempts == 1
+    assert message.last_error == "SMTP unavailable"
+
+    # Not due again until the backoff has passed
+    assert await dispatcher.dispatch() == 0
+    await db_session.execute(
+        update(EmailOutbox).values(
+            next_attempt_at=datetime.utcnow() - timedelta(seconds=1)
+        )
+    )
+    await db_session.commit()
+
+    assert await dispatcher.dispatch() == 1
+    (message,) = await _outbox(db_session)
+    assert message.status == "dead"
+    assert message.attempts == 2
+    assert message.context is None
@@ -0,0 +1,73 @@
+"""
+Email template rendering and cache tests
+"""
+
+from sqlalchemy import event
+
+from app.models import Application, Developer
+from app.services.email_templates import (
+    TEMPLATE_PASSWORD_RESET,
+    TEMPLATE_VERIFICATION,
+    EmailTemplateCache,
+    get_template,
+)
+from tests.conftest import test_engine
+
+
+def test_render_escapes_html_and_keeps_text_plain():
+    """Test that app names and links are escaped in HTML only"""
+    rendered = (
+        get_template(TEMPLATE_VERIFICATION)
+        .brand("Tom & Jerry's $app")
+        .render({"verification_url": "https://x/verify?token=a&b"})
+    )
+
+    assert rendered.subject == "Verify your email for Tom & Jerry's $app"
+    assert "Tom &amp; Jerry&#x27;s $app" in rendered.html_body
+    assert "https://x/verify?token=a&amp;b" in rendered.html_body
+    assert "<" not in rendered.text_body
+    assert "Tom & Jerry's $app" in rendered.text_body
+    assert "https://x/verify?token=a&b" in rendered.text_body
+
+
+async def test_cache_loads_app_names_once(db_session):
+    """Test that a batch resolves all app names in one query, then hits cache"""
+    developer = Developer(email="dev@example.com", password_hash="x")
+    db_session.add(developer)
+    await db_session.flush()
+    for app_id in ("app-1", "app-2"):
+        db_session.add(
+            Application(
+                developer_id=developer.id,
+                name=f"Name {app_id}",
+                environment="dev",
+                app_id=app_id,
+                app_secret_encrypted="x",
+            )
+        )
+    await db_session.commit()
+
+    statements = []
+    listener = lambda *args: statements.append(args[2])  # noqa: E731
+    event.listen(test_engine.sync_engine, "before_cursor_execute", listener)
+    try:
+        cache = EmailTemplateCache()
+        keys = [
+            ("app-1", TEMPLATE_VERIFICATION),
+            ("app-2", TEMPLATE_VERIFICATION),
+            ("app-1", TEMPLATE_PASSWORD_RESET),
+            (None, TEMPLATE_VERIFICATION),
+        ]
+        first = await cache.resolve(db_session, keys)
+        second = await cache.resolve(db_session, keys)
+        assert len(statements) == 1
+
+        cache.invalidate("app-1")
+        await cache.resolve(db_session, keys)
+        assert len(statements) == 2
+    finally:
+        event.remove(test_engine.sync_engine, "before_cursor_execute", listener)
+
+    assert first == second
+    assert first[("app-2", TEMPLATE_VERIFICATION)].subject.endswith("Name app-2")
+    assert first[(None, TEMPLATE_VERIFICATION)].subject.endswith("DevAuth")
@@ -0,0 +1,86 @@
+"""
+Token introspection endpoint tests
+"""
+
+import uuid
+
+import httpx
+import pytest
+
+from app.core.database import get_db
+from app.core.middleware import get_api_key_context
+from app.models import Application, Developer, User
+from app.utils import create_access_token
+from main import app
+
+
+@pytest.fixture
+async def application(db_session):
+    """Create an application with one user"""
+    developer = Developer(email="dev@example.com", password_hash="x")
+    db_session.add(developer)
+    await db_session.flush()
+
+    application = Application(
+        developer_id=developer.id,
+        name="Test App",
+        environment="dev",
+        app_id="test-app",
+        app_secret_encrypted="x",
+    )
+    db_session.add(application)
+    db_session.add(User(app_id="test-app", email="user@example.com", password_hash="x"))
+    await db_session.commit()
+    return application
+
+
+@pytest.fixture
+async def api_client(db_session, application):
+    """Create an HTTP client authenticated as the test application"""
+
+    async def override_get_db():
+        yield db_session
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_api_key_context] = lambda: application
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
+
+    app.dependency_overrides.clear()
+
+
+async def test_batch_introspection_preserves_order(api_client, db_session):
+    """Test batch introspection returns one result per token in order"""
+    user = (await db_session.execute(User.__table__.select())).first()
+    valid = create_access_token(user_id=user.id, app_id="test-app", email=user.email)
+    other_app = create_access_token(user_id=user.id, app_id="other", email=user.email)
+    unknown_user = create_access_token(
+        user_id=uuid.uuid4(), app_id="test-app", email="ghost@example.com"
+    )
+
+    response = await api_client.post(
+        "/v1/auth/introspect/batch",
+        json={"tokens": [valid, "garbage", other_app, unknown_user, valid]},
+    )
+
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [result["active"] for result in results] == [
+        True,
+        False,
+        False,
+        False,
+        True,
+    ]
+    assert results[0]["user"]["email"] == "user@example.com"
+
+
+async def test_batch_introspection_rejects_oversized_batch(api_client):
+    """Test that batches above the configured limit are rejected"""
+    response = await api_client.post(
+        "/v1/auth/introspect/batch", json={"tokens": ["t"] * 101}
+    )
+
+    assert response.status_code == 400
@@ -0,0 +1,138 @@
+"""
+JWT utility tests
+"""
+
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+from jose import jwt
+
+from app.core.config import settings
+from app.utils.jwt import create_access_token, verify_token
+from app.utils.keys import key_store
+
+
+def _generate_private_key(algorithm: str = "RS256") -> str:
+    if algorithm == "ES256":
+        private_key = ec.generate_private_key(ec.SECP256R1())
+    elif algorithm == "EdDSA":
+        private_key = ed25519.Ed25519PrivateKey.generate()
+    else:
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    return private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    ).decode("utf-8")
+
+
+def _issue_token() -> str:
+    return create_access_token(user_id=uuid.uuid4(), app_id="app", email="a@b.com")
+
+
+def test_access_token_round_trip():
+    """Test that issued access tokens verify"""
+    user_id = uuid.uuid4()
+    token = create_access_token(user_id=user_id, app_id="app", email="a@b.com")
+
+    payload = verify_token(token)
+
+    assert payload["sub"] == str(user_id)
+    assert payload["type"] == "access"
+
+
+def test_tokens_carry_published_key_id():
+    """Test that the token kid matches a key in the JWKS"""
+    header = jwt.get_unverified_header(_issue_token())
+    published = {key["kid"] for key in key_store.jwks["keys"]}
+
+    assert header["kid"] in published
+
+
+def test_key_store_reuses_parsed_keys():
+    """Test that key objects are parsed once and reused"""
+    first = key_store.signing_key
+    assert key_store.signing_key is first
+
+
+def test_key_store_reloads_on_settings_change(monkeypatch):
+    """Test that changing key settings reloads the key store"""
+    token = _issue_token()
+    original = key_store.signing_key
+
+    monkeypatch.setattr(settings, "JWT_PUBLIC_KEY", settings.JWT_PUBLIC_KEY + "\n")
+
+    assert key_store.signing_key is not original
+    assert verify_token(token) is not None
+
+
+def test_next_key_published_before_activation(monkeypatch):
+    """Test that a scheduled key is published but not used for signing yet"""
+    monkeypatch.setattr(settings, "JWT_NEXT_PRIVATE_KEY", _generate_private_key())
+    monkeypatch.setattr(
+        settings,
+        "JWT_NEXT_KEY_ACTIVATES_AT",
+        datetime.utcnow() + timedelta(hours=1),
+    )
+    current_kid = key_store.signing_key.kid
+
+    assert len(key_store.jwks["keys"]) == 2
+    assert jwt.get_unverified_header(_issue_token())["kid"] == current_kid
+
+
+def test_rotation_keeps_old_tokens_valid(monkeypatch):
+    """Test that tokens signed before a rotation still verify after it"""
+    old_token = _issue_token()
+    old_kid = key_store.signing_key.kid
+
+    monkeypatch.setattr(settings, "JWT_NEXT_PRIVATE_KEY", _generate_private_key())
+    monkeypatch.setattr(
+        settings,
+        "JWT_NEXT_KEY_ACTIVATES_AT",
+        datetime.utcnow() - timedelta(seconds=1),
+    )
+
+    new_token = _issue_token()
+
+    assert jwt.get_unverified_header(new_token)["kid"] != old_kid
+    assert verify_token(new_token) is not None
+    assert verify_token(old_token) is not None
+
+
+@pytest.mark.parametrize("algorithm", ["ES256", "EdDSA"])
+def test_elliptic_curve_signing(monkeypatch, algorithm):
+    """Test that ES256 and EdDSA keys sign, verify and publish a JWK"""
+    monkeypatch.setattr(settings, "JWT_PRIVATE_KEY", _generate_private_key(algorithm))
+    monkeypatch.setattr(settings, "JWT_PUBLIC_KEY", "")
+    monkeypatch.setattr(settings, "JWT_ALGORITHM", algorithm)
+
+    token = _issue_token()
+
+    assert jwt.get_unverified_header(token)["alg"] == algorithm
+    assert verify_token(token) is not None
+    assert key_store.jwks["keys"][0]["alg"] == algorithm
+
+
+def test_rotation_to_another_algorithm(monkeypatch):
+    """Test that an RS256 to EdDSA rotation keeps RS256 tokens valid"""
+    old_token = _issue_token()
+
+    monkeypatch.setattr(
+        settings, "JWT_NEXT_PRIVATE_KEY", _generate_private_key("EdDSA")
+    )
+    monkeypatch.setattr(
+        settings,
+        "JWT_NEXT_KEY_ACTIVATES_AT",
+        datetime.utcnow() - timedelta(seconds=1),
+    )
+
+    new_token = _issue_token()
+
+    assert jwt.get_unverified_header(new_token)["alg"] == "EdDSA"
+    assert verify_token(new_token) is not None
+    assert verify_token(old_token) is not None
+    assert {key["alg"] for key in key_store.jwks["keys"]} == {"RS256", "EdDSA"}
@@ -0,0 +1,246 @@
+"""
+Password hashing tests
+"""
+
+import asyncio
+import os
+import signal
+import time
+
+import pytest
+
+from app.core.config import settings
+from app.core.exceptions import ServiceUnavailableError
+from app.utils import password as password_module
+from app.utils.password import (
+    PasswordHashExecutor,
+    _dummy_password_hash,
+    hash_password,
+    hash_password_async,
+    password_needs_rehash,
+    verify_and_rehash_password,
+    verify_password,
+    verify_password_async,
+)
+from app.utils.password_hashers import Argon2idHasher, ScryptHasher, get_hasher
+
+
+@pytest.fixture
+def cheap_hashing(monkeypatch):
+    """Use low-cost hashing parameters so tests stay fast"""
+    monkeypatch.setattr(settings, "PASSWORD_HASH_BCRYPT_ROUNDS", 4)
+    monkeypatch.setattr(settings, "PASSWORD_HASH_SCRYPT_LN", 10)
+    monkeypatch.setattr(settings, "PASSWORD_HASH_ARGON2_TIME_COST", 1)
+    monkeypatch.setattr(settings, "PASSWORD_HASH_ARGON2_MEMORY_KIB", 1024)
+
+
+@pytest.mark.asyncio
+async def test_hash_and_verify_async():
+    """Test hashing and verification on the executor"""
+    password_hash = await hash_password_async("TestPassword123!")
+
+    assert await verify_password_async("TestPassword123!", password_hash)
+    assert not await verify_password_async("WrongPassword123!", password_hash)
+
+
+@pytest.mark.asyncio
+async def test_executor_rejects_when_saturated():
+    """Test that a saturated executor fails fast"""
+    executor = PasswordHashExecutor(max_workers=1, max_queue=0)
+    release = asyncio.Event()
+    loop = asyncio.get_running_loop()
+
+    def blocking():
+        asyncio.run_coroutine_threadsafe(release.wait(), loop).result()
+        return True
+
+    running = asyncio.create_task(executor.run(blocking))
+    await asyncio.sleep(0)
+
+    with pytest.raises(ServiceUnavailableError):
+        await executor.run(blocking)
+
+    release.set()
+    assert await running
+    assert executor.pending == 0
+    executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_verify_without_hash_uses_dummy():
+    """Test that a missing hash is rejected after doing the same work"""
+    assert not await verify_password_async("TestPassword123!", None)
+    assert _dummy_password_hash().startswith("$2b$12$")
+
+
+def test_scrypt_round_trip():
+    """Test scrypt hashes carry their parameters and verify"""
+    hasher = ScryptHasher(ln=10)
+    encoded = hasher.hash("TestPassword123!")
+
+    assert encoded.startswith("$scrypt$ln=10,r=8,p=1$")
+    assert hasher.verify("TestPassword123!", encoded)
+    assert not hasher.verify("WrongPassword123!", encoded)
+    assert ScryptHasher(ln=11).needs_rehash(encoded)
+
+
+def test_argon2id_round_trip():
+    """Test argon2id hashing when argon2-cffi is installed"""
+    pytest.importorskip("argon2")
+    hasher = Argon2idHasher(time_cost=1, memory_cost=1024)
+    encoded = hasher.hash("TestPassword123!")
+
+    assert encoded.startswith("$argon2id$")
+    assert hasher.verify("TestPassword123!", encoded)
+    assert not hasher.verify("WrongPassword123!", encoded)
+    assert Argon2idHasher(time_cost=2, memory_cost=1024).needs_rehash(encoded)
+
+
+@pytest.mark.parametrize(
+    "encoded",
+    [
+        "$2b$12$truncated",
+        "$2b$12$" + "a" * 52 + "!",
+        "$2b$99$" + "a" * 53,
+        "$argon2id$v=19$m=1024,t=1,p=1$bm90LWEtaGFzaA",
+        "$argon2id$v=19$m=1024,t=1,p=1$c2FsdHNhbHRzYWx0$aGFzaA",
+        "$scrypt$ln=10,r=8$c2FsdA$aGFzaA",
+    ],
+)
+def test_malformed_hash_does_not_verify(encoded):
+    """Test that a corrupted stored hash fails verification instead of raising"""
+    if encoded.startswith("$argon2id$"):
+        pytest.importorskip("argon2")
+    assert not verify_password("TestPassword123!", encoded)
+
+
+@pytest.mark.asyncio
+async def test_start_fails_when_algorithm_is_unavailable(monkeypatch):
+    """Test that a missing hashing library is reported at startup"""
+    monkeypatch.setattr(settings, "PASSWORD_HASH_ALGORITHM", "argon2id")
+    monkeypatch.setattr("app.utils.password_hashers.argon2", None)
+    monkeypatch.setattr("app.utils.password_hashers._hashers", {})
+
+    with pytest.raises(RuntimeError, match="argon2-cffi"):
+        await PasswordHashExecutor(max_workers=1, max_queue=0).start()
+
+
+def test_rehash_on_policy_change(cheap_hashing, monkeypatch):
+    """Test that outdated hashes still verify and are upgraded"""
+    bcrypt_hash = hash_password("TestPassword123!")
+    monkeypatch.setattr(settings, "PASSWORD_HASH_ALGORITHM", "scrypt")
+
+    assert verify_password("TestPassword123!", bcrypt_hash)
+    assert password_needs_rehash(bcrypt_hash)
+
+    valid, upgraded = verify_and_rehash_password("TestPassword123!", bcrypt_hash)
+    assert valid
+    assert upgraded.startswith("$scrypt$")
+    assert not password_needs_rehash(upgraded)
+    assert verify_and_rehash_password("TestPassword123!", upgraded) == (True, None)
+    assert verify_and_rehash_password("WrongPassword123!", bcrypt_hash) == (
+        False,
+        None,
+    )
+
+
+def test_rehash_on_cost_change(cheap_hashing, monkeypatch):
+    """Test that a changed cost factor marks existing hashes as outdated"""
+    encoded = hash_password("TestPassword123!")
+    monkeypatch.setattr(settings, "PASSWORD_HASH_BCRYPT_ROUNDS", 5)
+
+    assert password_needs_rehash(encoded)
+    assert hash_password("TestPassword123!").startswith("$2b$05$")
+
+
+@pytest.mark.asyncio
+async def test_executor_caps_each_partition():
+    """Test that one partition can't take the whole pool"""
+    executor = PasswordHashExecutor(
+        max_workers=2, max_queue=2, max_pending_per_partition=1
+    )
+    release = asyncio.Event()
+    loop = asyncio.get_running_loop()
+
+    def blocking():
+        asyncio.run_coroutine_threadsafe(release.wait(), loop).result()
+        return True
+
+    running = asyncio.create_task(executor.run(blocking, partition="app-a"))
+    await asyncio.sleep(0)
+
+    with pytest.raises(ServiceUnavailableError):
+        await executor.run(blocking, partition="app-a")
+    other = asyncio.create_task(executor.run(blocking, partition="app-b"))
+    await asyncio.sleep(0)
+    assert executor.pending_for("app-b") == 1
+
+    release.set()
+    assert await running and await other
+    assert executor.pending == 0
+    assert executor.pending_for("app-a") == 0
+    executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_run_batch_preserves_order():
+    """Test that batches are split across workers and keep their order"""
+    executor = PasswordHashExecutor(max_workers=3, max_queue=10)
+
+    results = await executor.run_batch(pow, [(i, 2) for i in range(10)])
+
+    assert results == [i**2 for i in range(10)]
+    assert executor.pending == 0
+    with pytest.raises(ServiceUnavailableError):
+        await executor.run_batch(pow, [(i, 2) for i in range(14)])
+    executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_start_precomputes_dummy_hash(monkeypatch):
+    """Test that workers get the dummy hash computed at startup"""
+    # No cheap_hashing: spawned workers read the real settings
+    monkeypatch.setattr("app.utils.password._dummy_password_hashes", {})
+    executor = PasswordHashExecutor(max_workers=1, max_queue=1, backend="process")
+    await executor.start()
+
+    assert get_hasher().policy in password_module._dummy_password_hashes
+    assert await executor.run(_dummy_password_hash) == _dummy_password_hash()
+    executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_process_pool_recovers_from_dead_worker():
+    """Test that the process backend replaces a broken pool"""
+    executor = PasswordHashExecutor(max_workers=2, max_queue=4, backend="process")
+    await executor.start()
+
+    password_hash = await executor.run(hash_password, "TestPassword123!")
+    assert await executor.run(verify_password, "TestPassword123!", password_hash)
+
+    worker_pid = await executor.run(os.getpid)
+    os.kill(worker_pid, signal.SIGKILL)
+    await asyncio.sleep(0.5)
+
+    assert not await executor.health_check()
+    assert await executor.health_check()
+    assert await executor.run(verify_password, "TestPassword123!", password_hash)
+    executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_dead_worker_restarts_the_pool_once(caplog):
+    """Test that waiters on a broken pool don't shut down its replacement"""
+    executor = PasswordHashExecutor(max_workers=2, max_queue=10, backend="process")
+    await executor.start()
+
+    calls = [asyncio.create_task(executor.run(time.sleep, 0.2)) for _ in range(10)]
+    await asyncio.sleep(0.1)
+    os.kill(next(iter(executor._executor._processes)), signal.SIGKILL)
+
+    with caplog.at_level("WARNING", logger="app.utils.password"):
+        await asyncio.gather(*calls)
+
+    assert caplog.text.count("restarting") == 1
+    assert executor.pending == 0
+    executor.shutdown()
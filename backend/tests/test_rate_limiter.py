@@ -0,0 +1,332 @@
+"""
+Rate limiter tests
+"""
+
+import asyncio
+from uuid import uuid4
+
+import fakeredis
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.core.config import settings
+from app.core.middleware import RateLimitMiddleware, get_client_ip, get_rate_limit
+from app.core import middleware as middleware_module
+from app.core.redis import RedisClient
+from app.models import Application
+from app.services.api_key_cache import APIKeyCache
+from app.utils import hash_api_key
+from app.services.rate_limiter import (
+    ALGORITHM_GCRA,
+    ALGORITHM_SLIDING_WINDOW_COUNTER,
+    ALGORITHM_SLIDING_WINDOW_LOG,
+    BruteForceProtection,
+    RateLimiter,
+)
+
+ALGORITHMS = [
+    ALGORITHM_SLIDING_WINDOW_LOG,
+    ALGORITHM_SLIDING_WINDOW_COUNTER,
+    ALGORITHM_GCRA,
+]
+
+
+@pytest.mark.parametrize("algorithm", ALGORITHMS)
+async def test_rate_limit_enforced(redis_client, algorithm):
+    """Test that requests beyond the limit are rejected"""
+    limiter = RateLimiter(requests_per_minute=3, algorithm=algorithm)
+
+    results = [await limiter.check("client") for _ in range(4)]
+
+    assert [result.allowed for result in results] == [True, True, True, False]
+    assert [result.remaining for result in results] == [2, 1, 0, 0]
+    assert results[-1].retry_after > 0
+    assert await limiter.get_remaining_requests("client") == 0
+
+
+@pytest.mark.parametrize("algorithm", ALGORITHMS)
+async def test_concurrent_requests_counted_once_each(redis_client, algorithm):
+    """Test that concurrent requests in the same millisecond are all counted"""
+    limiter = RateLimiter(requests_per_minute=10, algorithm=algorithm)
+
+    results = await asyncio.gather(*[limiter.check("client") for _ in range(25)])
+
+    assert sum(result.allowed for result in results) == 10
+
+
+async def test_rejected_requests_not_recorded(redis_client):
+    """Test that the sliding log only stores accepted requests"""
+    limiter = RateLimiter(requests_per_minute=2)
+
+    for _ in range(5):
+        await limiter.check("client")
+
+    assert await redis_client.zcard("rate_limit:client") == 2
+
+
+async def test_counter_uses_constant_memory(redis_client):
+    """Test that the sliding window counter keeps a fixed-size state"""
+    limiter = RateLimiter(
+        requests_per_minute=1000, algorithm=ALGORITHM_SLIDING_WINDOW_COUNTER
+    )
+
+    for _ in range(50):
+        await limiter.check("client")
+
+    state = await redis_client.hgetall("rate_limit_swc:client")
+    assert set(state) == {"w", "c", "p"}
+    assert int(state["c"]) == 50
+
+
+async def test_gcra_stores_single_value(redis_client):
+    """Test that GCRA keeps one number per identifier"""
+    limiter = RateLimiter(requests_per_minute=1000, algorithm=ALGORITHM_GCRA)
+
+    for _ in range(50):
+        await limiter.check("client")
+
+    assert await redis_client.type("rate_limit_gcra:client") == "string"
+    assert await limiter.get_remaining_requests("client") == 950
+
+
+async def test_leased_tokens_answered_locally(redis_client):
+    """Test that hybrid mode leases tokens in chunks and enforces the limit"""
+    limiter = RateLimiter(
+        requests_per_minute=10, algorithm=ALGORITHM_GCRA, lease_size=4
+    )
+
+    results = await asyncio.gather(*[limiter.check("client") for _ in range(12)])
+
+    assert sum(result.allowed for result in results) == 10
+    assert await limiter.get_remaining_requests("client") == 0
+
+    # Rejection is remembered locally until the retry time
+    RedisClient._instance = None
+    assert not (await limiter.check("client")).allowed
+
+
+async def test_lease_charges_redis_per_chunk(redis_client):
+    """Test that a lease takes lease_size tokens from the shared bucket"""
+    limiter = RateLimiter(
+        requests_per_minute=100, algorithm=ALGORITHM_GCRA, lease_size=10
+    )
+
+    for _ in range(3):
+        assert (await limiter.check("client")).allowed
+
+    assert await limiter.get_remaining_requests("client") == 90
+
+
+def test_leasing_requires_gcra():
+    """Test that leasing is rejected for algorithms without token grants"""
+    with pytest.raises(ValueError):
+        RateLimiter(algorithm=ALGORITHM_SLIDING_WINDOW_LOG, lease_size=10)
+
+
+def _limited_app() -> tuple[FastAPI, list]:
+    calls = []
+    app = FastAPI()
+    app.add_middleware(RateLimitMiddleware, limiter=RateLimiter())
+
+    @app.post("/v1/auth/login")
+    async def login():
+        calls.append("login")
+        return {}
+
+    @app.get("/v1/portal/applications")
+    async def applications():
+        calls.append("applications")
+        return {}
+
+    return app, calls
+
+
+async def test_middleware_rejects_before_handler(redis_client, monkeypatch):
+    """Test that requests over the quota never reach the route handler"""
+    monkeypatch.setattr(settings, "RATE_LIMIT_LOGIN_PER_IP_PER_MINUTE", 2)
+    app, calls = _limited_app()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        responses = [await client.post("/v1/auth/login") for _ in range(3)]
+        other = await client.get("/v1/portal/applications")
+
+    assert [response.status_code for response in responses] == [200, 200, 429]
+    assert responses[0].headers["X-RateLimit-Limit"] == "2"
+    assert responses[0].headers["X-RateLimit-Remaining"] == "1"
+    assert int(responses[2].headers["Retry-After"]) > 0
+    assert responses[2].json()["error"]["code"] == "RATE_LIMIT_EXCEEDED"
+    assert calls == ["login", "login", "applications"]
+    assert other.headers["X-RateLimit-Limit"] == str(settings.RATE_LIMIT_PER_MINUTE)
+
+
+async def test_middleware_fails_open():
+    """Test that requests are allowed when Redis is unavailable"""
+    server = fakeredis.FakeServer()
+    server.connected = False
+    RedisClient._instance = fakeredis.FakeAsyncRedis(server=server)
+    app, calls = _limited_app()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.post("/v1/auth/login")
+    RedisClient._instance = None
+
+    assert response.status_code == 200
+    assert calls == ["login"]
+
+
+async def test_unvalidated_api_keys_share_the_ip_quota(redis_client, monkeypatch):
+    """Test that sending a fresh made-up API key doesn't reset the quota"""
+    monkeypatch.setattr(settings, "RATE_LIMIT_LOGIN_PER_IP_PER_MINUTE", 2)
+    app, calls = _limited_app()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        responses = [
+            await client.post(
+                "/v1/auth/login",
+                headers={"x-app-id": "test-app", "x-api-key": f"fake-{i}"},
+            )
+            for i in range(3)
+        ]
+
+    assert [response.status_code for response in responses] == [200, 200, 429]
+
+
+async def test_rotating_app_ids_share_the_ip_quota(redis_client, monkeypatch):
+    """Test that a fresh x-app-id per request doesn't reset the IP quota"""
+    monkeypatch.setattr(settings, "RATE_LIMIT_LOGIN_PER_IP_PER_MINUTE", 2)
+    monkeypatch.setattr(settings, "RATE_LIMIT_PER_MINUTE", 2)
+    monkeypatch.setattr(
+        settings, "RATE_LIMIT_APP_OVERRIDES", {"app-2": {"default": 9000}}
+    )
+    app, calls = _limited_app()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        logins = [
+            await client.post("/v1/auth/login", headers={"x-app-id": f"app-{i}"})
+            for i in range(3)
+        ]
+        others = [
+            await client.get(
+                "/v1/portal/applications", headers={"x-app-id": f"app-{i}"}
+            )
+            for i in range(3)
+        ]
+
+    assert [response.status_code for response in logins] == [200, 200, 429]
+    # An unauthenticated x-app-id doesn't pick up that application's override
+    assert [response.status_code for response in others] == [200, 200, 429]
+
+
+async def test_validated_api_key_gets_tenant_quota(redis_client, monkeypatch):
+    """Test that a known API key is counted per tenant rather than per IP"""
+    monkeypatch.setattr(settings, "RATE_LIMIT_LOGIN_PER_IP_PER_MINUTE", 1)
+    monkeypatch.setattr(settings, "RATE_LIMIT_LOGIN_PER_MINUTE", 3)
+    application = Application(
+        id=uuid4(),
+        developer_id=uuid4(),
+        name="Test App",
+        environment="dev",
+        app_id="test-app",
+    )
+    cache = APIKeyCache()
+    await cache.set(hash_api_key("real-key"), uuid4(), application)
+    monkeypatch.setattr(middleware_module, "api_key_cache", cache)
+    app, calls = _limited_app()
+
+    headers = {"x-app-id": "test-app", "x-api-key": "real-key"}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        responses = [
+            await client.post("/v1/auth/login", headers=headers) for _ in range(4)
+        ]
+
+    assert [response.status_code for response in responses] == [200, 200, 200, 429]
+    assert responses[0].headers["X-RateLimit-Limit"] == "3"
+
+
+def test_client_ip_behind_trusted_proxies(monkeypatch):
+    """Test that X-Forwarded-For is only trusted as far as the proxies go"""
+    scope = {
+        "type": "http",
+        "client": ("10.0.0.1", 1234),
+        "headers": [(b"x-forwarded-for", b"6.6.6.6, 203.0.113.7, 10.0.0.2")],
+    }
+
+    assert get_client_ip(scope) == "10.0.0.1"
+    monkeypatch.setattr(settings, "TRUSTED_PROXY_COUNT", 2)
+    assert get_client_ip(scope) == "203.0.113.7"
+
+
+def test_per_application_override(monkeypatch):
+    """Test that application overrides take precedence for their route class"""
+    monkeypatch.setattr(
+        settings, "RATE_LIMIT_APP_OVERRIDES", {"big-app": {"introspect": 9000}}
+    )
+
+    assert get_rate_limit("introspect", "big-app") == 9000
+    assert get_rate_limit("login", "big-app") == settings.RATE_LIMIT_LOGIN_PER_MINUTE
+    assert (
+        get_rate_limit("introspect", "other-app")
+        == settings.RATE_LIMIT_INTROSPECT_PER_MINUTE
+    )
+
+
+async def test_lockout_per_email_across_ips(redis_client):
+    """Test that rotating IP addresses doesn't reset an account's lockout"""
+    protection = BruteForceProtection(max_attempts=3, max_ip_attempts=100)
+
+    for i in range(3):
+        is_locked, _ = await protection.record_failed_attempt(
+            "app-a", "user@example.com", f"10.0.0.{i}"
+        )
+
+    assert is_locked
+    assert await protection.check_lockout("app-a", "user@example.com", "10.0.0.99")
+    assert not await protection.check_lockout("app-a", "other@example.com", "10.0.0.99")
+
+
+async def test_lockout_per_ip_across_emails(redis_client):
+    """Test that one IP address can't spray many accounts"""
+    protection = BruteForceProtection(max_attempts=100, max_ip_attempts=3)
+
+    for i in range(3):
+        await protection.record_failed_attempt(
+            "app-a", f"user{i}@example.com", "10.0.0.1"
+        )
+
+    assert await protection.check_lockout("app-a", "new@example.com", "10.0.0.1")
+    assert not await protection.check_lockout("app-a", "new@example.com", "10.0.0.2")
+
+
+async def test_lockout_scoped_to_application(redis_client):
+    """Test that failures against one application don't lock out another"""
+    protection = BruteForceProtection(max_attempts=3, max_ip_attempts=3)
+
+    for _ in range(3):
+        await protection.record_failed_attempt("app-a", "user@example.com", "10.0.0.1")
+
+    assert await protection.check_lockout("app-a", "user@example.com", "10.0.0.1")
+    assert not await protection.check_lockout("app-b", "user@example.com", "10.0.0.1")
+
+
+async def test_clear_attempts_keeps_ip_count(redis_client):
+    """Test that a successful login clears only the account's counter"""
+    protection = BruteForceProtection(max_attempts=3, max_ip_attempts=5)
+    await protection.record_failed_attempt("app-a", "user@example.com", "10.0.0.1")
+    await protection.record_failed_attempt("app-a", "user@example.com", "10.0.0.1")
+
+    await protection.clear_attempts("app-a", "user@example.com", "10.0.0.1")
+
+    assert (
+        await protection.get_remaining_attempts("app-a", "user@example.com", "10.0.0.2")
+        == 3
+    )
+    assert (
+        await protection.get_remaining_attempts("app-a", "new@example.com", "10.0.0.1")
+        == 3
+    )
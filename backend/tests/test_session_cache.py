@@ -0,0 +1,341 @@
+"""
+Session cache, refresh fast path, refresh token rotation and format tests
+"""
+
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.config import settings
+from app.models import Application, Developer, Session, User
+from app.schemas import UserLogin
+from app.services.auth import auth_service
+from app.services.session_cache import session_cache
+from app.utils import hash_password
+from tests.conftest import TestSessionLocal
+
+
+@pytest.fixture
+async def user(db_session, monkeypatch):
+    """Create an application with one user who can log in"""
+    monkeypatch.setattr(settings, "PASSWORD_HASH_BCRYPT_ROUNDS", 4)
+    developer = Developer(email="dev@example.com", password_hash="x")
+    db_session.add(developer)
+    await db_session.flush()
+
+    db_session.add(
+        Application(
+            developer_id=developer.id,
+            name="Test App",
+            environment="dev",
+            app_id="test-app",
+            app_secret_encrypted="x",
+        )
+    )
+    user = User(
+        app_id="test-app",
+        email="user@example.com",
+        password_hash=hash_password("TestPassword123!"),
+    )
+    db_session.add(user)
+    await db_session.commit()
+    return user
+
+
+async def _login(db_session) -> tuple:
+    return await auth_service.login(
+        db=db_session,
+        app_id="test-app",
+        credentials=UserLogin(email="user@example.com", password="TestPassword123!"),
+    )
+
+
+@pytest.fixture
+def without_rotation(monkeypatch):
+    monkeypatch.setattr(settings, "REFRESH_TOKEN_ROTATION", False)
+
+
+async def test_refresh_served_from_cache(
+    db_session, redis_client, user, without_rotation
+):
+    """Test that refresh after login doesn't touch the database"""
+    _, _, refresh_token = await _login(db_session)
+
+    access_token, _ = await auth_service.refresh_token(
+        db=None, app_id="test-app", refresh_token=refresh_token
+    )
+
+    assert access_token
+
+
+async def test_refresh_fills_cache_on_miss(
+    db_session, redis_client, user, without_rotation
+):
+    """Test that a cache miss is served from the database and cached"""
+    _, _, refresh_token = await _login(db_session)
+    await redis_client.flushdb()
+
+    await auth_service.refresh_token(
+        db=db_session, app_id="test-app", refresh_token=refresh_token
+    )
+    access_token, _ = await auth_service.refresh_token(
+        db=None, app_id="test-app", refresh_token=refresh_token
+    )
+
+    assert access_token
+
+
+async def test_logout_writes_through(db_session, redis_client, user):
+    """Test that a logged out session can't refresh from the cache"""
+    _, _, refresh_token = await _login(db_session)
+
+    await auth_service.logout(
+        db=db_session, app_id="test-app", refresh_token=refresh_token
+    )
+
+    with pytest.raises(HTTPException) as exc_info:
+        await auth_service.refresh_token(
+            db=None, app_id="test-app", refresh_token=refresh_token
+        )
+    assert exc_info.value.status_code == 401
+
+
+async def test_failed_revocation_write_drops_entry(
+    db_session, redis_client, user, without_rotation, monkeypatch
+):
+    """Test that a revocation the cache can't record removes the entry"""
+    _, _, refresh_token = await _login(db_session)
+
+    def broken_pipeline(*args, **kwargs):
+        raise ConnectionError("Redis write failed")
+
+    monkeypatch.setattr(redis_client, "pipeline", broken_pipeline)
+    await auth_service.logout(
+        db=db_session, app_id="test-app", refresh_token=refresh_token
+    )
+
+    assert await redis_client.keys("session:*") == []
+    with pytest.raises(HTTPException):
+        await auth_service.refresh_token(
+            db=db_session, app_id="test-app", refresh_token=refresh_token
+        )
+
+
+async def test_revocation_fails_when_cache_unwritable(
+    db_session, redis_client, user, without_rotation, monkeypatch
+):
+    """Test that logout fails, and can be retried, if the cache is stuck"""
+    _, _, refresh_token = await _login(db_session)
+
+    def broken_pipeline(*args, **kwargs):
+        raise ConnectionError("Redis write failed")
+
+    async def broken_delete(*args, **kwargs):
+        raise ConnectionError("Redis write failed")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(redis_client, "pipeline", broken_pipeline)
+        patch.setattr(redis_client, "delete", broken_delete)
+        with pytest.raises(HTTPException) as exc_info:
+            await auth_service.logout(
+                db=db_session, app_id="test-app", refresh_token=refresh_token
+            )
+    assert exc_info.value.status_code == 503
+
+    # The retry writes the revocation through
+    await auth_service.logout(
+        db=db_session, app_id="test-app", refresh_token=refresh_token
+    )
+    with pytest.raises(HTTPException):
+        await auth_service.refresh_token(
+            db=None, app_id="test-app", refresh_token=refresh_token
+        )
+
+
+async def test_cache_fill_does_not_undo_revocation(db_session, redis_client, user):
+    """Test that a fill from a stale read can't overwrite a revocation"""
+    await _login(db_session)
+    key = (await redis_client.keys("session:*"))[0]
+    cached = await session_cache.get(key.split(":", 1)[1])
+
+    await session_cache.revoke([cached])
+    cached.revoked = False
+    await session_cache.set(cached, overwrite=False)
+
+    assert (await session_cache.get(cached.id)).revoked
+
+
+async def test_refresh_rotates_token(db_session, redis_client, user):
+    """Test that each refresh issues a new refresh token that works"""
+    _, _, refresh_token = await _login(db_session)
+
+    _, rotated = await auth_service.refresh_token(
+        db=db_session, app_id="test-app", refresh_token=refresh_token
+    )
+    access_token, rotated_again = await auth_service.refresh_token(
+        db=db_session, app_id="test-app", refresh_token=rotated
+    )
+
+    assert rotated != refresh_token
+    assert rotated_again != rotated
+    assert access_token
+
+
+async def test_refresh_token_reuse_revokes_session(
+    db_session, redis_client, user, monkeypatch
+):
+    """Test that replaying a rotated-out token revokes the whole session"""
+    monkeypatch.setattr(settings, "REFRESH_TOKEN_REUSE_GRACE_SECONDS", 0)
+    _, _, refresh_token = await _login(db_session)
+    _, rotated = await auth_service.refresh_token(
+        db=db_session, app_id="test-app", refresh_token=refresh_token
+    )
+
+    with pytest.raises(HTTPException):
+        await auth_service.refresh_token(
+            db=db_session, app_id="test-app", refresh_token=refresh_token
+        )
+    with pytest.raises(HTTPException):
+        await auth_service.refresh_token(
+            db=db_session, app_id="test-app", refresh_token=rotated
+        )
+
+    session = (await db_session.execute(Session.__table__.select())).first()
+    assert session.revoked
+
+
+async def test_concurrent_refreshes_keep_session(db_session, redis_client, user):
+    """Test that losing a refresh race doesn't revoke the winner's session"""
+    _, _, refresh_token = await _login(db_session)
+
+    async def refresh():
+        async with TestSessionLocal() as db:
+            return await auth_service.refresh_token(
+                db=db, app_id="test-app", refresh_token=refresh_token
+            )
+
+    results = await asyncio.gather(refresh(), refresh(), return_exceptions=True)
+
+    winners = [result for result in results if isinstance(result, tuple)]
+    losers = [result for result in results if isinstance(result, HTTPException)]
+    assert len(winners) == 1 and len(losers) == 1
+    assert losers[0].status_code == 409
+    assert losers[0].detail["code"] == "REFRESH_TOKEN_ROTATED"
+
+    # The winner's token still works
+    _, winner_token = winners[0]
+    access_token, _ = await auth_service.refresh_token(
+        db=db_session, app_id="test-app", refresh_token=winner_token
+    )
+    assert access_token
+
+
+@pytest.fixture
+def opaque_tokens(monkeypatch):
+    monkeypatch.setattr(settings, "REFRESH_TOKEN_FORMAT", "opaque")
+
+
+async def test_opaque_refresh_token_rotates(
+    db_session, redis_client, user, opaque_tokens
+):
+    """Test that opaque refresh tokens refresh, rotate and log out"""
+    _, _, refresh_token = await _login(db_session)
+    assert refresh_token.startswith("rt_")
+
+    access_token, rotated = await auth_service.refresh_token(
+        db=db_session, app_id="test-app", refresh_token=refresh_token
+    )
+    assert access_token
+    assert rotated.startswith("rt_") and rotated != refresh_token
+
+    # Rotation still works on a cache miss, where only the session ID is known
+    await redis_client.flushall()
+    _, rotated_again = await auth_service.refresh_token(
+        db=db_session, app_id="test-app", refresh_token=rotated
+    )
+
+    await auth_service.logout(
+        db=db_session, app_id="test-app", refresh_token=rotated_again
+    )
+    session = (await db_session.execute(Session.__table__.select())).first()
+    assert session.revoked
+
+
+async def test_opaque_refresh_token_rejected_for_other_app(
+    db_session, redis_client, user, opaque_tokens
+):
+    """Test that an opaque token only refreshes in its own application"""
+    _, _, refresh_token = await _login(db_session)
+
+    with pytest.raises(HTTPException):
+        await auth_service.refresh_token(
+            db=db_session, app_id="other-app", refresh_token=refresh_token
+        )
+
+
+async def test_jwt_refresh_token_accepted_after_switch(
+    db_session, redis_client, user, monkeypatch
+):
+    """Test that JWT refresh tokens keep working after switching to opaque"""
+    _, _, refresh_token = await _login(db_session)
+    monkeypatch.setattr(settings, "REFRESH_TOKEN_FORMAT", "opaque")
+
+    _, rotated = await auth_service.refresh_token(
+        db=db_session, app_id="test-app", refresh_token=refresh_token
+    )
+    assert rotated.startswith("rt_")
+
+
+async def test_forged_opaque_token_does_not_revoke_session(
+    db_session, redis_client, user, opaque_tokens
+):
+    """Test that knowing a session ID isn't enough to log its user out"""
+    _, _, refresh_token = await _login(db_session)
+    forged = refresh_token.split(".")[0] + ".not-the-secret"
+
+    with pytest.raises(HTTPException) as exc_info:
+        await auth_service.refresh_token(
+            db=db_session, app_id="test-app", refresh_token=forged
+        )
+    assert exc_info.value.status_code == 401
+    await auth_service.logout(db=db_session, app_id="test-app", refresh_token=forged)
+
+    access_token, _ = await auth_service.refresh_token(
+        db=db_session, app_id="test-app", refresh_token=refresh_token
+    )
+    assert access_token
+
+
+async def test_replayed_opaque_token_revokes_session(
+    db_session, redis_client, user, opaque_tokens, monkeypatch
+):
+    """Test that reuse detection still applies to rotated-out opaque tokens"""
+    monkeypatch.setattr(settings, "REFRESH_TOKEN_REUSE_GRACE_SECONDS", 0)
+    _, _, refresh_token = await _login(db_session)
+    await auth_service.refresh_token(
+        db=db_session, app_id="test-app", refresh_token=refresh_token
+    )
+
+    with pytest.raises(HTTPException):
+        await auth_service.refresh_token(
+            db=db_session, app_id="test-app", refresh_token=refresh_token
+        )
+
+    session = (await db_session.execute(Session.__table__.select())).first()
+    assert session.revoked
+
+
+async def test_opaque_token_exchanged_for_configured_format(
+    db_session, redis_client, user, monkeypatch
+):
+    """Test that an opaque token is rotated to a JWT after switching back"""
+    monkeypatch.setattr(settings, "REFRESH_TOKEN_FORMAT", "opaque")
+    _, _, refresh_token = await _login(db_session)
+    monkeypatch.setattr(settings, "REFRESH_TOKEN_FORMAT", "jwt")
+    await redis_client.flushall()
+
+    _, rotated = await auth_service.refresh_token(
+        db=db_session, app_id="test-app", refresh_token=refresh_token
+    )
+    assert not rotated.startswith("rt_")
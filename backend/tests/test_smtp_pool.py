@@ -0,0 +1,110 @@
+"""
+SMTP connection pool tests against a local aiosmtpd server
+"""
+
+import asyncio
+import socket
+from email.message import EmailMessage
+
+import pytest
+from aiosmtpd.controller import Controller
+
+from app.services.smtp_pool import SMTPConnectionPool
+
+
+class CollectingHandler:
+    """Stores received messages"""
+
+    def __init__(self):
+        self.messages = []
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append(envelope)
+        return "250 OK"
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def smtp_server():
+    handler = CollectingHandler()
+    controller = Controller(handler, hostname="127.0.0.1", port=_free_port())
+    controller.start()
+    yield controller
+    controller.stop()
+
+
+def _pool(controller: Controller, **kwargs) -> SMTPConnectionPool:
+    return SMTPConnectionPool(
+        hostname=controller.hostname, port=controller.port, timeout=5, **kwargs
+    )
+
+
+def _message(i: int = 0) -> EmailMessage:
+    message = EmailMessage()
+    message["From"] = "noreply@example.com"
+    message["To"] = f"user{i}@example.com"
+    message["Subject"] = "Hello"
+    message.set_content("Hello")
+    return message
+
+
+async def test_messages_share_a_connection(smtp_server):
+    """Test that sequential sends reuse one connection"""
+    pool = _pool(smtp_server)
+
+    for i in range(5):
+        await pool.send(_message(i))
+
+    assert len(smtp_server.handler.messages) == 5
+    assert pool.connections_opened == 1
+    await pool.close()
+
+
+async def test_connection_retired_after_message_cap(smtp_server):
+    """Test that connections are replaced after max_messages_per_connection"""
+    pool = _pool(smtp_server, max_messages_per_connection=2)
+
+    for i in range(5):
+        await pool.send(_message(i))
+
+    assert len(smtp_server.handler.messages) == 5
+    assert pool.connections_opened == 3
+    await pool.close()
+
+
+async def test_concurrency_capped_by_max_connections(smtp_server):
+    """Test that concurrent sends never open more than max_connections"""
+    pool = _pool(smtp_server, max_connections=2)
+
+    await asyncio.gather(*(pool.send(_message(i)) for i in range(10)))
+
+    assert len(smtp_server.handler.messages) == 10
+    assert pool.connections_opened <= 2
+    await pool.close()
+
+
+async def test_reconnects_after_server_restart():
+    """Test that a message sent over a dropped connection is retried"""
+    handler = CollectingHandler()
+    port = _free_port()
+    server = Controller(handler, hostname="127.0.0.1", port=port)
+    server.start()
+    pool = _pool(server)
+    await pool.send(_message(0))
+    server.stop()
+
+    restarted = Controller(handler, hostname="127.0.0.1", port=port)
+    restarted.start()
+    try:
+        await pool.send(_message(1))
+    finally:
+        await pool.close()
+        restarted.stop()
+
+    assert len(handler.messages) == 2
+    assert pool.connections_opened == 2
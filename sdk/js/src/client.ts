@@ -12,6 +12,12 @@ const STORAGE_KEYS = {
   REFRESH_TOKEN: 'devauth_refresh_token',
 }
 
+// Returned when another tab refreshed with the same token first
+const REFRESH_TOKEN_ROTATED = 'REFRESH_TOKEN_ROTATED'
+// How long to wait for that tab to store the rotated token
+const ROTATED_TOKEN_WAIT_MS = 1000
+const ROTATED_TOKEN_POLL_MS = 50
+
 export class DevAuthClient {
   private config: DevAuthConfig
   private baseUrl: string
@@ -66,8 +72,13 @@ export class DevAuthClient {
           ...requestOptions,
         })
       } catch (error) {
-        // Refresh failed, logout
-        this.logout()
+        // After a rotation race the session is still live for whoever
+        // rotated the token, so don't revoke it (the stale tokens are
+        // already cleared)
+        if (!(error instanceof DevAuthError && error.code === REFRESH_TOKEN_ROTATED)) {
+          // Refresh failed, logout
+          this.logout()
+        }
         throw new AuthenticationError('Session expired. Please login again.')
       }
     }
@@ -96,15 +107,22 @@ export class DevAuthClient {
 
     this.refreshPromise = (async () => {
       try {
-        const url = `${this.baseUrl}/auth/refresh`
-        const response = await fetch(url, {
-          method: 'POST',
-          headers: {
-            'Content-Type': 'application/json',
-            'x-app-id': this.config.appId,
-          },
-          body: JSON.stringify({ refresh_token: refreshToken }),
-        })
+        let usedToken = refreshToken
+        let response = await this.postRefresh(usedToken)
+
+        if (await this.isRotatedResponse(response)) {
+          // Another tab won the refresh race; retry once with the token it
+          // stores
+          const rotated = await this.waitForRotatedRefreshToken(usedToken)
+          if (rotated) {
+            usedToken = rotated
+            response = await this.postRefresh(usedToken)
+          }
+          if (!rotated || (await this.isRotatedResponse(response))) {
+            this.clearTokensIfUnchanged(usedToken)
+            throw new DevAuthError('Refresh token was already rotated', REFRESH_TOKEN_ROTATED)
+          }
+        }
 
         if (!response.ok) {
           throw new AuthenticationError('Token refresh failed')
@@ -130,6 +148,47 @@ export class DevAuthClient {
     return this.refreshPromise
   }
 
+  private postRefresh(refreshToken: string): Promise<Response> {
+    return fetch(`${this.baseUrl}/auth/refresh`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+        'x-app-id': this.config.appId,
+      },
+      body: JSON.stringify({ refresh_token: refreshToken }),
+    })
+  }
+
+  private async isRotatedResponse(response: Response): Promise<boolean> {
+    if (response.status !== 409) {
+      return false
+    }
+    const errorData = await response.clone().json().catch(() => ({}))
+    return (errorData.detail?.code ?? errorData.error?.code) === REFRESH_TOKEN_ROTATED
+  }
+
+  private async waitForRotatedRefreshToken(previous: string): Promise<string | null> {
+    const deadline = Date.now() + ROTATED_TOKEN_WAIT_MS
+    for (;;) {
+      const current = this.storage.getItem(STORAGE_KEYS.REFRESH_TOKEN)
+      if (current && current !== previous) {
+        return current
+      }
+      if (Date.now() >= deadline) {
+        return null
+      }
+      await new Promise((resolve) => setTimeout(resolve, ROTATED_TOKEN_POLL_MS))
+    }
+  }
+
+  private clearTokensIfUnchanged(staleRefreshToken: string): void {
+    // Keep tokens another tab stored in the meantime
+    if (this.storage.getItem(STORAGE_KEYS.REFRESH_TOKEN) === staleRefreshToken) {
+      this.storage.removeItem(STORAGE_KEYS.ACCESS_TOKEN)
+      this.storage.removeItem(STORAGE_KEYS.REFRESH_TOKEN)
+    }
+  }
+
   async signup(data: SignupData): Promise<User> {
     const response = await this.request<User>('/auth/signup', {
       method: 'POST',
@@ -0,0 +1,134 @@
+"""
+In-memory introspection result cache
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from devauth.jwks import decode_segment
+
+# Rough per-entry bookkeeping overhead (dict slot, tuple, model instance)
+_ENTRY_OVERHEAD_BYTES = 400
+
+
+def token_cache_key(token: str) -> bytes:
+    """Cache key for a token (its SHA-256 digest, so tokens aren't retained)"""
+    return hashlib.sha256(token.encode("utf-8")).digest()
+
+
+def token_expiry(token: str) -> Optional[float]:
+    """Read the exp claim of a JWT without verifying it"""
+    try:
+        exp = decode_segment(token.split(".")[1]).get("exp")
+    except (IndexError, ValueError, AttributeError):
+        return None
+    return exp if isinstance(exp, (int, float)) else None
+
+
+class IntrospectionCache:
+    """
+    Bounded TTL + LRU cache of introspection results
+
+    Active results live until the token expires or ``ttl`` seconds pass,
+    whichever is sooner; inactive results are kept for ``negative_ttl``.
+    Least recently used entries are evicted once either ``max_entries`` or
+    the approximate ``max_bytes`` budget is exceeded.
+
+    Safe to share between threads (e.g. under Flask's threaded server).
+    """
+
+    def __init__(
+        self,
+        ttl: float = 60.0,
+        negative_ttl: float = 5.0,
+        max_entries: int = 10_000,
+        max_bytes: int = 16 * 1024 * 1024,
+    ):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[bytes, Tuple[float, Any, int]]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Cache counters"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
+
+    def get(self, key: bytes) -> Optional[Any]:
+        """Get a cached result, or None if missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, value, _ = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: bytes, value: Any, active: bool, token_exp: Optional[float] = None):
+        """
+        Cache an introspection result
+
+        Args:
+            key: Cache key from token_cache_key()
+            value: Introspection result
+            active: Whether the token was active
+            token_exp: Token expiry (unix time), caps the lifetime of active results
+        """
+        lifetime = self.ttl if active else self.negative_ttl
+        if active and token_exp is not None:
+            lifetime = min(lifetime, token_exp - time.time())
+        if lifetime <= 0:
+            return
+
+        size = _ENTRY_OVERHEAD_BYTES + len(key) + len(repr(value))
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = (time.monotonic() + lifetime, value, size)
+            self._bytes += size
+
+            while self._entries and (
+                len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+            ):
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def _remove(self, key: bytes):
+        # Called with the lock held
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def clear(self):
+        """Drop all cached results"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
@@ -3,10 +3,18 @@ DevAuth Client
 Main client class for token validation
 """
 
-from typing import Optional
+import asyncio
+import os
+import threading
+import weakref
+from typing import Dict, List, Optional, Set, Tuple
 import httpx
 from pydantic import BaseModel
 
+from devauth.cache import IntrospectionCache, token_cache_key, token_expiry
+from devauth.exceptions import DevAuthError
+from devauth.jwks import JWKSCache, verify_jwt, consume_exception
+
 
 class User(BaseModel):
     """User model"""
@@ -21,22 +29,114 @@ class TokenIntrospection(BaseModel):
     user: Optional[User] = None
 
 
+VERIFICATION_MODES = ("remote", "local")
+
+
+class _LoopState:
+    """Client state bound to a single event loop"""
+    
+    def __init__(self, transport: Optional[httpx.AsyncBaseTransport]):
+        # Pooled connections belong to the loop that opened them
+        self.http_client = httpx.AsyncClient(transport=transport)
+        self.inflight: Dict[bytes, "asyncio.Future[TokenIntrospection]"] = {}
+        self.batch_queue: List[Tuple[str, "asyncio.Future[TokenIntrospection]"]] = []
+        self.batch_timer: Optional[asyncio.TimerHandle] = None
+        # The loop only keeps weak references to tasks
+        self.batch_tasks: Set["asyncio.Task"] = set()
+
+
 class DevAuthClient:
-    """DevAuth client for token validation"""
+    """
+    DevAuth client for token validation
+    
+    In "remote" verification mode (the default) every token is checked with
+    the introspection endpoint. In "local" mode tokens are verified in-process
+    against the published JWKS, which is fetched once and cached. The mode
+    can also be set with the DEVAUTH_VERIFICATION_MODE environment variable.
+    
+    Introspection results are cached in memory (keyed by token hash) for
+    cache_ttl seconds or until the token expires; inactive results for
+    negative_cache_ttl seconds. Set cache_ttl=0 to disable the cache.
+    
+    With batch_window_ms > 0, introspect_token calls made within the window
+    are sent together to the batch introspection endpoint (up to
+    max_batch_size tokens per request).
+    
+    One client can be shared by code running on different event loops (such
+    as Flask async views, which each get a new loop): HTTP connections are
+    kept per loop, as are in-flight requests and pending batches, while cached
+    keys and results are shared. Call close()
+    from every loop that used the client once it is done with it.
+    """
     
     def __init__(
         self,
         app_id: str,
         api_key: str,
-        base_url: str = "https://api.devauth.dev/v1"
+        base_url: str = "https://api.devauth.dev/v1",
+        verification_mode: Optional[str] = None,
+        jwks_url: Optional[str] = None,
+        jwks_cache_ttl: float = 300.0,
+        cache_ttl: float = 60.0,
+        negative_cache_ttl: float = 5.0,
+        cache_max_entries: int = 10_000,
+        cache_max_bytes: int = 16 * 1024 * 1024,
+        batch_window_ms: float = 0.0,
+        max_batch_size: int = 100,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
     ):
         self.app_id = app_id
         self.api_key = api_key
         self.base_url = base_url
-        self.client = httpx.AsyncClient()
+        self.verification_mode = verification_mode or os.getenv(
+            "DEVAUTH_VERIFICATION_MODE", "remote"
+        )
+        if self.verification_mode not in VERIFICATION_MODES:
+            raise ValueError(f"Unknown verification mode: {self.verification_mode}")
+        self._transport = transport
+        self._loops: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _LoopState]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._loops_lock = threading.Lock()
+        
+        self.jwks: Optional[JWKSCache] = None
+        if self.verification_mode == "local":
+            self.jwks = JWKSCache(
+                jwks_url or str(httpx.URL(base_url).join("/.well-known/jwks.json")),
+                lambda: self.client,
+                ttl=jwks_cache_ttl,
+            )
+        
+        self.batch_window = batch_window_ms / 1000
+        self.max_batch_size = max_batch_size
+        self.cache: Optional[IntrospectionCache] = None
+        if cache_ttl > 0:
+            self.cache = IntrospectionCache(
+                ttl=cache_ttl,
+                negative_ttl=negative_cache_ttl,
+                max_entries=cache_max_entries,
+                max_bytes=cache_max_bytes,
+            )
+    
+    def _loop_state(self) -> _LoopState:
+        loop = asyncio.get_running_loop()
+        with self._loops_lock:
+            state = self._loops.get(loop)
+            if state is None:
+                state = self._loops[loop] = _LoopState(self._transport)
+        return state
+    
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """HTTP client for the running event loop"""
+        return self._loop_state().http_client
     
     async def verify_token(self, token: str) -> User:
         """Verify access token and return user info"""
+        if self.jwks is not None:
+            claims = await verify_jwt(token, self.jwks, self.app_id)
+            return User(id=claims["sub"], email=claims["email"], app_id=claims["app_id"])
+        
         introspection = await self.introspect_token(token)
         if not introspection.active or not introspection.user:
             from devauth.exceptions import AuthenticationError
@@ -44,6 +144,139 @@ class DevAuthClient:
         return introspection.user
     
     async def introspect_token(self, token: str) -> TokenIntrospection:
+        """
+        Introspect a token, using the cached result when available
+        
+        Concurrent calls for the same token on the same event loop share a
+        single request.
+        """
+        key = token_cache_key(token)
+        if self.cache is not None:
+            introspection = self.cache.get(key)
+            if introspection is not None:
+                return introspection
+        
+        inflight = self._loop_state().inflight
+        task = inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._introspect_and_cache(key, token))
+            inflight[key] = task
+            task.add_done_callback(lambda _: inflight.pop(key, None))
+            task.add_done_callback(consume_exception)
+        # Shield so one caller's cancellation doesn't fail the others
+        return await asyncio.shield(task)
+    
+    async def introspect_many(self, tokens: List[str]) -> List[TokenIntrospection]:
+        """
+        Introspect multiple tokens using the batch endpoint
+        
+        Cached results are reused and duplicate tokens are sent once.
+        Results are returned in the order of the given tokens.
+        """
+        keys = [token_cache_key(token) for token in tokens]
+        results: Dict[bytes, TokenIntrospection] = {}
+        missing: Dict[bytes, str] = {}
+        for key, token in zip(keys, tokens):
+            cached = self.cache.get(key) if self.cache is not None else None
+            if cached is not None:
+                results[key] = cached
+            else:
+                missing[key] = token
+        
+        pending = list(missing.items())
+        chunks = [
+            pending[i:i + self.max_batch_size]
+            for i in range(0, len(pending), self.max_batch_size)
+        ]
+        responses = await asyncio.gather(
+            *[self._request_batch_introspection([token for _, token in chunk]) for chunk in chunks]
+        )
+        for chunk, introspections in zip(chunks, responses):
+            for (key, token), introspection in zip(chunk, introspections):
+                results[key] = introspection
+                if self.cache is not None:
+                    self.cache.set(key, introspection, introspection.active, token_expiry(token))
+        
+        return [results[key] for key in keys]
+    
+    async def _introspect_and_cache(self, key: bytes, token: str) -> TokenIntrospection:
+        if self.batch_window > 0:
+            introspection = await self._enqueue_for_batch(token)
+        else:
+            introspection = await self._request_introspection(token)
+        if self.cache is not None:
+            self.cache.set(key, introspection, introspection.active, token_expiry(token))
+        return introspection
+    
+    async def _enqueue_for_batch(self, token: str) -> TokenIntrospection:
+        """Queue a token for the next micro-batch and wait for its result"""
+        loop = asyncio.get_running_loop()
+        state = self._loop_state()
+        future = loop.create_future()
+        state.batch_queue.append((token, future))
+        
+        if len(state.batch_queue) >= self.max_batch_size:
+            self._flush_batch(state)
+        elif state.batch_timer is None:
+            state.batch_timer = loop.call_later(self.batch_window, self._flush_batch, state)
+        return await future
+    
+    def _flush_batch(self, state: _LoopState):
+        if state.batch_timer is not None:
+            state.batch_timer.cancel()
+            state.batch_timer = None
+        items, state.batch_queue = state.batch_queue, []
+        if items:
+            task = asyncio.ensure_future(self._send_batch(items))
+            state.batch_tasks.add(task)
+            task.add_done_callback(state.batch_tasks.discard)
+    
+    async def _send_batch(self, items: List[Tuple[str, "asyncio.Future[TokenIntrospection]"]]):
+        error: BaseException = DevAuthError("Token validation error: no result for token")
+        try:
+            introspections = await self._request_batch_introspection(
+                [token for token, _ in items]
+            )
+            for (_, future), introspection in zip(items, introspections):
+                if not future.done():
+                    future.set_result(introspection)
+        except Exception as e:
+            error = e
+        finally:
+            # Every waiter gets an answer, even if the request was cancelled
+            for _, future in items:
+                if not future.done():
+                    future.set_exception(error)
+    
+    async def _request_batch_introspection(self, tokens: List[str]) -> List[TokenIntrospection]:
+        """Call batch introspection endpoint"""
+        try:
+            response = await self.client.post(
+                f"{self.base_url}/auth/introspect/batch",
+                json={"tokens": tokens},
+                headers={
+                    "x-app-id": self.app_id,
+                    "x-api-key": self.api_key,
+                },
+                timeout=10.0
+            )
+            response.raise_for_status()
+            data = response.json()
+            introspections = [TokenIntrospection(**result) for result in data["results"]]
+        except httpx.HTTPStatusError as e:
+            from devauth.exceptions import AuthenticationError
+            raise AuthenticationError(f"Token validation failed: {e.response.text}")
+        except Exception as e:
+            raise DevAuthError(f"Token validation error: {str(e)}")
+        
+        if len(introspections) != len(tokens):
+            raise DevAuthError(
+                f"Token validation error: expected {len(tokens)} results, "
+                f"got {len(introspections)}"
+            )
+        return introspections
+    
+    async def _request_introspection(self, token: str) -> TokenIntrospection:
         """Call introspection endpoint"""
         try:
             response = await self.client.post(
@@ -66,8 +299,12 @@ class DevAuthClient:
             raise DevAuthError(f"Token validation error: {str(e)}")
     
     async def close(self):
-        """Close HTTP client"""
-        await self.client.aclose()
+        """Close the HTTP client of the running event loop"""
+        loop = asyncio.get_running_loop()
+        with self._loops_lock:
+            state = self._loops.pop(loop, None)
+        if state is not None:
+            await state.http_client.aclose()
     
     async def __aenter__(self):
         return self
@@ -18,7 +18,7 @@ class TokenExpiredError(DevAuthError):
     pass
 
 
-class InvalidTokenError(DevAuthError):
+class InvalidTokenError(AuthenticationError):
     """Raised when token is invalid"""
     pass
 
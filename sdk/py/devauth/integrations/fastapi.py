@@ -14,11 +14,22 @@ _client: Optional[DevAuthClient] = None
 def init_devauth(
     app_id: str,
     api_key: str,
-    base_url: str = "https://api.devauth.dev/v1"
+    base_url: str = "https://api.devauth.dev/v1",
+    verification_mode: Optional[str] = None,
 ):
-    """Initialize DevAuth client"""
+    """
+    Initialize DevAuth client
+    
+    verification_mode defaults to the DEVAUTH_VERIFICATION_MODE environment
+    variable, falling back to "remote".
+    """
     global _client
-    _client = DevAuthClient(app_id=app_id, api_key=api_key, base_url=base_url)
+    _client = DevAuthClient(
+        app_id=app_id,
+        api_key=api_key,
+        base_url=base_url,
+        verification_mode=verification_mode,
+    )
 
 
 async def get_current_user(
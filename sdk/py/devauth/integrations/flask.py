@@ -17,16 +17,29 @@ class DevAuth:
         if app is not None:
             self.init_app(app)
     
-    def init_app(self, app, app_id: str = None, api_key: str = None, base_url: str = None):
+    def init_app(
+        self,
+        app,
+        app_id: str = None,
+        api_key: str = None,
+        base_url: str = None,
+        verification_mode: str = None,
+    ):
         """Initialize DevAuth with Flask app"""
         app_id = app_id or app.config.get("DEVAUTH_APP_ID")
         api_key = api_key or app.config.get("DEVAUTH_API_KEY")
         base_url = base_url or app.config.get("DEVAUTH_BASE_URL", "https://api.devauth.dev/v1")
+        verification_mode = verification_mode or app.config.get("DEVAUTH_VERIFICATION_MODE")
         
         if not app_id or not api_key:
             raise ValueError("DEVAUTH_APP_ID and DEVAUTH_API_KEY must be set")
         
-        self.client = DevAuthClient(app_id=app_id, api_key=api_key, base_url=base_url)
+        self.client = DevAuthClient(
+            app_id=app_id,
+            api_key=api_key,
+            base_url=base_url,
+            verification_mode=verification_mode,
+        )
         
         # Store client in app context
         app.devauth_client = self.client
@@ -74,5 +87,9 @@ def require_auth(f: Callable) -> Callable:
             return await f(user, *args, **kwargs)
         except AuthenticationError as e:
             return jsonify({"error": str(e)}), 401
+        finally:
+            # Flask runs each async view in a new event loop, so release the
+            # connections this request's loop opened
+            await client.close()
     
     return decorated_function
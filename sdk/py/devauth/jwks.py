@@ -0,0 +1,246 @@
+"""
+JWKS cache and local token verification
+"""
+
+import asyncio
+import base64
+import json
+import threading
+import time
+import weakref
+from typing import Any, Callable, Dict, Optional
+
+import httpx
+
+from devauth.exceptions import AuthenticationError, DevAuthError, InvalidTokenError
+
+SUPPORTED_ALGORITHMS = {"RS256", "ES256", "EdDSA"}
+
+
+def _b64url_decode(data: str) -> bytes:
+    """Decode base64url data with or without padding"""
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _b64url_to_int(data: str) -> int:
+    return int.from_bytes(_b64url_decode(data), "big")
+
+
+def _require_cryptography():
+    try:
+        import cryptography  # noqa: F401
+    except ImportError as e:
+        raise DevAuthError(
+            "Local verification requires the 'cryptography' package. "
+            "Install it with: pip install devauth-py[local]"
+        ) from e
+
+
+def load_public_key(jwk: Dict[str, Any]) -> Any:
+    """
+    Build a cryptography public key from a JWK (RSA, EC P-256 or OKP Ed25519)
+
+    Raises:
+        ValueError: If the key type is not supported
+    """
+    from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+
+    kty = jwk.get("kty")
+    if kty == "RSA":
+        numbers = rsa.RSAPublicNumbers(e=_b64url_to_int(jwk["e"]), n=_b64url_to_int(jwk["n"]))
+        return numbers.public_key()
+    if kty == "EC" and jwk.get("crv") == "P-256":
+        numbers = ec.EllipticCurvePublicNumbers(
+            x=_b64url_to_int(jwk["x"]), y=_b64url_to_int(jwk["y"]), curve=ec.SECP256R1()
+        )
+        return numbers.public_key()
+    if kty == "OKP" and jwk.get("crv") == "Ed25519":
+        return ed25519.Ed25519PublicKey.from_public_bytes(_b64url_decode(jwk["x"]))
+
+    raise ValueError(f"Unsupported key type: {kty} {jwk.get('crv', '')}".rstrip())
+
+
+def _verify_signature(algorithm: str, public_key: Any, signing_input: bytes, signature: bytes):
+    from cryptography.exceptions import InvalidSignature
+    from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.primitives.asymmetric import ec, ed25519, padding, rsa
+    from cryptography.hazmat.primitives.asymmetric.utils import encode_dss_signature
+
+    try:
+        if algorithm == "RS256" and isinstance(public_key, rsa.RSAPublicKey):
+            public_key.verify(signature, signing_input, padding.PKCS1v15(), hashes.SHA256())
+        elif algorithm == "ES256" and isinstance(public_key, ec.EllipticCurvePublicKey):
+            # JWS carries the raw r || s pair, cryptography expects DER
+            if len(signature) != 64:
+                raise InvalidSignature()
+            der = encode_dss_signature(
+                int.from_bytes(signature[:32], "big"), int.from_bytes(signature[32:], "big")
+            )
+            public_key.verify(der, signing_input, ec.ECDSA(hashes.SHA256()))
+        elif algorithm == "EdDSA" and isinstance(public_key, ed25519.Ed25519PublicKey):
+            public_key.verify(signature, signing_input)
+        else:
+            raise AuthenticationError("Token algorithm does not match signing key")
+    except InvalidSignature:
+        raise AuthenticationError("Invalid token signature")
+
+
+class JWKSCache:
+    """
+    Cached JSON Web Key Set
+
+    Keys are refreshed in the background once the cache TTL has passed, so
+    verification never waits on the network for known keys. A token signed
+    with an unknown key ID triggers an immediate refresh, shared by all
+    concurrent callers and rate limited to one per ``min_refresh_interval``.
+
+    The keys are shared by all event loops; an in-flight refresh is only
+    shared by callers on the loop that started it.
+    """
+
+    def __init__(
+        self,
+        jwks_url: str,
+        get_http_client: Callable[[], httpx.AsyncClient],
+        ttl: float = 300.0,
+        min_refresh_interval: float = 30.0,
+    ):
+        self.jwks_url = jwks_url
+        self.get_http_client = get_http_client
+        self.ttl = ttl
+        self.min_refresh_interval = min_refresh_interval
+        self._keys: Dict[str, Dict[str, Any]] = {}
+        self._fetched_at: Optional[float] = None
+        self._attempted_at: Optional[float] = None
+        self._refresh_tasks: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Task]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._lock = threading.Lock()
+        _require_cryptography()
+
+    async def _fetch(self):
+        try:
+            response = await self.get_http_client().get(self.jwks_url, timeout=10.0)
+            response.raise_for_status()
+            jwks = response.json()
+        except Exception as e:
+            raise DevAuthError(f"Failed to fetch JWKS: {str(e)}")
+
+        keys = {}
+        for jwk in jwks.get("keys", []):
+            if jwk.get("use", "sig") != "sig" or "kid" not in jwk:
+                continue
+            try:
+                keys[jwk["kid"]] = {"alg": jwk.get("alg"), "key": load_public_key(jwk)}
+            except (ValueError, KeyError):
+                # Skip keys this SDK version can't use
+                continue
+        self._keys = keys
+        self._fetched_at = time.monotonic()
+
+    def refresh(self) -> "asyncio.Task":
+        """Start a refresh on the running loop unless one is already in flight"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            task = self._refresh_tasks.get(loop)
+            if task is None:
+                self._attempted_at = time.monotonic()
+                task = self._refresh_tasks[loop] = loop.create_task(self._fetch())
+                task.add_done_callback(lambda _: self._refresh_done(loop))
+        return task
+
+    def _refresh_done(self, loop: asyncio.AbstractEventLoop):
+        # Dropped once finished, a stored task would keep its loop alive
+        with self._lock:
+            self._refresh_tasks.pop(loop, None)
+
+    def _can_refresh(self, now: float) -> bool:
+        return self._attempted_at is None or now - self._attempted_at >= self.min_refresh_interval
+
+    async def get_key(self, kid: str) -> Dict[str, Any]:
+        """
+        Get the verification key for a key ID
+
+        Raises:
+            AuthenticationError: If the key ID is not published
+        """
+        now = time.monotonic()
+        if self._fetched_at is None:
+            await self.refresh()
+        elif now - self._fetched_at >= self.ttl and self._can_refresh(now):
+            # Serve cached keys while refreshing in the background
+            self.refresh().add_done_callback(consume_exception)
+
+        entry = self._keys.get(kid)
+        if entry is None and self._can_refresh(now):
+            await self.refresh()
+            entry = self._keys.get(kid)
+
+        if entry is None:
+            raise AuthenticationError("Token signed with unknown key")
+        return entry
+
+
+def consume_exception(task: "asyncio.Task"):
+    """Retrieve a background task's exception so it is not logged as unhandled"""
+    if not task.cancelled():
+        task.exception()
+
+
+def decode_segment(segment: str) -> Dict[str, Any]:
+    """Decode a JWT header or payload segment"""
+    return json.loads(_b64url_decode(segment))
+
+
+async def verify_jwt(
+    token: str, jwks: JWKSCache, app_id: str, leeway: float = 0.0
+) -> Dict[str, Any]:
+    """
+    Verify an access token locally
+
+    Checks the signature against the published keys, expiry, token type
+    and that the token was issued for ``app_id``.
+
+    Returns:
+        Verified token claims
+
+    Raises:
+        InvalidTokenError: If the token is malformed
+        AuthenticationError: If the token is invalid or expired
+    """
+    try:
+        header_segment, payload_segment, signature_segment = token.split(".")
+        header = decode_segment(header_segment)
+        payload = decode_segment(payload_segment)
+        signature = _b64url_decode(signature_segment)
+    except ValueError:
+        raise InvalidTokenError("Malformed token")
+    # Valid JSON is not necessarily an object (e.g. "[]")
+    if not isinstance(header, dict) or not isinstance(payload, dict):
+        raise InvalidTokenError("Malformed token")
+
+    algorithm = header.get("alg")
+    if algorithm not in SUPPORTED_ALGORITHMS:
+        raise AuthenticationError(f"Unsupported token algorithm: {algorithm}")
+
+    kid = header.get("kid")
+    if not isinstance(kid, str):
+        raise InvalidTokenError("Malformed token")
+    entry = await jwks.get_key(kid)
+    if entry["alg"] and entry["alg"] != algorithm:
+        raise AuthenticationError("Token algorithm does not match signing key")
+
+    signing_input = f"{header_segment}.{payload_segment}".encode("ascii")
+    _verify_signature(algorithm, entry["key"], signing_input, signature)
+
+    exp = payload.get("exp")
+    if not isinstance(exp, (int, float)) or exp + leeway <= time.time():
+        raise AuthenticationError("Invalid or expired token")
+    if payload.get("type") != "access":
+        raise AuthenticationError("Invalid or expired token")
+    if payload.get("app_id") != app_id:
+        raise AuthenticationError("Token does not belong to this application")
+    if not isinstance(payload.get("sub"), str) or not isinstance(payload.get("email"), str):
+        raise InvalidTokenError("Malformed token")
+
+    return payload
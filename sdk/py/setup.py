@@ -3,7 +3,7 @@ from setuptools import setup, find_packages
 setup(
     name="devauth-py",
     version="0.1.0",
-    packages=find_packages(),
+    packages=find_packages(exclude=["tests"]),
     python_requires=">=3.8",
     install_requires=[
         "pydantic>=2.0.0",
@@ -12,6 +12,8 @@ setup(
     extras_require={
         "fastapi": ["fastapi>=0.100.0"],
         "flask": ["flask>=2.3.0"],
+        "local": ["cryptography>=41.0.0"],
+        "dev": ["pytest>=7.4.0", "pytest-asyncio>=0.21.0", "cryptography>=41.0.0"],
     },
 )
 
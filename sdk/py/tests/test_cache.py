@@ -0,0 +1,136 @@
+"""
+Tests for the introspection result cache
+"""
+
+import base64
+import json
+import threading
+import time
+
+import httpx
+import pytest
+
+from devauth import cache as cache_module
+from devauth.cache import IntrospectionCache, token_cache_key, token_expiry
+from devauth.client import DevAuthClient
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache_module.time, "monotonic", clock)
+    return clock
+
+
+def make_token(exp: float) -> str:
+    payload = base64.urlsafe_b64encode(json.dumps({"exp": exp}).encode()).rstrip(b"=")
+    return f"e30.{payload.decode()}.sig"
+
+
+def test_hit_and_miss():
+    cache = IntrospectionCache()
+    key = token_cache_key("token")
+
+    assert cache.get(key) is None
+    cache.set(key, "result", active=True)
+    assert cache.get(key) == "result"
+    assert cache.stats["hits"] == 1
+    assert cache.stats["misses"] == 1
+
+
+def test_entries_expire(clock):
+    cache = IntrospectionCache(ttl=60, negative_ttl=5)
+    cache.set(b"active", "a", active=True)
+    cache.set(b"inactive", "i", active=False)
+
+    clock.now += 10
+    assert cache.get(b"active") == "a"
+    assert cache.get(b"inactive") is None
+
+    clock.now += 60
+    assert cache.get(b"active") is None
+    assert len(cache) == 0
+
+
+def test_active_entry_lifetime_is_capped_by_token_expiry(clock):
+    cache = IntrospectionCache(ttl=60)
+    token = make_token(time.time() + 5)
+
+    cache.set(b"key", "a", active=True, token_exp=token_expiry(token))
+    clock.now += 6
+    assert cache.get(b"key") is None
+
+    # Already expired tokens are not cached at all
+    cache.set(b"key", "a", active=True, token_exp=time.time() - 1)
+    assert len(cache) == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = IntrospectionCache(max_entries=2)
+    cache.set(b"a", "a", active=True)
+    cache.set(b"b", "b", active=True)
+    cache.get(b"a")
+    cache.set(b"c", "c", active=True)
+
+    assert cache.get(b"b") is None
+    assert cache.get(b"a") == "a"
+    assert cache.stats["evictions"] == 1
+
+
+def test_byte_budget_is_enforced():
+    cache = IntrospectionCache(max_bytes=2000)
+    for i in range(10):
+        cache.set(str(i).encode(), "x" * 100, active=True)
+
+    assert cache.stats["bytes"] <= 2000
+    assert len(cache) < 10
+
+
+def test_concurrent_threads_keep_cache_consistent():
+    cache = IntrospectionCache(max_entries=50)
+
+    def worker(n: int):
+        for i in range(2000):
+            key = f"{n}:{i % 100}".encode()
+            cache.set(key, i, active=True)
+            cache.get(key)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = cache.stats
+    assert stats["entries"] == len(cache) <= 50
+    assert stats["bytes"] == sum(size for _, _, size in cache._entries.values())
+
+
+async def test_client_serves_repeat_introspections_from_cache():
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(json.loads(request.content)["token"])
+        return httpx.Response(200, json={"active": False})
+
+    client = DevAuthClient(
+        app_id="app", api_key="key", transport=httpx.MockTransport(handler)
+    )
+    for _ in range(3):
+        assert not (await client.introspect_token("token")).active
+    assert requests == ["token"]
+
+    uncached = DevAuthClient(
+        app_id="app", api_key="key", cache_ttl=0, transport=httpx.MockTransport(handler)
+    )
+    await uncached.introspect_token("token")
+    await uncached.introspect_token("token")
+    assert len(requests) == 3
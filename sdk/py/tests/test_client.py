@@ -0,0 +1,163 @@
+"""
+Tests for DevAuthClient introspection, single-flight and batching
+"""
+
+import asyncio
+import json
+import threading
+
+import httpx
+import pytest
+
+from devauth.client import DevAuthClient
+from devauth.exceptions import AuthenticationError, DevAuthError
+
+ACTIVE = {
+    "active": True,
+    "user": {"id": "user-1", "email": "user@example.com", "app_id": "app"},
+}
+
+
+class IntrospectionServer:
+    """Mock introspection endpoints that hold responses until released"""
+
+    def __init__(self, result=ACTIVE, status_code=200, drop_batch_results=0):
+        self.result = result
+        self.status_code = status_code
+        self.drop_batch_results = drop_batch_results
+        self.requests = []
+        self.release = None
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content)
+        self.requests.append(body)
+        if self.release is not None:
+            await self.release.wait()
+        if self.status_code != 200:
+            return httpx.Response(self.status_code, text="rejected")
+        if request.url.path.endswith("/batch"):
+            results = [self.result] * (len(body["tokens"]) - self.drop_batch_results)
+            return httpx.Response(200, json={"results": results})
+        return httpx.Response(200, json=self.result)
+
+    def client(self, **kwargs) -> DevAuthClient:
+        return DevAuthClient(
+            app_id="app",
+            api_key="key",
+            base_url="https://auth.test/v1",
+            transport=httpx.MockTransport(self),
+            **kwargs,
+        )
+
+
+async def test_concurrent_introspections_share_one_request():
+    server = IntrospectionServer()
+    server.release = asyncio.Event()
+    client = server.client(cache_ttl=0)
+
+    calls = [asyncio.ensure_future(client.introspect_token("token")) for _ in range(10)]
+    await asyncio.sleep(0.01)
+    server.release.set()
+    results = await asyncio.gather(*calls)
+
+    assert len(server.requests) == 1
+    assert all(result.user.id == "user-1" for result in results)
+
+    # Nothing left in flight, so the next call makes a new request
+    await client.introspect_token("token")
+    assert len(server.requests) == 2
+
+
+async def test_different_tokens_are_not_coalesced():
+    server = IntrospectionServer()
+    client = server.client(cache_ttl=0)
+
+    await asyncio.gather(client.introspect_token("a"), client.introspect_token("b"))
+    assert sorted(request["token"] for request in server.requests) == ["a", "b"]
+
+
+async def test_cancelled_caller_does_not_fail_the_others():
+    server = IntrospectionServer()
+    server.release = asyncio.Event()
+    client = server.client(cache_ttl=0)
+
+    first = asyncio.ensure_future(client.introspect_token("token"))
+    second = asyncio.ensure_future(client.introspect_token("token"))
+    await asyncio.sleep(0.01)
+    first.cancel()
+    server.release.set()
+
+    assert (await second).active
+    assert first.cancelled()
+    assert len(server.requests) == 1
+
+
+async def test_failure_reaches_every_waiter_and_is_not_cached():
+    server = IntrospectionServer(status_code=401)
+    client = server.client()
+
+    results = await asyncio.gather(
+        *[client.introspect_token("token") for _ in range(3)], return_exceptions=True
+    )
+    assert all(isinstance(result, AuthenticationError) for result in results)
+    assert len(server.requests) == 1
+
+    server.status_code = 200
+    assert (await client.introspect_token("token")).active
+
+
+async def test_batch_window_groups_calls():
+    server = IntrospectionServer()
+    client = server.client(cache_ttl=0, batch_window_ms=5)
+
+    results = await asyncio.gather(*[client.introspect_token(f"t{i}") for i in range(5)])
+
+    assert len(server.requests) == 1
+    assert len(server.requests[0]["tokens"]) == 5
+    assert all(result.active for result in results)
+
+
+async def test_short_batch_response_fails_every_caller():
+    server = IntrospectionServer(drop_batch_results=1)
+    client = server.client(cache_ttl=0, batch_window_ms=5)
+
+    results = await asyncio.wait_for(
+        asyncio.gather(
+            *[client.introspect_token(f"t{i}") for i in range(3)], return_exceptions=True
+        ),
+        timeout=1,
+    )
+    assert all(isinstance(result, DevAuthError) for result in results)
+
+
+async def test_introspect_many_rejects_short_batch_response():
+    server = IntrospectionServer(drop_batch_results=1)
+    client = server.client()
+
+    with pytest.raises(DevAuthError, match="expected 2 results"):
+        await client.introspect_many(["a", "b"])
+
+
+def test_single_flight_works_from_separate_event_loops():
+    server = IntrospectionServer()
+    client = server.client(cache_ttl=0)
+    results = []
+
+    async def introspect():
+        try:
+            results.extend(
+                await asyncio.gather(*[client.introspect_token("token") for _ in range(3)])
+            )
+        finally:
+            await client.close()
+
+    # Like Flask, which runs each async view in a new loop
+    threads = [threading.Thread(target=asyncio.run, args=(introspect(),)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(results) == 12
+    assert all(result.active for result in results)
+    assert len(client._loops) == 0
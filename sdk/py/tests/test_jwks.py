@@ -0,0 +1,212 @@
+"""
+Tests for local JWKS-based token verification
+"""
+
+import asyncio
+import base64
+import json
+import threading
+import time
+
+import httpx
+import pytest
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import padding, rsa
+
+from devauth.client import DevAuthClient
+from devauth.exceptions import AuthenticationError, InvalidTokenError
+from devauth.jwks import JWKSCache, verify_jwt
+
+APP_ID = "app_test"
+JWKS_URL = "https://auth.test/.well-known/jwks.json"
+
+
+def b64url(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def make_key(kid: str):
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    numbers = private_key.public_key().public_numbers()
+    jwk = {
+        "kty": "RSA",
+        "use": "sig",
+        "alg": "RS256",
+        "kid": kid,
+        "n": b64url(numbers.n.to_bytes((numbers.n.bit_length() + 7) // 8, "big")),
+        "e": b64url(numbers.e.to_bytes(3, "big")),
+    }
+    return private_key, jwk
+
+
+def sign(private_key, kid: str, **claims) -> str:
+    payload = {
+        "sub": "user-1",
+        "email": "user@example.com",
+        "app_id": APP_ID,
+        "type": "access",
+        "exp": int(time.time()) + 300,
+        **claims,
+    }
+    header = b64url(json.dumps({"alg": "RS256", "kid": kid}).encode())
+    body = b64url(json.dumps(payload).encode())
+    signature = private_key.sign(
+        f"{header}.{body}".encode("ascii"), padding.PKCS1v15(), hashes.SHA256()
+    )
+    return f"{header}.{body}.{b64url(signature)}"
+
+
+class JWKSServer:
+    """Mock JWKS endpoint serving a mutable key set"""
+
+    def __init__(self, *jwks):
+        self.keys = list(jwks)
+        self.requests = 0
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        return httpx.Response(200, json={"keys": self.keys})
+
+    def cache(self, **kwargs) -> JWKSCache:
+        client = httpx.AsyncClient(transport=httpx.MockTransport(self))
+        return JWKSCache(JWKS_URL, lambda: client, **kwargs)
+
+
+@pytest.fixture(scope="module")
+def signing_key():
+    return make_key("key-1")
+
+
+async def test_verify_fetches_keys_once(signing_key):
+    private_key, jwk = signing_key
+    server = JWKSServer(jwk)
+    jwks = server.cache()
+
+    token = sign(private_key, "key-1")
+    for _ in range(3):
+        claims = await verify_jwt(token, jwks, APP_ID)
+        assert claims["sub"] == "user-1"
+    assert server.requests == 1
+
+
+async def test_expired_token_is_rejected(signing_key):
+    private_key, jwk = signing_key
+    jwks = JWKSServer(jwk).cache()
+
+    token = sign(private_key, "key-1", exp=int(time.time()) - 10)
+    with pytest.raises(AuthenticationError, match="expired"):
+        await verify_jwt(token, jwks, APP_ID)
+
+    # Leeway covers small clock skew
+    assert await verify_jwt(token, jwks, APP_ID, leeway=60)
+
+
+async def test_token_for_another_app_is_rejected(signing_key):
+    private_key, jwk = signing_key
+    jwks = JWKSServer(jwk).cache()
+
+    with pytest.raises(AuthenticationError, match="application"):
+        await verify_jwt(sign(private_key, "key-1", app_id="other"), jwks, APP_ID)
+
+
+async def test_tampered_token_is_rejected(signing_key):
+    private_key, jwk = signing_key
+    jwks = JWKSServer(jwk).cache()
+
+    header, _, signature = sign(private_key, "key-1").split(".")
+    forged = b64url(json.dumps({"sub": "admin", "app_id": APP_ID}).encode())
+    with pytest.raises(AuthenticationError, match="signature"):
+        await verify_jwt(f"{header}.{forged}.{signature}", jwks, APP_ID)
+
+
+@pytest.mark.parametrize("token", ["W10.e30.AA", "e30.W10.AA", "e30.bnVsbA.AA", "not-a-jwt"])
+async def test_malformed_token_is_rejected(signing_key, token):
+    jwks = JWKSServer(signing_key[1]).cache()
+
+    with pytest.raises(InvalidTokenError):
+        await verify_jwt(token, jwks, APP_ID)
+
+
+async def test_key_rotation_refreshes_on_unknown_kid(signing_key):
+    old_private, old_jwk = signing_key
+    new_private, new_jwk = make_key("key-2")
+    server = JWKSServer(old_jwk)
+    jwks = server.cache(min_refresh_interval=0)
+
+    await verify_jwt(sign(old_private, "key-1"), jwks, APP_ID)
+    server.keys = [old_jwk, new_jwk]
+
+    claims = await verify_jwt(sign(new_private, "key-2"), jwks, APP_ID)
+    assert claims["sub"] == "user-1"
+    assert server.requests == 2
+
+
+async def test_unknown_kid_refresh_is_rate_limited(signing_key):
+    private_key, jwk = signing_key
+    server = JWKSServer(jwk)
+    jwks = server.cache(min_refresh_interval=60)
+
+    await verify_jwt(sign(private_key, "key-1"), jwks, APP_ID)
+    for _ in range(3):
+        with pytest.raises(AuthenticationError, match="unknown key"):
+            await verify_jwt(sign(private_key, "key-9"), jwks, APP_ID)
+    assert server.requests == 1
+
+
+async def test_concurrent_first_fetch_is_shared(signing_key):
+    private_key, jwk = signing_key
+    server = JWKSServer(jwk)
+    jwks = server.cache()
+
+    token = sign(private_key, "key-1")
+    await asyncio.gather(*[verify_jwt(token, jwks, APP_ID) for _ in range(10)])
+    assert server.requests == 1
+
+
+async def test_stale_keys_refresh_in_background(signing_key):
+    old_private, old_jwk = signing_key
+    new_private, new_jwk = make_key("key-2")
+    server = JWKSServer(old_jwk)
+    jwks = server.cache(ttl=0, min_refresh_interval=0)
+
+    await verify_jwt(sign(old_private, "key-1"), jwks, APP_ID)
+    server.keys = [new_jwk]
+
+    # Still served from the cached set while the refresh runs
+    await verify_jwt(sign(old_private, "key-1"), jwks, APP_ID)
+    await jwks.refresh()
+    assert server.requests == 2
+
+    with pytest.raises(AuthenticationError):
+        await verify_jwt(sign(old_private, "key-1"), jwks, APP_ID)
+    await verify_jwt(sign(new_private, "key-2"), jwks, APP_ID)
+
+
+def test_client_is_usable_from_separate_event_loops(signing_key):
+    private_key, jwk = signing_key
+    server = JWKSServer(jwk)
+    client = DevAuthClient(
+        app_id=APP_ID,
+        api_key="key",
+        base_url="https://auth.test/v1",
+        verification_mode="local",
+        transport=httpx.MockTransport(server),
+    )
+    token = sign(private_key, "key-1")
+    results = []
+
+    async def verify():
+        try:
+            results.append(await client.verify_token(token))
+        finally:
+            await client.close()
+
+    # Like Flask, which runs each async view in a new loop
+    threads = [threading.Thread(target=asyncio.run, args=(verify(),)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert [user.id for user in results] == ["user-1"] * 4
+    assert len(client._loops) == 0